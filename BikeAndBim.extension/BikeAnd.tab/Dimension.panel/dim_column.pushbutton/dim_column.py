@@ -7,9 +7,6 @@
         - Nikita Glebov
 """
 
-# ################# Проблемы ################################################
-# FIXME Не находит оси через "-" (10-5). Создавать такие оси - была большая ошибка(
-
 # ################# Стандартный импорт ######################################
 from rpw import revit, db, ui, doc, uidoc, logger, DB, UI
 
@@ -25,7 +22,10 @@ import sys
 sys.path.append(r"C:\Program Files (x86)\IronPython 2.7\Lib")
 import logging
 import functools
-from re import findall
+from array import array
+
+from location_mark import LocationMarkParser
+from segment_index import SegmentIndex
 
 
 # ################# Константы ###############################################
@@ -141,41 +141,232 @@ class ColumnFilter(ISelectionFilter):
         return False
 
 
+def get_location_point(column):
+    """
+    Точка вставки колонны. У наклонной колонны (LocationCurve) - начало ее оси
+
+    :type column: DB.FamilyInstance
+    :rtype: DB.XYZ
+    """
+
+    location = column.Location
+    if isinstance(location, DB.LocationCurve):
+        return location.Curve.GetEndPoint(0)
+    return location.Point
+
+
+def extract_normals(faces):
+    """
+    Получить нормали всех граней одним плоским массивом
+
+    :param faces: Грани тела
+    :type faces: DB.FaceArray
+    :return: [x0, y0, z0, x1, y1, z1, ...]
+    :rtype: array
+    """
+
+    normals = array('d')
+    for face in faces:
+        normal = face.FaceNormal
+        normals.extend((normal.X, normal.Y, normal.Z))
+
+    logging.debug('Get {} normals'.format(len(normals) // 3))
+    return normals
+
+
+def is_parallel(x1, y1, z1, x2, y2, z2, tolerance=0.001):
+    """Векторное произведение почти равно нулю, аналог XYZ.CrossProduct().IsAlmostEqualTo(XYZ.Zero)"""
+
+    return (abs(y1 * z2 - z1 * y2) <= tolerance and
+            abs(z1 * x2 - x1 * z2) <= tolerance and
+            abs(x1 * y2 - y1 * x2) <= tolerance)
+
+
+def classify_normals(normals, vertical, horizontal, tolerance=0.001):
+    """
+    Разделить нормали граней на параллельные vertical, параллельные horizontal и верх/низ
+
+    Считается в числах, без обращения к XYZ для каждой грани
+
+    :param normals: Плоский массив нормалей из extract_normals
+    :type normals: array
+    :type vertical: DB.XYZ
+    :type horizontal: DB.XYZ
+    :return: Индексы вертикальных и горизонтальных граней и индекс первой неортогональной грани или None
+    :rtype: (list[int], list[int], int or None)
+    """
+
+    vx, vy, vz = vertical.X, vertical.Y, vertical.Z
+    hx, hy, hz = horizontal.X, horizontal.Y, horizontal.Z
+
+    vertical_faces = []
+    horizontal_faces = []
+    for i, (x, y, z) in enumerate(zip(normals[0::3], normals[1::3], normals[2::3])):
+        if is_parallel(x, y, z, vx, vy, vz, tolerance):
+            vertical_faces.append(i)
+        elif is_parallel(x, y, z, hx, hy, hz, tolerance):
+            horizontal_faces.append(i)
+        elif abs(round(z, 3)) != 1:
+            return vertical_faces, horizontal_faces, i
+
+    return vertical_faces, horizontal_faces, None
+
+
+class CachedFace:
+    """
+    Грань колонны, восстановленная из кэша
+
+    Нормаль и начало грани берутся из кэша, от самой грани нужна только ссылка
+    """
+
+    def __init__(self, face, normal, origin):
+        self.face = face
+        self.FaceNormal = normal
+        self.Origin = origin
+
+    @property
+    def Reference(self):
+        return self.face.Reference
+
+
+class FaceClassification:
+    """
+    Классификация граней одного типа колонны в одной ориентации
+
+    Индексы граней в solid.Faces, их нормали и смещения начала грани от точки вставки колонны
+    """
+
+    def __init__(self, count, vertical, horizontal, normals, offsets):
+        self.count = count
+        self.vertical = vertical
+        self.horizontal = horizontal
+        self.normals = normals
+        self.offsets = offsets
+
+    def matches(self, faces, tolerance=0.001):
+        """
+        Грани экземпляра под теми же индексами имеют те же нормали
+
+        Порядок граней в геометрии не гарантирован: соединения и вырезы могут
+        поменять его без изменения числа граней
+
+        :type faces: DB.FaceArray
+        :rtype: bool
+        """
+
+        if faces.Size != self.count:
+            return False
+
+        for i in self.vertical + self.horizontal:
+            normal, cached = faces[i].FaceNormal, self.normals[i]
+            if (abs(normal.X - cached.X) > tolerance or
+                    abs(normal.Y - cached.Y) > tolerance or
+                    abs(normal.Z - cached.Z) > tolerance):
+                return False
+        return True
+
+
+class FaceCache:
+    """
+    Кэш классификации граней колонн по типу и ориентации
+
+    Колонны одного типа и одной ориентации имеют одинаковые нормали граней,
+    а начала граней отличаются только переносом на точку вставки
+    """
+
+    def __init__(self):
+        self._data = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(column):
+        facing = column.FacingOrientation
+        hand = column.HandOrientation
+        return (column.Symbol.Id.IntegerValue,
+                round(facing.X, 3), round(facing.Y, 3), round(facing.Z, 3),
+                round(hand.X, 3), round(hand.Y, 3), round(hand.Z, 3))
+
+    def get(self, key, faces):
+        """
+        Получить классификацию граней или None
+
+        Если число граней у экземпляра другое или нормали граней под сохраненными
+        индексами не совпадают (например колонна подрезана), кэш не используется
+
+        :type key: tuple
+        :type faces: DB.FaceArray
+        :rtype: FaceClassification or None
+        """
+
+        classification = self._data.get(key)
+        if classification is not None and classification.matches(faces):
+            self.hits += 1
+            return classification
+
+        self.misses += 1
+
+    def add(self, key, classification):
+        """Запомнить классификацию. Первая классификация ключа не перезаписывается"""
+
+        self._data.setdefault(key, classification)
+
+    def __str__(self):
+        return 'Face cache: {} hits, {} misses, {} types'.format(self.hits, self.misses, len(self._data))
+
+
 class ColumnEdge:
-    def __init__(self, column):
+    _option = None
+
+    def __init__(self, column, face_cache=None):
         self.column = column
         self.vertical = column.FacingOrientation
         self.horizontal = column.HandOrientation
+        self.face_cache = face_cache
 
         self._fill_faces()
 
     def _fill_faces(self):
         faces = self._get_faces()
-        vertical_faces = []
-        horizontal_faces = []
+        point = get_location_point(self.column)
 
-        for face in faces:
-            normal = face.FaceNormal
+        # У наклонной колонны смещения граней зависят от длины и уклона, кэш по типу к ней не подходит
+        if self.face_cache is None or isinstance(self.column.Location, DB.LocationCurve):
+            classification = self._classify_faces(faces, point)
+        else:
+            key = self.face_cache.get_key(self.column)
+            classification = self.face_cache.get(key, faces)
+            if classification is None:
+                classification = self._classify_faces(faces, point)
+                self.face_cache.add(key, classification)
 
-            if self._is_parallel(normal, self.vertical):
-                vertical_faces.append(face)
+        self.vertical_faces = [self._restore_face(faces, i, classification, point) for i in classification.vertical]
+        self.horizontal_faces = [self._restore_face(faces, i, classification, point) for i in classification.horizontal]
 
-            elif self._is_parallel(normal, self.horizontal):
-                horizontal_faces.append(face)
+    def _classify_faces(self, faces, point):
+        normals = extract_normals(faces)
+        vertical_faces, horizontal_faces, not_orto = classify_normals(normals, self.vertical, self.horizontal)
+        if not_orto is not None:
+            raise FacesNotOrto(str(faces[not_orto].FaceNormal))
 
-            elif abs(round(face.FaceNormal.Z, 3)) == 1:
-                pass
-            else:
-                raise FacesNotOrto(str(face.FaceNormal))
+        vertical_faces, horizontal_faces = vertical_faces[:2], horizontal_faces[:2]
+
+        normals_xyz = {}
+        offsets = {}
+        for i in vertical_faces + horizontal_faces:
+            normals_xyz[i] = DB.XYZ(normals[3 * i], normals[3 * i + 1], normals[3 * i + 2])
+            offsets[i] = faces[i].Origin - point
+
+        logging.debug('Faces was classified')
+        return FaceClassification(faces.Size, vertical_faces, horizontal_faces, normals_xyz, offsets)
 
-        self.vertical_faces = vertical_faces[:2]
-        self.horizontal_faces = horizontal_faces[:2]
+    @staticmethod
+    def _restore_face(faces, index, classification, point):
+        return CachedFace(faces[index], classification.normals[index], point + classification.offsets[index])
 
     @staticmethod
     def _is_parallel(first, second):
-        prod = first.CrossProduct(second)
-        res = prod.IsAlmostEqualTo(DB.XYZ.Zero, 0.001)
-        return res
+        return is_parallel(first.X, first.Y, first.Z, second.X, second.Y, second.Z)
 
     def _get_faces(self):
         solid = self._get_solid()
@@ -185,7 +376,7 @@ class ColumnEdge:
         return faces
 
     def _get_solid(self):
-        opt = self.create_option()
+        opt = self.get_option()
         geometry = self.column.get_Geometry(opt)
 
         for elem in geometry:
@@ -195,6 +386,12 @@ class ColumnEdge:
 
         raise ScriptError('Valid solid not found {}')
 
+    @classmethod
+    def get_option(cls):
+        if cls._option is None:
+            cls._option = cls.create_option()
+        return cls._option
+
     def get_parallel_faces_by_dir(self, direct):
         if self._is_parallel(direct, self.vertical):
             logging.debug('Get {} horizontal faces for element as parallel'.format(len(self.horizontal_faces)))
@@ -258,9 +455,117 @@ class ColumnEdge:
         raise ScriptError('Face for outline not found')
 
 
+class GridIndex:
+    """
+    Индекс осей документа по имени
+
+    Строится один раз за запуск одним проходом коллектора по осям и составным осям.
+    Для составных осей заранее сохраняются сегменты вместе с их кривыми,
+    а при первом поиске строится пространственный индекс сегментов
+    """
+
+    def __init__(self, document):
+        self.grids = {}
+        self.multi_grids = {}
+        self.multi_segments = {}
+        self.segment_indexes = {}
+
+        self._fill(document)
+
+    def _fill(self, document):
+        categories = List[DB.BuiltInCategory]([DB.BuiltInCategory.OST_Grids, DB.BuiltInCategory.OST_GridChains])
+        filter_cat = DB.ElementMulticategoryFilter(categories)
+        collector = DB.FilteredElementCollector(document).WherePasses(filter_cat).WhereElementIsNotElementType()
+
+        grids_by_id = {}
+        multi_grids = []
+        for elem in collector:
+            if isinstance(elem, DB.MultiSegmentGrid):
+                multi_grids.append(elem)
+                self.multi_grids.setdefault(elem.Name, elem)
+            else:
+                grids_by_id[elem.Id.IntegerValue] = elem
+                self.grids.setdefault(elem.Name, elem)
+
+        for multi_grid in multi_grids:
+            segments = []
+            for grid_id in multi_grid.GetGridIds():
+                grid = grids_by_id.get(grid_id.IntegerValue)
+                if grid is not None:
+                    segments.append((grid, grid.Curve))
+            self.multi_segments[multi_grid.Id.IntegerValue] = segments
+
+        self.location_marks = LocationMarkParser(set(self.grids) | set(self.multi_grids))
+
+        logging.debug('Grid index: {} grids, {} multi-grids'.format(len(self.grids), len(self.multi_grids)))
+
+    def get_grid(self, name):
+        if name in self.grids:
+            logging.debug('Elements with name {} was found'.format(name))
+            return self.grids[name]
+
+        raise ElemNotFound('Not found. Element with name "{}" and category "{}"'.format(
+            name, DB.BuiltInCategory.OST_Grids))
+
+    def get_multi_grid(self, name):
+        if name in self.multi_grids:
+            logging.debug('Elements with name {} was found'.format(name))
+            return self.multi_grids[name]
+
+        raise ElemNotFound('Not found. Element with name "{}" and category "{}"'.format(
+            name, DB.BuiltInCategory.OST_GridChains))
+
+    def get_segments(self, multi_grids):
+        """
+        Сегменты составной оси с заранее полученными кривыми
+
+        :type multi_grids: DB.MultiSegmentGrid
+        :rtype: list[(DB.Grid, DB.Curve)]
+        """
+
+        segments = self.multi_segments[multi_grids.Id.IntegerValue]
+
+        logging.debug('Multi-grids was divided by {}'.format(len(segments)))
+        return segments
+
+    def find_nearest(self, multi_grids, point):
+        """
+        Ближайший к точке сегмент составной оси
+
+        :type multi_grids: DB.MultiSegmentGrid
+        :type point: DB.XYZ
+        :rtype: DB.Grid
+        """
+
+        key = multi_grids.Id.IntegerValue
+        if key not in self.segment_indexes:
+            self.segment_indexes[key] = self._create_segment_index(self.get_segments(multi_grids))
+
+        return self.segment_indexes[key].nearest(point.X, point.Y)
+
+    @staticmethod
+    def _create_segment_index(segments):
+        """
+        Индекс по плоским отрезкам сегментов, дуги заменяются ломаной
+
+        :type segments: list[(DB.Grid, DB.Curve)]
+        :rtype: SegmentIndex
+        """
+
+        lines = []
+        for grid, curve in segments:
+            points = list(curve.Tessellate())
+            for start, end in zip(points, points[1:]):
+                lines.append((start.X, start.Y, end.X, end.Y, grid))
+
+        logging.debug('Segment index for {} lines'.format(len(lines)))
+        return SegmentIndex(lines)
+
+
 class AxlesColumn:
-    def __init__(self, column):
+    def __init__(self, column, grid_index=None):
         self.column = column
+        self.grid_index = grid_index or GridIndex(doc)
 
     def get_axles(self):
         axis = self._get_axis()
@@ -287,75 +592,40 @@ class AxlesColumn:
         axles_names = self._find_axles_name(axis_param.AsString())
         return axles_names
 
-    @staticmethod
-    def _find_axles_name(value):
-        REGEX = r"(.+?)(?:\([\d-]+?\))??-([\w/]+)(?:\([\d-]+?\))?"
-        result = findall(REGEX, value)[0]
+    def _find_axles_name(self, value):
+        result = self.grid_index.location_marks.parse(value)
 
         logging.debug('Get axis name: "{}"'.format(result))
         return result
 
     def get_axis_by_name(self, name):
         try:
-            multi_grids = self._get_elem_by_name_and_cat(name, DB.BuiltInCategory.OST_GridChains)
+            multi_grids = self.grid_index.get_multi_grid(name)
             grid = self.find_nearest_grid(multi_grids)
             return grid
 
         except ElemNotFound:
             logging.debug('Multi-grids with name {} not found'.format(name))
-            grid = self._get_elem_by_name_and_cat(name, DB.BuiltInCategory.OST_Grids)
+            grid = self.grid_index.get_grid(name)
             return grid
 
-    @staticmethod
-    def _get_elem_by_name_and_cat(name, category):
-        collector = DB.FilteredElementCollector(doc)
-        elems = collector.OfCategory(category).WhereElementIsNotElementType()
-        for elem in elems:
-            if elem.Name == name:
-                logging.debug('Elements with name {} was found'.format(name))
-                return elem
-
-        raise ElemNotFound('Not found. Element with name "{}" and category "{}"'.format(name, category))
-
     def find_nearest_grid(self, multi_grids):
-        grids = self.get_grids_by_multi(multi_grids)
-        origin = self.column.Location.Point
+        origin = get_location_point(self.column)
 
-        nearest_grid = self._find_nearest_grid(grids, origin)
+        nearest_grid = self.grid_index.find_nearest(multi_grids, origin)
 
         logging.debug('Nearest grid for {} was found'.format(multi_grids.Name))
         return nearest_grid
 
-    @staticmethod
-    def _find_nearest_grid(grids, point):
-        def compare(grid):
-            line = grid.Curve
-            distance = line.Distance(point)
-            return distance
-
-        nearest = min(grids, key=compare)
-
-        return nearest
-
-    @staticmethod
-    def get_grids_by_multi(multi_grids):
-        grids = []
-        for grid_id in multi_grids.GetGridIds():
-            grid = doc.GetElement(grid_id)
-            grids.append(grid)
-
-        logging.debug('Multi-grids was divided by {}'.format(len(grids)))
-        return grids
-
 
 class Dim2TextPosition:
-    def __init__(self, dimension, k_space=1, k_shift_space=0.8):
+    def __init__(self, dimension, k_space=1, k_shift_space=0.8, text_ratio=None):
         self.dimension = dimension
         self.left, self.right = self.find_side_dims(dimension)
         self.direction = (self.left.Origin - self.right.Origin).Normalize()
         self.k_space = k_space
         self.k_shift_space = k_shift_space
-        self._text_ratio = None
+        self._text_ratio = text_ratio
 
     @staticmethod
     def find_side_dims(dimension):
@@ -419,56 +689,169 @@ class Dim2TextPosition:
         return width
 
 
+class DimPlan:
+    """
+    План размерной линии для пары колонна - ось
+
+    Заполняется до создания размеров, чтобы создать их все подряд
+    без регенерации между шагами
+    """
+
+    def __init__(self, column, grid, ref_arr, out_line):
+        self.column = column
+        self.grid = grid
+        self.ref_arr = ref_arr
+        self.out_line = out_line
+        self.dimension = None
+
+
 @transaction
 def main():
     columns = get_columns()
+    grid_index = GridIndex(doc)
+    face_cache = FaceCache()
+
+    plans = plan_dims_for_columns(columns, K_OFFSET, grid_index, face_cache)
+    dims = create_dims_by_plans(plans, doc.ActiveView)
+
+    doc.Regenerate()
+    update_text_positions(plans, K_SPACE, K_SHIFT_SPACE)
+
+    logging.info('Create {} dimension for {} columns '.format(len(dims), len(columns)))
+    logging.info(face_cache)
+    logging.info(grid_index.location_marks)
+
+
+def plan_dims_for_columns(columns, k_offset=4, grid_index=None, face_cache=None):
+    """
+    Подготовить размерные линии для всех колонн
+
+    :type columns: list[DB.FamilyInstance]
+    :type k_offset: float
+    :type grid_index: GridIndex
+    :type face_cache: FaceCache
+    :rtype: list[DimPlan]
+    """
+
+    grid_index = grid_index or GridIndex(doc)
+    face_cache = face_cache or FaceCache()
+
+    plans = []
     for column in columns:
         try:  # TODO Переписать нормально. Без try или не в этом месте
-            create_dim_for_column(column, K_OFFSET, K_SPACE, K_SHIFT_SPACE)
+            plans.extend(plan_dims_for_column(column, k_offset, grid_index, face_cache))
         except Exception as err:
             logging.error(err)
 
-    logging.info('Create dimension for {} columns '.format(len(columns)))
+    logging.debug('Plan {} dimension for {} columns'.format(len(plans), len(columns)))
+    return plans
 
 
-def create_dim_for_column_and_grid(column, grid, k_offset=4):
+def plan_dims_for_column(column, k_offset=4, grid_index=None, face_cache=None):
+    grids = AxlesColumn(column, grid_index).get_axles()
+    try:
+        edge = ColumnEdge(column, face_cache)
+    except FacesNotOrto:
+        logging.error('#{} Column. Problem with face in {}-{} '.format(column.Id, grids[0].Name, grids[1].Name))
+        return []
+
+    plans = []
+    for grid in grids:
+        try:
+            plan = plan_dim_for_edge_and_grid(edge, grid, k_offset)
+        except FacesNotOrto:
+            logging.error('Problem with face for {} in {}-{} '.format(
+                grid.Name, grids[0].Name, grids[1].Name))
+            continue
+
+        plans.append(plan)
 
+    logging.debug('#{} Column. Plan {} dimension'.format(column.Id, len(plans)))
+    return plans
+
+
+def plan_dim_for_edge_and_grid(edge, grid, k_offset=4):
     direction = grid.Curve.Direction
-    edge = ColumnEdge(column)
 
     ref_arr = edge.create_reference_arr_by_dir(direction)
     ref_arr.Append(DB.Reference(grid))
 
     out_line = edge.get_out_line_by_dir_and_offset(direction, k_offset)
 
-    dim = doc.Create.NewDimension(doc.ActiveView, out_line, ref_arr)
-
-    logging.debug('Create dimension: ' + dim.Name)
-    return dim
+    return DimPlan(edge.column, grid, ref_arr, out_line)
 
 
-def create_dim_for_column(column, k_offset=4, k_space=1, k_shift_space=0.8):
+def create_dims_by_plans(plans, view):
+    """
+    Создать размеры по подготовленным планам
 
-    grids = AxlesColumn(column).get_axles()
+    :type plans: list[DimPlan]
+    :type view: DB.View
+    :return: Созданные размеры
+    :rtype: list[DB.Dimension]
+    """
 
     dims = []
-    for grid in grids:
+    for plan in plans:
         try:
-            dim = create_dim_for_column_and_grid(column, grid, k_offset)
-        except FacesNotOrto:
-            logging.error('Problem with face for {} in {}-{} '.format(
-                grid.Name, grids[0].Name, grids[1].Name))
+            plan.dimension = doc.Create.NewDimension(view, plan.out_line, plan.ref_arr)
+        except Exception as err:
+            logging.error('#{} Column. Dimension to {} not created: {}'.format(plan.column.Id, plan.grid.Name, err))
             continue
 
-        dims.append(dim)
+        dims.append(plan.dimension)
+        logging.debug('Create dimension: ' + plan.dimension.Name)
+
+    return dims
+
+
+def update_text_positions(plans, k_space=1, k_shift_space=0.8):
+    """
+    Сместить текст у всех созданных размеров за один проход
+
+    Ширина текста считается один раз для каждого типа размера
+
+    :type plans: list[DimPlan]
+    :type k_space: float
+    :type k_shift_space: float
+    """
+
+    text_ratios = {}
+    for plan in plans:
+        dim = plan.dimension
+        if dim is None:
+            continue
 
         # TODO add 1 segment
-        if dim.Segments.Size == 2:
-            text_position = Dim2TextPosition(dim, k_space, k_shift_space)
+        if dim.Segments.Size != 2:
+            logging.error('Dim for column #{} have 1 segments for {}'.format(plan.column.Id, plan.grid.Name))
+            continue
+
+        type_id = dim.GetTypeId().IntegerValue
+        try:
+            text_position = Dim2TextPosition(dim, k_space, k_shift_space, text_ratios.get(type_id))
             text_position.update()
-        else:
-            logging.error('Dim for column at axles {}-{} have 1 segments for {}'.format(
-                grids[0].Name, grids[1].Name, grid.Name))
+        except Exception as err:
+            logging.error('#{} Column. Text of dimension to {} not moved: {}'.format(
+                plan.column.Id, plan.grid.Name, err))
+            continue
+
+        text_ratios[type_id] = text_position.text_ratio
+
+
+def create_dim_for_column_and_grid(column, grid, k_offset=4):
+    plan = plan_dim_for_edge_and_grid(ColumnEdge(column), grid, k_offset)
+    dim = doc.Create.NewDimension(doc.ActiveView, plan.out_line, plan.ref_arr)
+
+    logging.debug('Create dimension: ' + dim.Name)
+    return dim
+
+
+def create_dim_for_column(column, k_offset=4, k_space=1, k_shift_space=0.8, grid_index=None):
+
+    plans = plan_dims_for_column(column, k_offset, grid_index)
+    dims = create_dims_by_plans(plans, doc.ActiveView)
+    update_text_positions(plans, k_space, k_shift_space)
 
     logging.debug('#{} Column. Create {} dimension'.format(column.Id, len(dims)))
 
@@ -0,0 +1,91 @@
+# coding=utf-8
+""" Разбор параметра "Отметка колонны" (COLUMN_LOCATION_MARK)
+
+    Значение имеет вид <ось>[(смещение)]-<ось>[(смещение)], например "Б-3", "Б(-300)-3(150)".
+    Имена осей сами могут содержать "-" ("10-5"), поэтому разделитель ищется
+    среди известных имен осей, а не жадным регулярным выражением.
+
+    Модуль не зависит от Revit API
+"""
+
+import re
+
+
+_OFFSET = re.compile(r"\([^()]*\)")
+_LEGACY = re.compile(r"(.+?)(?:\([\d-]+?\))??-([\w/]+)(?:\([\d-]+?\))?")
+_SEPARATOR = '-'
+
+
+class LocationMarkError(ValueError):
+    """Значение отметки колонны не удалось разобрать"""
+    pass
+
+
+class LocationMarkParser:
+    """
+    Разбор отметки колонны на пару имен осей
+
+    Результат запоминается по значению отметки: у колонн одного ряда отметка одинаковая
+    """
+
+    def __init__(self, known_names=()):
+        self.known_names = frozenset(known_names)
+        self._cache = {}
+
+    def parse(self, value):
+        """
+        Получить имена осей из отметки колонны
+
+        :param value: Значение COLUMN_LOCATION_MARK
+        :type value: str
+        :return: Имена двух осей
+        :rtype: (str, str)
+        """
+
+        try:
+            return self._cache[value]
+        except KeyError:
+            pass
+
+        result = self._parse(value)
+        self._cache[value] = result
+        return result
+
+    def _parse(self, value):
+        clean = _OFFSET.sub('', value).strip()
+
+        splits = list(self._iter_splits(clean))
+        if not splits:
+            raise LocationMarkError('Location mark "{}" not valid'.format(value))
+
+        known = self.known_names
+        for first, second in splits:
+            if first in known and second in known:
+                return first, second
+
+        for first, second in splits:
+            if first in known or second in known:
+                return first, second
+
+        return self._parse_legacy(value)
+
+    @staticmethod
+    def _iter_splits(value):
+        start = value.find(_SEPARATOR, 1)
+        while start != -1:
+            first, second = value[:start].strip(), value[start + 1:].strip()
+            if first and second:
+                yield first, second
+            start = value.find(_SEPARATOR, start + 1)
+
+    @staticmethod
+    def _parse_legacy(value):
+        """Старый разбор отметки, когда имена осей неизвестны"""
+
+        result = _LEGACY.findall(value)
+        if not result:
+            raise LocationMarkError('Location mark "{}" not valid'.format(value))
+        return result[0]
+
+    def __str__(self):
+        return 'Location marks: {} parsed, {} grid names'.format(len(self._cache), len(self.known_names))
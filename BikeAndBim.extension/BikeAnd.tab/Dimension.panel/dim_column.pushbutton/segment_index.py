@@ -0,0 +1,128 @@
+# coding=utf-8
+""" Пространственный индекс отрезков на плоскости XY
+
+    Равномерная сетка ячеек: каждый отрезок записывается во все ячейки,
+    которые пересекает его габарит. Поиск ближайшего отрезка идет кольцами ячеек
+    от точки запроса и останавливается, как только следующее кольцо не может
+    дать отрезок ближе найденного.
+
+    Модуль не зависит от Revit API
+"""
+
+import math
+
+
+LINEAR_SEARCH_LIMIT = 16  # до такого числа отрезков быстрее перебрать все
+
+
+def distance_to_segment(x, y, x1, y1, x2, y2):
+    """Расстояние от точки до отрезка"""
+
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    if length:
+        t = ((x - x1) * dx + (y - y1) * dy) / length
+        t = max(0.0, min(1.0, t))
+        x1, y1 = x1 + t * dx, y1 + t * dy
+    return math.hypot(x - x1, y - y1)
+
+
+class SegmentIndex:
+    """
+    Индекс отрезков для поиска ближайшего к точке
+
+    Каждому отрезку соответствует значение (например ось), его и возвращает поиск
+    """
+
+    def __init__(self, segments):
+        """
+        :param segments: Отрезки в виде (x1, y1, x2, y2, value)
+        :type segments: list[(float, float, float, float, object)]
+        """
+
+        self.segments = list(segments)
+        self.cells = {}
+        self.cell_size = 1.0
+        self.bounds = (0, 0, 0, 0)
+
+        if len(self.segments) > LINEAR_SEARCH_LIMIT:
+            self._fill()
+
+    def _fill(self):
+        min_x = min(min(s[0], s[2]) for s in self.segments)
+        min_y = min(min(s[1], s[3]) for s in self.segments)
+        max_x = max(max(s[0], s[2]) for s in self.segments)
+        max_y = max(max(s[1], s[3]) for s in self.segments)
+
+        extent = max(max_x - min_x, max_y - min_y) or 1.0
+        self.cell_size = extent / math.sqrt(len(self.segments))
+
+        for number, (x1, y1, x2, y2, _) in enumerate(self.segments):
+            col_min, row_min = self._cell(min(x1, x2), min(y1, y2))
+            col_max, row_max = self._cell(max(x1, x2), max(y1, y2))
+            for col in range(col_min, col_max + 1):
+                for row in range(row_min, row_max + 1):
+                    self.cells.setdefault((col, row), []).append(number)
+
+        cols = [col for col, _ in self.cells]
+        rows = [row for _, row in self.cells]
+        self.bounds = (min(cols), min(rows), max(cols), max(rows))
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def nearest(self, x, y):
+        """
+        Значение ближайшего к точке отрезка
+
+        :type x: float
+        :type y: float
+        :rtype: object
+        """
+
+        if not self.cells:
+            return self._nearest_linear(x, y)
+
+        col, row = self._cell(x, y)
+        col_min, row_min, col_max, row_max = self.bounds
+        max_ring = max(abs(col - col_min), abs(col - col_max), abs(row - row_min), abs(row - row_max))
+
+        best, best_distance = None, float('inf')
+        seen = set()
+        for ring in range(max_ring + 1):
+            for cell in self._ring(col, row, ring):
+                for number in self.cells.get(cell, ()):
+                    if number in seen:
+                        continue
+                    seen.add(number)
+
+                    x1, y1, x2, y2, value = self.segments[number]
+                    distance = distance_to_segment(x, y, x1, y1, x2, y2)
+                    if distance < best_distance:
+                        best, best_distance = value, distance
+
+            if best_distance <= ring * self.cell_size:
+                break
+
+        return best
+
+    def _nearest_linear(self, x, y):
+        best, best_distance = None, float('inf')
+        for x1, y1, x2, y2, value in self.segments:
+            distance = distance_to_segment(x, y, x1, y1, x2, y2)
+            if distance < best_distance:
+                best, best_distance = value, distance
+        return best
+
+    @staticmethod
+    def _ring(col, row, ring):
+        if ring == 0:
+            yield col, row
+            return
+
+        for i in range(-ring, ring + 1):
+            yield col + i, row - ring
+            yield col + i, row + ring
+        for i in range(-ring + 1, ring):
+            yield col - ring, row + i
+            yield col + ring, row + i
@@ -0,0 +1,22 @@
+# coding=utf-8
+import os.path
+import sys
+
+tab_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(tab_path), 'base'))
+
+import hooks
+
+
+def main():
+    lines = hooks.format_stats()
+    if not lines:
+        print('No DocumentChanged hooks in this session')
+        return
+
+    for line in lines:
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# coding=utf-8
+import os.path
+import sys
+import logging
+
+pulldown_path = os.path.split(sys.path[0])[0]
+sys.path.append(pulldown_path)
+
+
+from rebar_presets import RebarPresets
+from visible_rebar import transaction, ScriptError, ElemNotFound
+from pyrevit import forms
+
+
+def main():
+    presets = RebarPresets.for_document()
+    if not presets.names:
+        raise ElemNotFound('Нет сохраненных пресетов видимости арматуры')
+
+    name = forms.SelectFromList.show(presets.names, title='Rebar presets', button_name='Apply preset')
+    if name:
+        apply_preset(presets, name)
+
+
+@transaction(msg='Apply rebar visibility preset')
+def apply_preset(presets, name):
+    presets.apply(name)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        filename=None, level=logging.INFO,
+        format='[%(asctime)s] %(levelname).1s <example>: %(message)s',
+        datefmt='%Y.%m.%d %H:%M:%S')
+
+    try:
+        OUT = main()
+    except ScriptError as e:
+        logging.error(e)
+    except Exception as err:
+        logging.exception('Critical error')
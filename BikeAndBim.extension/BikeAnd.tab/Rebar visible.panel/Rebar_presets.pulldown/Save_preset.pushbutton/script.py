@@ -0,0 +1,39 @@
+# coding=utf-8
+import os.path
+import sys
+import logging
+
+pulldown_path = os.path.split(sys.path[0])[0]
+sys.path.append(pulldown_path)
+
+
+from rebar_presets import RebarPresets, get_selected_views
+from visible_rebar import ScriptError
+from pyrevit import forms
+
+
+def main():
+    presets = RebarPresets.for_document()
+    name = forms.ask_for_string(default='Preset', prompt='Имя пресета видимости арматуры', title='Save preset')
+    if not name:
+        return
+
+    views = get_selected_views()
+    presets.record(name, views)
+    presets.save()
+
+    logging.info('Пресет "{}" сохранен для {} видов'.format(name, len(views)))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        filename=None, level=logging.INFO,
+        format='[%(asctime)s] %(levelname).1s <example>: %(message)s',
+        datefmt='%Y.%m.%d %H:%M:%S')
+
+    try:
+        OUT = main()
+    except ScriptError as e:
+        logging.error(e)
+    except Exception as err:
+        logging.exception('Critical error')
@@ -0,0 +1,210 @@
+# coding=utf-8
+""" Пресеты видимости арматуры по видам
+
+    Пресет хранит для каждого вида Id арматуры, которая показана неперекрытой
+    и показана как тело. Id хранятся отсортированными отрезками подряд идущих
+    значений [начало, длина]: у стержней одного армирования Id обычно идут подряд.
+
+    Файл пресетов - свой для каждого документа, в папке данных pyRevit.
+"""
+
+import io
+import json
+import logging
+import os.path
+import sys
+
+pulldown_path = os.path.dirname(os.path.abspath(__file__))
+panel_path = os.path.dirname(pulldown_path)
+sys.path.append(os.path.join(panel_path, 'Visible_rebar.stack'))
+
+from visible_rebar import DB, doc, get_all_rebar_on_view, set_rebars_visibility_on_view
+from selection import get_selected
+from files import write_text
+
+from pyrevit import script
+
+
+def encode_ids(ids):
+    """
+    Отсортированные Id отрезками подряд идущих значений
+
+    :param ids: Целые Id
+    :type ids: list[int]
+    :return: Отрезки [начало, длина]
+    :rtype: list[list[int]]
+    """
+
+    runs = []
+    for value in sorted(set(ids)):
+        if runs and runs[-1][0] + runs[-1][1] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+    return runs
+
+
+def decode_ids(runs):
+    """
+    :param runs: Отрезки [начало, длина]
+    :type runs: list[list[int]]
+    :return: Целые Id
+    :rtype: set[int]
+    """
+
+    return set(start + i for start, length in runs for i in range(length))
+
+
+class RebarPresets(object):
+    """
+    Пресеты документа
+
+    Формат файла:
+        {"<имя пресета>": {"<int Id вида>": {"unobscured": [[начало, длина], ...],
+                                             "solid": [[начало, длина], ...]}}}
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Путь к json-файлу пресетов
+        :type path: str
+        """
+
+        self.path = path
+        self.presets = self.read(path)
+        self.changed = False
+
+    @classmethod
+    def for_document(cls):
+        """
+        :rtype: RebarPresets
+        """
+
+        return cls(script.get_document_data_file('rebar_presets', 'json'))
+
+    @staticmethod
+    def read(path):
+        if not os.path.isfile(path):
+            return {}
+
+        try:
+            with io.open(path, encoding='utf-8') as presets_file:
+                return json.load(presets_file)
+        except (ValueError, IOError) as err:
+            logging.error('Файл пресетов <{}> не прочитан: {}'.format(path, err))
+            return {}
+
+    @property
+    def names(self):
+        return sorted(self.presets)
+
+    def record(self, name, views):
+        """
+        Записать в пресет текущую видимость арматуры на видах
+
+        Виды, которые уже есть в пресете, перезаписываются, остальные сохраняются
+
+        :param name: Имя пресета
+        :type name: str
+        :param views: Виды
+        :type views: list[DB.View]
+        """
+
+        preset = self.presets.setdefault(name, {})
+        for view in views:
+            preset[str(view.Id.IntegerValue)] = get_view_state(view, get_all_rebar_on_view(view.Id))
+            logging.debug('Пресет "{}": записан вид "{}" #{}'.format(name, view.Name, view.Id))
+
+        self.changed = True
+
+    def apply(self, name):
+        """
+        Применить пресет ко всем его видам, которые есть в документе. Нужна открытая транзакция
+
+        :param name: Имя пресета
+        :type name: str
+        :return: Число видов
+        :rtype: int
+        """
+
+        count = 0
+        for view_id, state in sorted(self.presets[name].items()):
+            view = doc.GetElement(DB.ElementId(int(view_id)))
+            if view is None:
+                logging.warning('Пресет "{}": вид #{} не найден'.format(name, view_id))
+                continue
+
+            apply_view_state(view, get_all_rebar_on_view(view.Id), state)
+            count += 1
+
+        logging.info('Пресет "{}" применен к {} видам'.format(name, count))
+        return count
+
+    def delete(self, name):
+        if self.presets.pop(name, None) is not None:
+            self.changed = True
+
+    def save(self):
+        """Записать файл, если пресеты менялись"""
+
+        if not self.changed:
+            return False
+
+        write_text(self.path, json.dumps(self.presets, ensure_ascii=False, sort_keys=True))
+
+        self.changed = False
+        logging.debug('Записан файл пресетов <{}>'.format(self.path))
+        return True
+
+
+def get_view_state(view, rebars):
+    """
+    Видимость арматуры на виде
+
+    :type view: DB.View
+    :param rebars: Арматура на виде
+    :type rebars: list[DB.Structure.Rebar]
+    :return: Отрезки Id неперекрытой арматуры и арматуры, показанной телом
+    :rtype: dict
+    """
+
+    unobscured = [rebar.Id.IntegerValue for rebar in rebars if rebar.IsUnobscuredInView(view)]
+
+    solid = []
+    if view.ViewType == DB.ViewType.ThreeD:
+        solid = [rebar.Id.IntegerValue for rebar in rebars if rebar.IsSolidInView(view)]
+
+    return {'unobscured': encode_ids(unobscured), 'solid': encode_ids(solid)}
+
+
+def apply_view_state(view, rebars, state):
+    """
+    Установить видимость арматуры на виде по пресету. Меняется только отличающаяся арматура
+
+    :type view: DB.View
+    :param rebars: Арматура на виде
+    :type rebars: list[DB.Structure.Rebar]
+    :param state: Состояние вида из пресета
+    :type state: dict
+    """
+
+    for key, option in (('unobscured', 'visible'), ('solid', 'solid')):
+        ids = decode_ids(state.get(key, []))
+
+        shown, hidden = [], []
+        for rebar in rebars:
+            (shown if rebar.Id.IntegerValue in ids else hidden).append(rebar)
+
+        set_rebars_visibility_on_view(shown, view, **{option: True})
+        set_rebars_visibility_on_view(hidden, view, **{option: False})
+
+
+def get_selected_views():
+    """
+    Выбранные виды, а если их нет - активный вид
+
+    :rtype: list[DB.View]
+    """
+
+    views = [elem for elem in get_selected() if isinstance(elem, DB.View) and not elem.IsTemplate]
+    return views or [doc.ActiveView]
@@ -0,0 +1,42 @@
+# coding=utf-8
+import os.path
+import sys
+import logging
+
+panel_path = os.path.split(sys.path[0])[0]
+sys.path.append(os.path.join(panel_path, 'Visible_rebar.stack'))
+
+
+from visible_rebar import unobscured_all_rebars_on_views, get_target_views, transaction, ScriptError
+from pyrevit import forms
+
+
+@transaction(msg='Change visible all rebar on views')
+def main():
+    visible = solid = True
+    if __shiftclick__:
+        visible = solid = False
+
+    views = get_target_views()
+    with forms.ProgressBar(title='Rebar visibility: {value} of {max_value} views', cancellable=True) as progress:
+
+        def report(done, count):
+            progress.update_progress(done, count)
+            return not progress.cancelled
+
+        done = unobscured_all_rebars_on_views(views, visible, solid, progress=report)
+        progress.update_progress(done, len(views))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        filename=None, level=logging.INFO,
+        format='[%(asctime)s] %(levelname).1s <example>: %(message)s',
+        datefmt='%Y.%m.%d %H:%M:%S')
+
+    try:
+        OUT = main()
+    except ScriptError as e:
+        logging.error(e)
+    except Exception as err:
+        logging.exception('Critical error')
@@ -2,7 +2,7 @@
 import os.path
 import sys
 
-stack_path = os.path.split(sys.path[0])[0]
+stack_path = os.path.dirname(os.path.abspath(__file__))
 panel_path = os.path.split(stack_path)[0]
 tab_path = os.path.split(panel_path)[0]
 ext_path = os.path.split(tab_path)[0]
@@ -11,11 +11,17 @@ sys.path.append(base_path)
 
 
 from wrapper import DB, UI, doc, uidoc, transaction, ScriptError, SheetsNotSelected, ElemNotFound
-from selection import get_selected_by_cat
+from selection import get_selected, get_selected_by_cat
 
 import logging
 
 
+# Виды, на которых у арматуры есть <Состояние видимости вида>
+REBAR_VIEW_TYPES = (DB.ViewType.ThreeD, DB.ViewType.FloorPlan, DB.ViewType.CeilingPlan,
+                    DB.ViewType.EngineeringPlan, DB.ViewType.AreaPlan, DB.ViewType.Elevation,
+                    DB.ViewType.Section, DB.ViewType.Detail)
+
+
 @transaction
 def main():
     # rebar = UnwrapElement(IN[4])
@@ -40,34 +46,198 @@ def unobscured_all_rebars_on_view(view, visible=True, solid=None):
     :type solid: bool
     """
 
-    count = 0
     rebars = get_all_rebar_on_view(view.Id)
-    for rebar in rebars:
-        unobscured_rebar_on_view(rebar, view, visible=visible)
+    set_rebars_visibility_on_view(rebars, view, visible=visible, solid=solid)
+
+    logging.info('У {} арматурных элементов теперь видимость <{}> на виде "{}" #{}'.format(
+        len(rebars), visible, view.Name, view.Id))
 
-        if view.ViewType == DB.ViewType.ThreeD and solid is not None:
-            solid_rebar_on_view(rebar, view, solid=solid)
 
+def unobscured_all_rebars_on_views(views, visible=True, solid=None, progress=None):
+    """
+    Переопределить видимость всей арматуры на нескольких видах
+
+    Арматура собирается один раз на весь документ, на каждом виде меняется
+    только видимая на нем, как при запуске для одного вида. Нужна открытая
+    транзакция, одна на все виды
+
+    :param views: Виды
+    :type views: list[DB.View]
+    :param visible: Видимость
+    :type visible: bool
+    :param solid: Показать как тело
+    :type solid: bool
+    :param progress: Функция (обработано видов, всего видов). Если вернет False - остальные виды пропускаются
+    :return: Число обработанных видов
+    :rtype: int
+    """
+
+    rebars = dict((rebar.Id.IntegerValue, rebar) for rebar in get_all_rebar())
+
+    count = 0
+    changed_count = 0
+    for view in views:
+        if progress is not None and progress(count, len(views)) is False:
+            logging.info('Отменено после {} видов из {}'.format(count, len(views)))
+            break
+
+        view_rebars = [rebars[rebar_id.IntegerValue] for rebar_id in get_rebar_ids_on_view(view.Id)
+                       if rebar_id.IntegerValue in rebars]
+        changed = set_rebars_visibility_on_view(view_rebars, view, visible=visible, solid=solid)
+        logging.debug('Вид "%s" #%s: изменено %s арматуры, %s тел', view.Name, view.Id, *changed)
+        changed_count += changed[0]
         count += 1
 
-    logging.info('У {} арматурных элементов теперь видимость <{}> на виде "{}" #{}'.format(
-        count, visible, view.Name, view.Id))
+    logging.info('У {} арматурных элементов изменена видимость на <{}> на {} видах'.format(
+        changed_count, visible, count))
+    return count
+
+
+def get_target_views():
+    """
+    Выбранные виды и 3D виды на выбранных листах. Если ничего не выбрано - активный вид
+
+    Виды, на которых видимость арматуры не переопределяется (REBAR_VIEW_TYPES), пропускаются
+
+    :rtype: list[DB.View]
+    """
+
+    views = []
+    for elem in get_selected():
+        if not isinstance(elem, DB.View) or elem.IsTemplate:
+            continue
+
+        if elem.ViewType == DB.ViewType.DrawingSheet:
+            for view_id in elem.GetAllPlacedViews():
+                view = doc.GetElement(view_id)
+                if view.ViewType == DB.ViewType.ThreeD:
+                    views.append(view)
+        elif elem.ViewType in REBAR_VIEW_TYPES:
+            views.append(elem)
+        else:
+            logging.debug('Вид "%s" #%s пропущен: %s', elem.Name, elem.Id, elem.ViewType)
+
+    unique = dict((view.Id.IntegerValue, view) for view in views)
+    if unique:
+        return [unique[key] for key in sorted(unique)]
+    return [doc.ActiveView] if doc.ActiveView.ViewType in REBAR_VIEW_TYPES else []
+
+
+def get_all_rebar():
+    """
+    Получить всю арматуру документа
+
+    :return: Экземпляры арматуры
+    :rtype: list[DB.Structure.Rebar]
+    """
+
+    collector = DB.FilteredElementCollector(doc).OfCategory(DB.BuiltInCategory.OST_Rebar)
+    return list(collector.OfClass(DB.Structure.Rebar).WhereElementIsNotElementType())
 
 
 def get_all_rebar_on_view(view_id):
     """
-    Получить всю арматуру на виде. Генератор
+    Получить всю арматуру на виде
 
     :param view_id: id Вида
     :type view_id: DB.ElementId
     :return: Экземпляры арматуры
-    :rtype: DB.Structure.Rebar
+    :rtype: list[DB.Structure.Rebar]
+    """
+
+    collector = DB.FilteredElementCollector(doc, view_id).OfCategory(DB.BuiltInCategory.OST_Rebar)
+    return list(collector.OfClass(DB.Structure.Rebar).WhereElementIsNotElementType())
+
+
+def get_rebar_ids_on_view(view_id):
+    """
+    Id арматуры, видимой на виде
+
+    :param view_id: id Вида
+    :type view_id: DB.ElementId
+    :rtype: list[DB.ElementId]
+    """
+
+    collector = DB.FilteredElementCollector(doc, view_id).OfCategory(DB.BuiltInCategory.OST_Rebar)
+    return list(collector.OfClass(DB.Structure.Rebar).WhereElementIsNotElementType().ToElementIds())
+
+
+def set_rebars_visibility_on_view(rebars, view, visible=None, solid=None):
     """
+    Переопределить <Состояние видимости вида> для группы арматуры
+
+    Состояние всей арматуры читается за один проход, а изменяется только
+    арматура, у которой оно отличается. <Показать как тело> меняется только на 3D виде
 
-    collector = DB.FilteredElementCollector(doc, view_id).OfClass(DB.Structure.Rebar)
-    collector.WhereElementIsNotElementType().ToElements()
-    for rebar in collector:
-        yield rebar
+    :param rebars: Экземпляры арматуры
+    :type rebars: list[DB.Structure.Rebar]
+    :param view: Вид, на котором нужно переопределить
+    :type view: DB.View
+    :param visible: <Показать неперекрытым>. None - не менять
+    :type visible: bool
+    :param solid: <Показать как тело>. None - не менять
+    :type solid: bool
+    :return: Число арматуры с измененной видимостью и с измененным телом
+    :rtype: (int, int)
+    """
+
+    if view.ViewType != DB.ViewType.ThreeD:
+        solid = None
+
+    to_unobscured, to_solid = get_visibility_diff(rebars, view, visible, solid)
+
+    for rebar in to_unobscured:
+        rebar.SetUnobscuredInView(view, visible)
+    for rebar in to_solid:
+        rebar.SetSolidInView(view, solid)
+
+    if to_unobscured:
+        logging.debug('Арматура %s изменила видимость на <%s> на виде "%s" #%s',
+                      ElemIds(to_unobscured), visible, view.Name, view.Id)
+    if to_solid:
+        logging.debug('Арматура %s изменила видимость тела на <%s> на виде "%s" #%s',
+                      ElemIds(to_solid), solid, view.Name, view.Id)
+
+    return len(to_unobscured), len(to_solid)
+
+
+def get_visibility_diff(rebars, view, visible=None, solid=None):
+    """
+    Арматура, состояние которой на виде отличается от нужного
+
+    :param rebars: Экземпляры арматуры
+    :type rebars: list[DB.Structure.Rebar]
+    :type view: DB.View
+    :param visible: <Показать неперекрытым>. None - не проверять
+    :type visible: bool
+    :param solid: <Показать как тело>. None - не проверять
+    :type solid: bool
+    :return: Арматура для изменения видимости и для изменения тела
+    :rtype: (list[DB.Structure.Rebar], list[DB.Structure.Rebar])
+    """
+
+    to_unobscured = []
+    to_solid = []
+    check_visible = visible is not None
+    check_solid = solid is not None
+
+    for rebar in rebars:
+        if check_visible and rebar.IsUnobscuredInView(view) != visible:
+            to_unobscured.append(rebar)
+        if check_solid and rebar.IsSolidInView(view) != solid:
+            to_solid.append(rebar)
+
+    return to_unobscured, to_solid
+
+
+class ElemIds(object):
+    """Id элементов для лога. Строка собирается, только если сообщение действительно пишется"""
+
+    def __init__(self, elems):
+        self.elems = elems
+
+    def __str__(self):
+        return ', '.join('#{}'.format(elem.Id) for elem in self.elems)
 
 
 def unobscured_rebar_on_view(rebar, view, visible=True):
@@ -84,13 +254,7 @@ def unobscured_rebar_on_view(rebar, view, visible=True):
     :type visible: bool
     """
 
-    if rebar.IsUnobscuredInView(view) is not visible:
-        rebar.SetUnobscuredInView(view, visible)
-        logging.debug('Арматура #{} изменила видимость на <{}> на виде "{}" #{}'.format(
-            rebar.Id, visible, view.Name, view.Id))
-    else:
-        logging.debug('Арматура #{} уже имеет видимость <{}> на виде "{}" #{}'.format(
-            rebar.Id, visible, view.Name, view.Id))
+    set_rebars_visibility_on_view([rebar], view, visible=visible)
 
 
 def solid_rebar_on_view(rebar, view, solid=True):
@@ -109,13 +273,7 @@ def solid_rebar_on_view(rebar, view, solid=True):
     :type solid: bool
     """
 
-    if rebar.IsSolidInView(view) is not solid:
-        rebar.SetSolidInView(view, solid)
-        logging.debug('Арматура #{} изменила видимость тела на <{}> на виде "{}" #{}'.format(
-            rebar.Id, solid, view.Name, view.Id))
-    else:
-        logging.debug('Арматура #{} уже имеет видимость тела <{}> на виде "{}" #{}'.format(
-            rebar.Id, solid, view.Name, view.Id))
+    set_rebars_visibility_on_view([rebar], view, solid=solid)
 
 
 '--------------------Second----------------------------'
@@ -133,18 +291,11 @@ def unobscured_all_selected_rebars_on_view(view, visible=False, solid=None):
     :type solid: bool
     """
 
-    count = 0
-    rebars = get_selected_by_cat(DB.BuiltInCategory.OST_Rebar)
-    for rebar in rebars:
-        unobscured_rebar_on_view(rebar, view, visible=visible)
-
-        if view.ViewType == DB.ViewType.ThreeD and solid is not None:
-            solid_rebar_on_view(rebar, view, solid=solid)
-
-        count += 1
+    rebars = get_selected_by_cat(DB.BuiltInCategory.OST_Rebar, as_list=True)
+    set_rebars_visibility_on_view(rebars, view, visible=visible, solid=solid)
 
     logging.info('У {} арматурных элементов теперь видимость <{}> на виде "{}" #{}'.format(
-        count, visible, view.Name, view.Id))
+        len(rebars), visible, view.Name, view.Id))
 
 
 if __name__ == '__main__':
@@ -1,6 +1,14 @@
 # coding=utf-8
 from rpw import revit, db, ui, doc, uidoc, logger, DB, UI
-import string
+import os.path
+import sys
+
+stack_path = os.path.dirname(os.path.abspath(__file__))
+tab_path = os.path.dirname(os.path.dirname(stack_path))
+sys.path.append(os.path.join(os.path.dirname(tab_path), 'base'))
+
+from natural_sort import sort_numbers
+from parameters import get_accessor
 
 
 class ScriptError(Exception):
@@ -19,34 +27,6 @@ class ParamNotFound(ScriptError):
     pass
 
 
-class SortedNumbers:
-    def __init__(self):
-        self.value = []
-
-    def append(self, value):
-        clean_value = self.get_clear_value(value)
-        sort_value = self.get_sort_value(clean_value)
-
-        self.value.append((sort_value, clean_value))
-
-    def get_sorted(self):
-        return list(zip(*sorted(self.value)))[1]
-
-    @staticmethod
-    def get_clear_value(value):
-        return "".join(ch for ch in value if ch.isalnum() or ch in string.punctuation or ch.isspace())
-
-    @staticmethod
-    def get_sort_value(value):
-        res = []
-        for ch in value:
-            if ch.isdigit():
-                res.append(ch)
-            elif res:
-                break
-        return int("".join(res))
-
-
 def fill_id_in_text_note():
     selected_sheet_ids = get_selected_sheet_ids()
     # FixMe
@@ -163,8 +143,9 @@ def get_param_elem_by_name(elem, param_name):
     :return: Параметр
     :rtype: DB.Parameter
     """
-    if elem.GetParameters(param_name):
-        return elem.GetParameters(param_name)[0]
+    param = get_accessor(param_name).get_parameter(elem)
+    if param is not None:
+        return param
 
     raise ParamNotFound('Element #{} do not have parameter {}'.format(elem.Id, param_name))
 
@@ -228,16 +209,16 @@ def get_sheet_numbers_by_sheets(sheets):
 
     :param sheets: Список листов
     :type sheets: DB.Sheets
-    :return: Список с номерами
+    :return: Список с номерами в естественном порядке
     :rtype: list[str]
     """
-    sheet_numbers = SortedNumbers()
+    sheet_numbers = []
 
     for sheet in sheets:
         number_param = get_param_elem_by_bip(sheet, DB.BuiltInParameter.SHEET_NUMBER)
         sheet_numbers.append(number_param.AsString())
 
-    return sheet_numbers.get_sorted()
+    return sort_numbers(sheet_numbers)
 
 
 '----------------------------------------'
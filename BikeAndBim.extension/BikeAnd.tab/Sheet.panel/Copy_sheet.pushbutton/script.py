@@ -4,88 +4,254 @@ from rpw.exceptions import RpwException
 from rpw.utils.dotnet import List
 
 # Get config
-import ConfigParser as configparser
 import os
+import sys
 
 this_folder = os.path.dirname(os.path.abspath(__file__))
-init_file = os.path.join(this_folder, 'config.ini')
-config = configparser.ConfigParser()
-config.read(init_file)
+tab_path = os.path.dirname(os.path.dirname(this_folder))
+sys.path.append(os.path.join(os.path.dirname(tab_path), 'base'))
 
-SHEET_TITLE_FAMILY_NAME = config.get("Sheet", "title_family_name").decode('utf-8')
-SECOND_SHEET_TITLE_FAMILY_NAME = config.get("Sheet", "second_title_family_name").decode('utf-8')
-SHEET_NUMBER_ON_STAMP_NAME = config.get("Sheet", "number_on_stamp_name").decode('utf-8')
+from settings import Settings
+from parameters import ParameterMap, get_accessor
 
-KEYPLAN_FAMILY_NAME = config.get("Keyplan", "family_name").decode('utf-8')
+config = Settings.for_script(__file__)
+
+SHEET_TITLE_FAMILY_NAME = config.get("Sheet", "title_family_name")
+SECOND_SHEET_TITLE_FAMILY_NAME = config.get("Sheet", "second_title_family_name")
+SHEET_NUMBER_ON_STAMP_NAME = config.get("Sheet", "number_on_stamp_name")
+
+KEYPLAN_FAMILY_NAME = config.get("Keyplan", "family_name")
+
+TITLE_BLOCK_PARAMETERS = ParameterMap.parse(config.get("Copy_parameters", "title_block"))
+SHEET_PARAMETERS = ParameterMap.parse(config.get("Copy_parameters", "sheet"))
+
+
+COPY_CATEGORIES = (DB.BuiltInCategory.OST_TitleBlocks,
+                   DB.BuiltInCategory.OST_GenericAnnotation,
+                   DB.BuiltInCategory.OST_Viewports,
+                   DB.BuiltInCategory.OST_TextNotes)
 
 
 def main():
     sheets = get_sheet()
-    with db.TransactionGroup('Copy Sheet'):
-        for sheet in sheets:
-            new_sheet = copy_sheet(sheet)
-    return new_sheet
+    number_index = SheetNumberIndex.from_document(doc)
+    return copy_sheets(sheets, number_index)
+
+
+@db.Transaction.ensure('Copy Sheet')
+def copy_sheets(sheets, number_index=None):
+    """
+    Скопировать листы в одной транзакции
+
+    Элементы собираются коллектором по каждому листу. Каждый лист копируется
+    в своей подтранзакции вместе с параметрами листа и основной надписи,
+    ошибка откатывает только этот лист. О параметрах, которые не удалось
+    скопировать, сообщается один раз в конце
+
+    :param sheets: Листы для копирования
+    :type sheets: list[db.ViewSheet]
+    :param number_index: Индекс номеров листов модели
+    :type number_index: SheetNumberIndex
+    :return: Новые листы
+    :rtype: list[db.ViewSheet]
+    """
+
+    if number_index is None:
+        number_index = SheetNumberIndex.from_document(doc)
+    sheet_elements = collect_sheet_elements(sheets)
+
+    new_sheets = []
+    skipped = {}
+    for sheet in sheets:
+        sub_transaction = DB.SubTransaction(doc)
+        sub_transaction.Start()
+        try:
+            next_number = get_next_number(sheet, number_index)
+            copies = get_parameter_copies()
+            new_sheet = copy_sheet_elements(sheet, sheet_elements[sheet.Id.IntegerValue], next_number, copies)
+            sheet_skipped = copy_parameters(copies)
+        except Exception as err:
+            sub_transaction.RollBack()
+            logger.error('Sheet #{} is not copied: {}'.format(sheet.Id, err))
+            continue
+
+        sub_transaction.Commit()
+        number_index.add(next_number)
+        new_sheets.append(new_sheet)
+        for name in sheet_skipped:
+            skipped[name] = skipped.get(name, 0) + 1
+
+    for name in sorted(skipped):
+        logger.warning('Parameter "{}" is not copied on {} of {} sheets'.format(name, skipped[name], len(new_sheets)))
+    logger.info('Copy {} of {} sheets'.format(len(new_sheets), len(sheets)))
+    return new_sheets
 
 
 @db.Transaction.ensure('Ololo2222')
-def copy_sheet(sheet):
-    # logger.info('Start')
-    # Get next number for sheet
-    next_number = get_next_number(sheet)
+def copy_sheet(sheet, number_index=None):
+    next_number = get_next_number(sheet, number_index)
+    sheet_elements = collect_sheet_elements([sheet])
+    copies = get_parameter_copies()
+
+    new_sheet = copy_sheet_elements(sheet, sheet_elements[sheet.Id.IntegerValue], next_number, copies)
+    for name in copy_parameters(copies):
+        logger.warning('Parameter "{}" is not copied'.format(name))
+    if number_index is not None:
+        number_index.add(next_number)
+
+    return new_sheet
+
+
+def copy_sheet_elements(sheet, inventory, next_number, copies):
+    """
+    Создать копию листа с номером next_number
+
+    :param sheet: Исходный лист
+    :type sheet: db.ViewSheet
+    :param inventory: Элементы исходного листа
+    :type inventory: SheetInventory
+    :param next_number: Номер нового листа
+    :type next_number: str
+    :param copies: Пары элементов для копирования параметров, сюда добавляются лист и основная надпись
+    :type copies: dict[ParameterMap, list[(DB.Element, DB.Element)]]
+    :return: Новый лист
+    :rtype: db.ViewSheet
+    """
 
     # Get TitleBlock
-    title_block = get_elem_by_cat_and_family_name_on_view(category=DB.BuiltInCategory.OST_TitleBlocks,
-                                                          block_name=SHEET_TITLE_FAMILY_NAME,
-                                                          view=sheet)
+    title_block = db.Element(inventory.get_first(DB.BuiltInCategory.OST_TitleBlocks, SHEET_TITLE_FAMILY_NAME))
 
     # Create new sheet and set number
     new_sheet = create_sheet(title_block)
-    # logger.info('Create sheet')
 
     new_title_block = get_elem_by_cat_and_family_name_on_view(category=DB.BuiltInCategory.OST_TitleBlocks,
                                                               block_name=SHEET_TITLE_FAMILY_NAME,
                                                               view=new_sheet)
 
     new_sheet.parameters.builtins[DB.BuiltInParameter.SHEET_NUMBER] = next_number
-    new_sheet.parameters[SHEET_NUMBER_ON_STAMP_NAME] = next_number.rpartition('-')[-1]
-    # logger.info('Set number parameter')
-
-    # TODO add Подпись2 as current user in pyRevit and Комаристов
-    # Copy parameters by TitleBlock and Sheet
-    fill_param_on_elem_from_old_elem_by_name(new=new_title_block,
-                                             old=title_block,
-                                             names=('Подпись3', 'Подпись4', 'Подпись5'))
-    fill_param_on_elem_from_old_elem_by_name(new=new_sheet,
-                                             old=sheet,
-                                             names=('Наим. объекта', 'Марка', 'Доп. шифр'))
-    # logger.info('Fill signs')
+    get_accessor(SHEET_NUMBER_ON_STAMP_NAME).set_value(new_sheet.unwrap(), next_number.rpartition('-')[-1])
 
     # Create legend
     # FIXME 20201016 RevitAPI cant move title of viewport, one solution in revit 2020. just copy legend
-    legend = get_legend_on_view(sheet)
+    legend = inventory.get_legend()
     new_legend = DB.Viewport.Create(doc, new_sheet.Id, legend.ViewId, legend.GetBoxCenter())
     new_legend.ChangeTypeId(legend.GetTypeId())
-    # logger.info('Create legend')
 
     # Copy annotation
-    stamp = get_elem_by_cat_and_family_name_on_view(category=DB.BuiltInCategory.OST_TitleBlocks,
-                                                    block_name=SECOND_SHEET_TITLE_FAMILY_NAME,
-                                                    view=sheet)
-    keyplan = get_elem_by_cat_and_family_name_on_view(category=DB.BuiltInCategory.OST_GenericAnnotation,
-                                                      block_name=KEYPLAN_FAMILY_NAME,
-                                                      view=sheet)
-
-    text_notes = db.Collector(view=sheet, of_category='TextNotes').get_elements()
+    stamp = inventory.get_first(DB.BuiltInCategory.OST_TitleBlocks, SECOND_SHEET_TITLE_FAMILY_NAME)
+    keyplan = inventory.get_first(DB.BuiltInCategory.OST_GenericAnnotation, KEYPLAN_FAMILY_NAME)
+    text_notes = inventory.get_elements(DB.BuiltInCategory.OST_TextNotes)
 
     copy_elements = [stamp] + [keyplan] + text_notes
     copy_element_ids = List[DB.ElementId]([elem.Id for elem in copy_elements])
-    # logger.info('Get elements:{}'.format(len(copy_elements)))
 
     DB.ElementTransformUtils.CopyElements(sheet.unwrap(),
                                           copy_element_ids,
                                           new_sheet.unwrap(),
                                           None, None)
 
+    # TODO add Подпись2 as current user in pyRevit and Комаристов
+    # Parameters by TitleBlock and Sheet are copied by copy_parameters
+    copies[TITLE_BLOCK_PARAMETERS].append((title_block.unwrap(), new_title_block.unwrap()))
+    copies[SHEET_PARAMETERS].append((sheet.unwrap(), new_sheet.unwrap()))
+
+    logger.debug('Sheet #{} copy as "{}"'.format(sheet.Id, next_number))
+    return new_sheet
+
+
+def collect_sheet_elements(sheets):
+    """
+    Собрать элементы листов по категориям коллектором по каждому листу
+
+    Коллектор ограничен листом, поэтому аннотации на других видах модели не обходятся
+
+    :param sheets: Листы
+    :type sheets: list[db.ViewSheet]
+    :return: Элементы по int Id листа
+    :rtype: dict[int, SheetInventory]
+    """
+
+    category_filter = DB.ElementMulticategoryFilter(List[DB.BuiltInCategory](COPY_CATEGORIES))
+
+    sheet_elements = {}
+    for sheet in sheets:
+        collector = DB.FilteredElementCollector(doc, sheet.Id).WherePasses(category_filter)
+        sheet_elements[sheet.Id.IntegerValue] = SheetInventory(collector.WhereElementIsNotElementType())
+
+    return sheet_elements
+
+
+class SheetInventory:
+    """
+    Элементы листа по категории и имени семейства
+
+    Элементы листа обходятся один раз, дальше все поиски идут по словарю
+    """
+
+    def __init__(self, elements=()):
+        self.elements = {}
+        for elem in elements:
+            self.add(elem)
+
+    @classmethod
+    def from_view(cls, view):
+        """
+        :param view: Лист
+        :type view: DB.ViewSheet
+        :rtype: SheetInventory
+        """
+
+        return cls(DB.FilteredElementCollector(doc, view.Id).WhereElementIsNotElementType())
+
+    def add(self, elem):
+        if elem.Category is None:
+            return
+
+        family_name = elem.Symbol.Family.Name if isinstance(elem, DB.FamilyInstance) else None
+        families = self.elements.setdefault(elem.Category.Id.IntegerValue, {})
+        families.setdefault(family_name, []).append(elem)
+
+    def get_elements(self, category, family_name=None):
+        """
+        Элементы категории. Если имя семейства не задано - все элементы категории
+
+        :type category: DB.BuiltInCategory
+        :type family_name: str
+        :rtype: list[DB.Element]
+        """
+
+        families = self.elements.get(int(category), {})
+        if family_name is not None:
+            return list(families.get(family_name, ()))
+        return [elem for elements in families.values() for elem in elements]
+
+    def get_first(self, category, family_name):
+        """
+        Первый экземпляр семейства
+
+        :type category: DB.BuiltInCategory
+        :type family_name: str
+        :rtype: DB.FamilyInstance
+        """
+
+        elements = self.elements.get(int(category), {}).get(family_name)
+        if elements:
+            return elements[0]
+        raise RpwException('{} on sheet not found'.format(category))
+
+    def get_legend(self):
+        """
+        Видовой экран легенды
+
+        :rtype: DB.Viewport
+        """
+
+        for view_port in self.get_elements(DB.BuiltInCategory.OST_Viewports):
+            if doc.GetElement(view_port.ViewId).ViewType == DB.ViewType.Legend:
+                return view_port
+
+        raise RpwException('Legend on sheet not found')
+
 
 def get_sheet():
     """
@@ -120,10 +286,7 @@ def get_elem_by_cat_and_family_name_on_view(category, block_name, view):
     :rtype: DB.FamilyInstance
     """
 
-    blocks = db.Collector(view=view, of_category=category, where=lambda block: block.Symbol.Family.Name == block_name)
-    if blocks:
-        return blocks.get_first()
-    raise RpwException('{} on sheet not found'.format(category))
+    return db.Element(SheetInventory.from_view(view).get_first(category, block_name))
 
 
 def get_legend_on_view(view):
@@ -136,13 +299,7 @@ def get_legend_on_view(view):
     :rtype: DB.View
     """
 
-    view_ports = db.Collector(view=view, of_category=DB.BuiltInCategory.OST_Viewports)
-    for view_port in view_ports:
-        view = doc.GetElement(view_port.ViewId)
-        if view.ViewType == DB.ViewType.Legend:
-            return view_port
-
-    raise RpwException('Legend on sheet not found')
+    return SheetInventory.from_view(view).get_legend()
 
 
 def create_sheet(title_block):
@@ -158,45 +315,107 @@ def create_sheet(title_block):
     return db.Element(DB.ViewSheet.Create(doc, title_block.Symbol.Id))
 
 
-def fill_param_on_elem_from_old_elem_by_name(new, old, names):
+def get_parameter_copies():
+    """
+    Пустые списки пар элементов по картам параметров
+
+    :rtype: dict[ParameterMap, list[(DB.Element, DB.Element)]]
+    """
+
+    return {TITLE_BLOCK_PARAMETERS: [], SHEET_PARAMETERS: []}
+
+
+def copy_parameters(copies):
     """
-    Скопировать значения параметра из одного элемента в другой по имени
+    Скопировать параметры листа и основной надписи по картам из config.ini
 
-    :param new: Element which will fill
-    :type new: db.Element
-    :param old: Element for parameters
-    :type old: db.Element
-    :param names: Name parameters
-    :type names: tuple[str]
+    :param copies: Пары (исходный, новый) по картам параметров
+    :type copies: dict[ParameterMap, list[(DB.Element, DB.Element)]]
+    :return: Имена пропущенных параметров, как в config.ini
+    :rtype: list[str]
     """
 
-    for name in names:
-        new.parameters[name] = old.parameters[name].value
+    count = 0
+    skipped = []
+    for parameter_map, pairs in copies.items():
+        if pairs:
+            map_count, map_skipped = parameter_map.copy(pairs)
+            count += map_count
+            skipped.extend(map_skipped)
+
+    logger.debug('Copy {} parameters'.format(count))
+    return skipped
 
 
-def get_next_number(sheet):
+def get_next_number(sheet, number_index=None):
     """
     Получить следующий номер листа
 
+    Без индекса номера всех листов модели разбираются заново
+
     :param sheet: Sheet
     :type sheet: DB.SheetView
+    :param number_index: Индекс номеров листов модели
+    :type number_index: SheetNumberIndex
     :return: <Марка>-<Номер листа>
     :rtype: str
     """
 
+    if number_index is None:
+        number_index = SheetNumberIndex.from_document(doc)
+
     num_value = sheet.get_Parameter(DB.BuiltInParameter.SHEET_NUMBER).AsString()
-    mark, _, number = num_value.rpartition('-')
-    max_number = int(number)
-
-    collector = DB.FilteredElementCollector(doc).OfClass(DB.ViewSheet).WhereElementIsNotElementType().ToElements()
-    for temp_sheet in collector:
-        temp_value = temp_sheet.get_Parameter(DB.BuiltInParameter.SHEET_NUMBER).AsString()
-        temp_mark, _, temp_number = temp_value.rpartition('-')
-        if temp_mark == mark:
-            if temp_number.isdigit() and int(temp_number) > max_number:
-                max_number = int(temp_number)
-
-    return mark + '-' + str(max_number + 1).rjust(len(number), '0')
+    return number_index.get_next_number(num_value)
+
+
+class SheetNumberIndex:
+    """
+    Максимальный номер листа для каждой марки
+
+    Строится один раз за запуск, новые номера добавляются через add
+    """
+
+    def __init__(self, sheet_numbers=()):
+        self.max_numbers = {}
+        for sheet_number in sheet_numbers:
+            self.add(sheet_number)
+
+    @classmethod
+    def from_document(cls, document):
+        """
+        :type document: DB.Document
+        :rtype: SheetNumberIndex
+        """
+
+        collector = DB.FilteredElementCollector(document).OfClass(DB.ViewSheet).WhereElementIsNotElementType()
+        return cls(sheet.get_Parameter(DB.BuiltInParameter.SHEET_NUMBER).AsString() for sheet in collector)
+
+    def add(self, sheet_number):
+        """
+        Учесть номер листа
+
+        :param sheet_number: <Марка>-<Номер листа>
+        :type sheet_number: str
+        """
+
+        mark, _, number = sheet_number.rpartition('-')
+        if number.isdigit() and int(number) > self.max_numbers.get(mark, -1):
+            self.max_numbers[mark] = int(number)
+
+    def get_next_number(self, sheet_number):
+        """
+        Следующий номер после максимального для марки листа
+
+        :param sheet_number: Номер исходного листа <Марка>-<Номер листа>
+        :type sheet_number: str
+        :return: <Марка>-<Номер листа>
+        :rtype: str
+        """
+
+        mark, _, number = sheet_number.rpartition('-')
+        max_number = max(int(number), self.max_numbers.get(mark, -1))
+
+        return mark + '-' + str(max_number + 1).rjust(len(number), '0')
 
 
 if __name__ == '__main__':
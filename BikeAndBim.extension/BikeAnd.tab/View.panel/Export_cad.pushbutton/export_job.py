@@ -0,0 +1,141 @@
+# coding=utf-8
+""" Задание экспорта DWG с сохранением хода работы
+
+    Файл задания хранит настройку экспорта, папку, запланированные виды
+    и уже выгруженные файлы. Если экспорт прервался, задание продолжается
+    с первого невыгруженного вида.
+"""
+
+import datetime
+import io
+import json
+import logging
+import os
+import time
+
+from files import write_text
+
+
+class ExportJob(object):
+    SAVE_INTERVAL = 1.0
+
+    def __init__(self, path, setup_name, folder, prefix, views, done=None, created=None, fingerprints=None):
+        """
+        :param path: Путь к файлу задания
+        :type path: str
+        :param setup_name: Имя настройки экспорта DWG
+        :type setup_name: str
+        :param folder: Папка экспорта
+        :type folder: str
+        :param prefix: Префикс имен файлов
+        :type prefix: str
+        :param views: Запланированные пары (int Id вида, имя файла)
+        :type views: list[(int, str)]
+        :param done: Выгруженные файлы: имя -> путь
+        :type done: dict[str, str]
+        :param created: Время создания задания, ISO
+        :type created: str
+        :param fingerprints: Отпечатки видов на момент планирования по int Id, для манифеста
+        :type fingerprints: dict[int, str]
+        """
+
+        self.path = path
+        self.setup_name = setup_name
+        self.folder = folder
+        self.prefix = prefix
+        self.views = [(int(view_id), name) for view_id, name in views]
+        self.done = done or {}
+        self.created = created or datetime.datetime.now().isoformat()
+        self.fingerprints = dict((int(view_id), value) for view_id, value in (fingerprints or {}).items())
+
+        self.changed = True
+        self._saved_at = 0
+
+    @classmethod
+    def load(cls, path):
+        """
+        Задание из файла
+
+        :param path: Путь к файлу задания
+        :type path: str
+        :return: Задание или None, если файла нет или он поврежден
+        :rtype: ExportJob
+        """
+
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            with io.open(path, encoding='utf-8') as job_file:
+                data = json.load(job_file)
+
+            job = cls(path, data['setup_name'], data['folder'], data['prefix'], data['views'],
+                      done=data['done'], created=data['created'], fingerprints=data.get('fingerprints'))
+        except (ValueError, KeyError, TypeError, IOError) as err:
+            logging.error('Export job <{}> is not read: {}'.format(path, err))
+            return None
+
+        job.changed = False
+        return job
+
+    @property
+    def is_finished(self):
+        return all(name in self.done for _, name in self.views)
+
+    def get_pending(self):
+        """
+        Виды, файлы которых еще не выгружены
+
+        :rtype: list[(int, str)]
+        """
+
+        return [(view_id, name) for view_id, name in self.views if name not in self.done]
+
+    def get_names(self):
+        """
+        Имена файлов всех видов задания
+
+        :rtype: list[str]
+        """
+
+        return [name for _, name in self.views]
+
+    def finish(self, names):
+        """
+        Отметить файлы как выгруженные
+
+        :param names: Имена файлов без расширения
+        :type names: list[str]
+        """
+
+        for name in names:
+            if name not in self.done:
+                self.done[name] = os.path.join(self.folder, name + '.dwg')
+                self.changed = True
+
+    def save(self, force=True):
+        """
+        Записать задание, если оно менялось
+
+        :param force: Записать сразу. Иначе не чаще раза в SAVE_INTERVAL секунд
+        :type force: bool
+        :rtype: bool
+        """
+
+        if not self.changed or (not force and time.time() - self._saved_at < self.SAVE_INTERVAL):
+            return False
+
+        data = {'setup_name': self.setup_name,
+                'folder': self.folder,
+                'prefix': self.prefix,
+                'created': self.created,
+                'views': self.views,
+                'done': self.done,
+                'fingerprints': self.fingerprints}
+
+        write_text(self.path, json.dumps(data, indent=1, ensure_ascii=False))
+
+        self.changed = False
+        self._saved_at = time.time()
+        logging.debug('Write export job <{}>: {} of {} done'.format(self.path, len(self.done), len(self.views)))
+        return True
@@ -0,0 +1,91 @@
+# coding=utf-8
+""" Манифест инкрементального экспорта DWG
+
+    Файл <проект>.export.json в папке экспорта хранит для каждого вида отпечаток
+    его содержимого и путь к выгруженному файлу. Вид с тем же отпечатком
+    и существующим файлом повторно не экспортируется.
+"""
+
+import io
+import json
+import logging
+import os
+
+from files import write_text
+
+
+MANIFEST_EXT = '.export.json'
+
+
+class ExportManifest(object):
+    def __init__(self, path):
+        """
+        :param path: Путь к файлу манифеста
+        :type path: str
+        """
+
+        self.path = path
+        self.views = self.read(path)
+        self.changed = False
+
+    @classmethod
+    def for_project(cls, folder, project_name):
+        """
+        Манифест проекта в папке экспорта
+
+        :param folder: Папка экспорта
+        :type folder: str
+        :param project_name: Имя файла проекта
+        :type project_name: str
+        :rtype: ExportManifest
+        """
+
+        name = os.path.splitext(project_name)[0] + MANIFEST_EXT
+        return cls(os.path.join(folder, name))
+
+    @staticmethod
+    def read(path):
+        if not os.path.isfile(path):
+            return {}
+
+        try:
+            with io.open(path, encoding='utf-8') as manifest:
+                return json.load(manifest).get('views', {})
+        except (ValueError, IOError) as err:
+            logging.error('Manifest <{}> is not read: {}'.format(path, err))
+            return {}
+
+    def is_current(self, view_id, fingerprint, path):
+        """
+        Файл вида уже выгружен с тем же содержимым
+
+        :param view_id: Id вида
+        :type view_id: int
+        :param fingerprint: Отпечаток вида
+        :type fingerprint: str
+        :param path: Путь, по которому вид будет выгружен
+        :type path: str
+        :rtype: bool
+        """
+
+        entry = self.views.get(str(view_id))
+        return (entry is not None
+                and entry['fingerprint'] == fingerprint
+                and entry['path'] == path
+                and os.path.isfile(path))
+
+    def update(self, view_id, fingerprint, path):
+        self.views[str(view_id)] = {'fingerprint': fingerprint, 'path': path}
+        self.changed = True
+
+    def save(self):
+        """Записать манифест, если он менялся"""
+
+        if not self.changed:
+            return False
+
+        write_text(self.path, json.dumps({'views': self.views}, indent=1, sort_keys=True, ensure_ascii=False))
+
+        self.changed = False
+        logging.debug('Write manifest <{}>'.format(self.path))
+        return True
@@ -0,0 +1,237 @@
+# coding=utf-8
+""" Обработка файлов после экспорта DWG в фоновых потоках
+
+    Revit экспортирует виды в основном потоке, а удаление .pcp, переименование,
+    упаковка в zip и контрольные суммы идут параллельно со следующим экспортом.
+    В потоках нет обращений к Revit API - только файловая система.
+
+    Архив и контрольные суммы дополняются: файлы прошлых запусков, которые
+    не экспортировались заново (не изменились или уже были выгружены до
+    возобновления), остаются в них.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import zipfile
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from files import replace_file, write_text, TEMP_EXT
+
+
+DWG_EXT = '.dwg'
+PCP_EXT = '.pcp'
+MANIFEST_NAME = 'checksums.sha256'
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_checksum(path):
+    """
+    SHA-256 файла
+
+    :param path: Путь к файлу
+    :type path: str
+    :rtype: str
+    """
+
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as exported:
+        for chunk in iter(lambda: exported.read(CHUNK_SIZE), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def read_manifest(path):
+    """
+    Контрольные суммы из файла checksums.sha256
+
+    :param path: Путь к файлу
+    :type path: str
+    :return: Сумма по имени файла. Пустой словарь, если файла нет
+    :rtype: dict[str, str]
+    """
+
+    checksums = {}
+    if not os.path.isfile(path):
+        return checksums
+
+    with io.open(path, encoding='utf-8') as manifest:
+        for line in manifest:
+            checksum, _, name = line.rstrip('\n').partition('  ')
+            if name:
+                checksums[name] = checksum
+    return checksums
+
+
+class ExportPipeline(object):
+    """
+    Пул потоков для файлов экспорта
+
+    Пример:
+        with ExportPipeline(folder, workers=4) as pipeline:
+            for view_id, name in plan:
+                doc.Export(folder, name, ids, option)
+                pipeline.submit(name)
+    """
+
+    def __init__(self, folder, workers=4, zip_name=None, checksums=False):
+        """
+        :param folder: Папка экспорта
+        :type folder: str
+        :param workers: Число потоков
+        :type workers: int
+        :param zip_name: Имя zip-архива в папке экспорта. Без имени не упаковывать
+        :type zip_name: str
+        :param checksums: Записать checksums.sha256 с суммами файлов
+        :type checksums: bool
+        """
+
+        self.folder = folder
+        self.zip_path = os.path.join(folder, zip_name) if zip_name else None
+        self.checksums = {} if checksums else None
+        self.errors = []
+        self.done = []
+
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._archive = None
+        self._threads = [threading.Thread(target=self._work, name='DWG export {}'.format(i))
+                         for i in range(max(1, workers))]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, exported_name, name=None):
+        """
+        Поставить в очередь файлы одного экспорта
+
+        :param exported_name: Имя, с которым файл создал Revit, без расширения
+        :type exported_name: str
+        :param name: Итоговое имя файла. По умолчанию не переименовывать
+        :type name: str
+        """
+
+        self._queue.put((exported_name, name or exported_name))
+
+    def get_done(self):
+        """
+        Имена уже обработанных файлов. Можно вызывать во время экспорта
+
+        :rtype: list[str]
+        """
+
+        with self._lock:
+            return list(self.done)
+
+    def close(self):
+        """
+        Дождаться обработки всех файлов, записать архив и контрольные суммы
+
+        :return: Ошибки обработки
+        :rtype: list[str]
+        """
+
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+        if self._archive is not None:
+            self.close_archive()
+
+        if self.checksums:
+            self.write_manifest()
+
+        for error in self.errors:
+            logging.error(error)
+        return self.errors
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+
+            exported_name, name = task
+            try:
+                self.process(exported_name, name)
+            except Exception as err:
+                if exported_name != name:
+                    error = 'File "{}" (exported as "{}"): {}'.format(name, exported_name, err)
+                else:
+                    error = 'File "{}": {}'.format(name, err)
+                with self._lock:
+                    self.errors.append(error)
+
+    def process(self, exported_name, name):
+        """Обработать файлы одного вида. Выполняется в потоке пула"""
+
+        self.delete_pcp_file(exported_name)
+
+        path = os.path.join(self.folder, name + DWG_EXT)
+        if exported_name != name:
+            replace_file(os.path.join(self.folder, exported_name + DWG_EXT), path)
+            logging.debug('Rename <{}> to <{}>'.format(exported_name, name))
+
+        checksum = get_checksum(path) if self.checksums is not None else None
+
+        with self._lock:
+            if self.zip_path:
+                self.get_archive().write(path, name + DWG_EXT)
+            if checksum:
+                self.checksums[name + DWG_EXT] = checksum
+            self.done.append(name)
+
+    def delete_pcp_file(self, name):
+        path = os.path.join(self.folder, name + PCP_EXT)
+
+        if os.path.isfile(path):
+            try:
+                os.remove(path)
+                logging.debug('Delete .pcp file by path <{}>'.format(path))
+            except Exception:
+                pass
+
+    def get_archive(self):
+        """Новый архив пишется во временный файл, старый заменяется в close_archive"""
+
+        if self._archive is None:
+            self._archive = zipfile.ZipFile(self.zip_path + TEMP_EXT, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        return self._archive
+
+    def close_archive(self):
+        """Перенести из старого архива файлы, которые не экспортировались заново, и заменить его новым"""
+
+        archive, self._archive = self._archive, None
+        written = set(archive.namelist())
+        if os.path.isfile(self.zip_path):
+            old_archive = zipfile.ZipFile(self.zip_path, 'r')
+            try:
+                for info in old_archive.infolist():
+                    if info.filename not in written:
+                        archive.writestr(info, old_archive.read(info))
+            finally:
+                old_archive.close()
+
+        archive.close()
+        replace_file(archive.filename, self.zip_path)
+        logging.debug('Write archive <{}>'.format(self.zip_path))
+
+    def write_manifest(self):
+        path = os.path.join(self.folder, MANIFEST_NAME)
+        checksums = read_manifest(path)
+        checksums.update(self.checksums)
+        write_text(path, u''.join(u'{}  {}\n'.format(checksums[name], name) for name in sorted(checksums)))
+        logging.debug('Write checksums <{}>'.format(path))
@@ -1,8 +1,18 @@
 # coding=utf-8
 from rpw import db, DB, UI, uidoc, doc, logger
-from pyrevit import forms
+from pyrevit import forms, script
 from System.Collections.Generic import List
+import hashlib
 import os.path
+import sys
+
+tab_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(tab_path), 'base'))
+
+from settings import Settings
+from export_pipeline import ExportPipeline
+from export_manifest import ExportManifest
+from export_job import ExportJob
 
 
 class ElemNotFound(Exception):
@@ -21,18 +31,43 @@ VALID_VIEW_TYPE = [DB.ViewType.FloorPlan,
                    ]
 STANDARD_PREFIX = 'Inter your prefix or ~ for ignore'
 DWG_OPTION_NAME = 'RC Layers Standard VBP'
+GROUP_NAME = '~export_group_{}'
+MODE_SETUP = 'Choose export setup'
+MODE_RESUME = 'Resume last export'
 
 
 @db.Transaction.ensure('Edit crop view')
 def main():
-    is_config = not __shiftclick__
-    dwg_option_name = get_dwg_option_name(is_config)
+    mode = get_shiftclick_mode() if __shiftclick__ else None
+    if __shiftclick__ and mode is None:
+        return
+
+    if mode == MODE_RESUME:
+        job = ExportJob.load(get_job_path())
+        if job is None or job.is_finished:
+            task_dialog('info', 'Not found unfinished export')
+            return
+
+        dwg_option_name, folder = job.setup_name, job.folder
+        result, errors = resume_export(job)
+    else:
+        dwg_option_name = get_dwg_option_name(is_config=mode is None)
+        result, errors, folder = export_dwg(dwg_option_name, STANDARD_PREFIX)
+
+    msg = 'Export {} files to <{}>\nExport option is "{}"'.format(len(result), folder, dwg_option_name)
+    if errors:
+        task_dialog('error',
+                    msg + '\n{} files failed, see details'.format(len(errors)),
+                    data=errors + [''] + sorted(result))
+    else:
+        task_dialog('info', msg, data=sorted(result))
 
-    result, folder = export_dwg(dwg_option_name, STANDARD_PREFIX)
 
-    task_dialog('info',
-                'Export {} files to <{}>\nExport option is "{}"'.format(len(result), folder, dwg_option_name),
-                data=sorted(result))
+def get_shiftclick_mode():
+    mode = forms.CommandSwitchWindow.show([MODE_SETUP, MODE_RESUME], message='Export CAD')
+
+    logger.debug('Get mode from user "{}"'.format(mode))
+    return mode
 
 
 def get_dwg_option_name(is_config=True):
@@ -50,16 +85,11 @@ def get_dwg_option_name(is_config=True):
 
 def get_name_option_from_config_or_none():
     try:
-        cfg = get_config()
-        if cfg.has_section('Setup_names'):
-            section = cfg.get_section('Setup_names')
-
-            file_name = get_file_name_for_config()
-            if section.has_option(file_name):
-                name_from_config = section.get_option(file_name)
-
-                logger.debug('Get Option name from config: "{}"'.format(name_from_config))
-                return name_from_config
+        file_name = get_file_name_for_config()
+        name_from_config = get_config().get('Setup_names', file_name)
+        if name_from_config:
+            logger.debug('Get Option name from config: "{}"'.format(name_from_config))
+            return name_from_config
 
     except Exception:
         logger.error('Get error from export config')
@@ -80,31 +110,24 @@ def get_file_name_for_config():
 def set_option_to_config(name_option):
     try:
         cfg = get_config()
-
-        if not cfg.has_section('Setup_names'):
-            cfg.add_section('Setup_names')
-
-        section = cfg.get_section('Setup_names')
         file_name = get_file_name_for_config()
-        section.set_option(file_name, name_option)
+        cfg.set('Setup_names', file_name, name_option)
 
-        cfg.save_changes()
-        logger.debug('Set Option name "{}" from file: "{}"'.format(name_option, file_name))
+        if cfg.save():
+            logger.debug('Set Option name "{}" from file: "{}"'.format(name_option, file_name))
 
     except Exception:
         logger.error('Get error from export config')
 
 
 def get_config():
-    from pyrevit.userconfig import PyRevitConfig
-    import os
-
-    this_folder = os.path.dirname(os.path.abspath(__file__))
-    init_file = os.path.join(this_folder, 'config.ini')
+    """
+    Настройки кнопки, общие на сессию Revit
 
-    cfg = PyRevitConfig(init_file)
+    :rtype: Settings
+    """
 
-    return cfg
+    return Settings.for_script(__file__)
 
 
 def get_option_name_from_user():
@@ -121,36 +144,407 @@ def get_option_name_from_user():
 
 
 def export_dwg(dwg_option_name, standard_prefix):
-    result = []
     views_id = get_selected_views_id()
     dwg_option = get_dwg_option(dwg_option_name)
 
     path_with_name = get_path(standard_prefix)
     folder, prefix = get_folder_and_prefix_by_path(path_with_name, standard_prefix)
+    plan = plan_export(views_id, prefix)
+
+    manifest, fingerprints = None, None
+    if is_incremental():
+        manifest = get_manifest(folder)
+        plan, fingerprints = skip_unchanged_views(plan, folder, manifest, ViewFingerprint(doc, dwg_option_name))
+
+    job = ExportJob(get_job_path(), dwg_option_name, folder, prefix,
+                    [(view_id.IntegerValue, name) for view_id, name in plan], fingerprints=fingerprints)
+    job.save()
+
+    result, errors = run_job(job, dwg_option, manifest, fingerprints)
+    return result, errors, folder
+
+
+def resume_export(job):
+    """
+    Продолжить прерванный экспорт с первого невыгруженного вида
+
+    :type job: ExportJob
+    :return: Выгруженные файлы задания и ошибки обработки файлов
+    :rtype: (list[str], list[str])
+    """
+
+    logger.info('Resume export from {}: {} of {} files done'.format(job.created, len(job.done), len(job.views)))
+
+    dwg_option = get_dwg_option(job.setup_name)
+    manifest = get_manifest(job.folder) if is_incremental() else None
+    return run_job(job, dwg_option, manifest)
+
+
+def run_job(job, dwg_option, manifest=None, fingerprints=None):
+    """
+    Выгрузить невыгруженные виды задания
+
+    Выгруженные файлы отмечаются в файле задания по ходу экспорта,
+    поэтому при ошибке или отмене задание можно продолжить.
+
+    :type job: ExportJob
+    :type dwg_option: DB.DWGExportOptions
+    :param manifest: Манифест инкрементального экспорта
+    :type manifest: ExportManifest
+    :param fingerprints: Отпечатки видов по int Id. Если нет - считаются заново
+    :type fingerprints: dict[int, str]
+    :return: Выгруженные файлы задания и ошибки обработки файлов
+    :rtype: (list[str], list[str])
+    """
+
+    plan = get_job_plan(job)
+    if manifest is not None and fingerprints is None:
+        fingerprint = ViewFingerprint(doc, job.setup_name)
+        fingerprints = dict(job.fingerprints)
+        fingerprints.update((view_id.IntegerValue, fingerprint.get(doc.GetElement(view_id))) for view_id, _ in plan)
+
+    group_size = get_group_size(dwg_option)
+    pipeline = ExportPipeline(job.folder, **get_pipeline_options(job.folder, job.prefix))
+    try:
+        with pipeline:
+            for index, group in enumerate(split_plan(plan, group_size)):
+                if len(group) == 1:
+                    export_view(group[0], job.folder, dwg_option, pipeline)
+                else:
+                    export_group(group, job.folder, GROUP_NAME.format(index), dwg_option, pipeline)
+
+                job.finish(pipeline.get_done())
+                job.save(force=False)
+    finally:
+        job.finish(pipeline.done)
+        job.save()
+
+    if manifest is not None:
+        # При продолжении в манифест попадают и виды, выгруженные до прерывания
+        job_plan = [(DB.ElementId(view_id), name) for view_id, name in job.views if view_id in fingerprints]
+        update_manifest(manifest, job_plan, job.folder, fingerprints, job.done)
+
+    result = [name for name in job.get_names() if name in job.done]
+    logger.info('Export {} of {} files for folder: <{}>'.format(len(pipeline.done), len(plan), job.folder))
+    return result, list(pipeline.errors)
+
+
+def get_job_plan(job):
+    """
+    Невыгруженные виды задания, которые еще есть в документе
+
+    :type job: ExportJob
+    :rtype: list[(DB.ElementId, str)]
+    """
+
+    plan = []
+    for view_id, name in job.get_pending():
+        elem_id = DB.ElementId(view_id)
+        if doc.GetElement(elem_id) is None:
+            logger.warning('View #{}. Not found in document, skip "{}"'.format(view_id, name))
+        else:
+            plan.append((elem_id, name))
+    return plan
+
+
+def get_job_path():
+    return script.get_document_data_file('export_job', 'json')
+
+
+def is_incremental():
+    return get_config().get('Export', 'incremental', False)
+
+
+def get_manifest(folder):
+    return ExportManifest.for_project(folder, get_file_name_for_config())
+
+
+def get_group_size(dwg_option):
+    """
+    Видов в одном вызове Export из config.ini
+
+    Без MergedViews Revit пишет виды листа отдельными файлами-ссылками с тем же
+    префиксом, что и файлы группы, поэтому группами выгружается только с MergedViews
+
+    :type dwg_option: DB.DWGExportOptions
+    :rtype: int
+    """
+
+    group_size = get_config().get('Export', 'group_size', 1)
+    if group_size > 1 and not dwg_option.MergedViews:
+        logger.info('Export option without MergedViews, export views one by one')
+        return 1
+    return group_size
+
+
+def split_plan(plan, group_size):
+    """
+    Разбить план на группы видов для одного вызова Export
+
+    Вид, в заголовке которого есть недопустимые в имени файла символы, выгружается отдельно:
+    имя его файла в группе заранее неизвестно
+
+    :type plan: list[(DB.ElementId, str)]
+    :param group_size: Видов в группе. 1 - каждый вид отдельно
+    :type group_size: int
+    :rtype: list[list[(DB.ElementId, str)]]
+    """
+
+    group_size = max(1, group_size)
+    if group_size == 1:
+        return [[task] for task in plan]
+
+    groups, alone = [], []
+    group = []
+    for task in plan:
+        title = doc.GetElement(task[0]).Title.replace(': ', ' - ')
+        if make_valid_name(title) != title:
+            alone.append([task])
+            continue
+
+        group.append(task)
+        if len(group) == group_size:
+            groups.append(group)
+            group = []
+
+    if group:
+        groups.append(group)
+    return groups + alone
+
+
+def export_view(task, folder, dwg_option, pipeline):
+    view_id, name = task
+    col = List[DB.ElementId]([view_id])
+
+    doc.Export(folder, name, col, dwg_option)
+    pipeline.submit(name)
+
+    logger.debug('View #{}. Export with name "{}"'.format(view_id, name))
+
+
+def export_group(group, folder, group_name, dwg_option, pipeline):
+    """
+    Выгрузить группу видов одним вызовом Export и переименовать файлы как при экспорте по одному
+
+    Revit называет файлы "<имя>-<заголовок вида>". Вид, файл которого не найден
+    по точному имени, выгружается отдельно. Файлы, которые не сопоставлены видам,
+    не удаляются.
+
+    :param group: Пары (Id вида, имя файла) с общими настройками экспорта
+    :type group: list[(DB.ElementId, str)]
+    :type folder: str
+    :param group_name: Временное имя для вызова Export
+    :type group_name: str
+    :type dwg_option: DB.DWGExportOptions
+    :type pipeline: ExportPipeline
+    """
+
+    col = List[DB.ElementId]([view_id for view_id, _ in group])
+    doc.Export(folder, group_name, col, dwg_option)
+
+    exported = get_group_files(folder, group_name)
+
+    for view_id, name in group:
+        exported_name = get_group_file_name(group_name, doc.GetElement(view_id))
+        if exported_name not in exported:
+            logger.warning('View #{}. File not found after group export, export alone'.format(view_id))
+            export_view((view_id, name), folder, dwg_option, pipeline)
+            continue
+
+        exported.discard(exported_name)
+        pipeline.submit(exported_name, name)
+        logger.debug('View #{}. Export with name "{}" as "{}"'.format(view_id, name, exported_name))
+
+    for exported_name in sorted(exported):
+        logger.warning('File "{}" of group export is not matched to any view, keep it'.format(exported_name))
+
+    logger.debug('Export group "{}" with {} views'.format(group_name, len(group)))
+
+
+def get_group_files(folder, group_name):
+    """
+    Имена .dwg без расширения, которые Revit создал для группы
+
+    :rtype: set[str]
+    """
+
+    start = group_name + '-'
+    return set(os.path.splitext(file_name)[0] for file_name in os.listdir(folder)
+               if file_name.startswith(start) and file_name.lower().endswith('.dwg'))
 
-    for view_id in views_id:
-        name = prefix + get_name_view_by_id(view_id)
-        col = List[DB.ElementId]([view_id])
 
-        doc.Export(folder, name, col, dwg_option)
-        delete_pcp_file(folder, name)
+def get_group_file_name(group_name, view):
+    return group_name + '-' + make_valid_name(view.Title.replace(': ', ' - '))
 
-        result.append(name)
-        logger.debug('View #{}. Export with name "{}"'.format(view_id, name))
 
-    logger.info('Export {} files for folder: <{}>'.format(len(views_id), folder))
-    return result, folder
+def skip_unchanged_views(plan, folder, manifest, fingerprint):
+    """
+    Убрать из плана виды, которые не изменились с прошлого экспорта
+
+    :type plan: list[(DB.ElementId, str)]
+    :param folder: Папка экспорта
+    :type folder: str
+    :type manifest: ExportManifest
+    :type fingerprint: ViewFingerprint
+    :return: Виды для экспорта и их отпечатки по int Id
+    :rtype: (list[(DB.ElementId, str)], dict[int, str])
+    """
+
+    changed = []
+    fingerprints = {}
+    for view_id, name in plan:
+        key = view_id.IntegerValue
+        fingerprints[key] = fingerprint.get(doc.GetElement(view_id))
+
+        if manifest.is_current(key, fingerprints[key], get_dwg_path(folder, name)):
+            logger.debug('View #{}. Not changed, skip "{}"'.format(view_id, name))
+        else:
+            changed.append((view_id, name))
+
+    logger.info('Skip {} unchanged views of {}'.format(len(plan) - len(changed), len(plan)))
+    return changed, fingerprints
+
+
+def update_manifest(manifest, plan, folder, fingerprints, done):
+    """
+    Записать в манифест виды, файлы которых обработаны без ошибок
+
+    :type manifest: ExportManifest
+    :type plan: list[(DB.ElementId, str)]
+    :type folder: str
+    :type fingerprints: dict[int, str]
+    :param done: Имена обработанных файлов
+    :type done: list[str]
+    """
+
+    done = set(done)
+    for view_id, name in plan:
+        if name in done:
+            key = view_id.IntegerValue
+            manifest.update(key, fingerprints[key], get_dwg_path(folder, name))
+    manifest.save()
+
+
+def get_dwg_path(folder, name):
+    return os.path.join(folder, name + '.dwg')
+
 
+class ViewFingerprint:
+    """
+    Отпечаток содержимого вида для инкрементального экспорта
+
+    Учитывает настройку экспорта, параметры вида и его шаблона, элементы на виде
+    и на видах, размещенных на листе, вместе с их типами. Маркер изменения
+    элемента - VersionGuid, если его дает API, иначе значения параметров и габарит
+    на виде. Маркеры кешируются по Id элемента, поэтому общие элементы видов
+    и типы читаются один раз.
+
+    Не учитываются стили объектов и связанные модели: после их изменения
+    инкрементальный экспорт нужно запускать с удаленным манифестом.
+    """
+
+    def __init__(self, document, setup_name):
+        self.document = document
+        self.setup_name = setup_name
+        self.markers = {}
+
+    def get(self, view):
+        """
+        :type view: DB.View
+        :return: SHA-1 отпечатка
+        :rtype: str
+        """
+
+        checksum = hashlib.sha1()
+        self.update(checksum, self.setup_name)
+        self.update(checksum, view.Title)
+        self.update(checksum, self.get_parameters_marker(view))
+
+        views = [view]
+        if view.ViewType == DB.ViewType.DrawingSheet:
+            placed = sorted(view.GetAllPlacedViews(), key=lambda i: i.IntegerValue)
+            views.extend(self.document.GetElement(view_id) for view_id in placed)
+
+        for temp_view in views:
+            self.update(checksum, '#{}'.format(temp_view.Id))
+            self.update(checksum, self.get_template_marker(temp_view))
+            collector = DB.FilteredElementCollector(self.document, temp_view.Id).WhereElementIsNotElementType()
+            for elem_id in sorted(collector.ToElementIds(), key=lambda i: i.IntegerValue):
+                self.update(checksum, self.get_marker(elem_id))
+
+        return checksum.hexdigest()
+
+    @staticmethod
+    def update(checksum, value):
+        checksum.update(u'{}\n'.format(value).encode('utf-8'))
+
+    def get_marker(self, elem_id):
+        key = elem_id.IntegerValue
+        marker = self.markers.get(key)
+        if marker is None:
+            elem = self.document.GetElement(elem_id)
+            marker = self.markers[key] = self.create_marker(elem) if elem is not None else '{}:'.format(key)
+        return marker
+
+    def get_template_marker(self, view):
+        template_id = view.ViewTemplateId
+        if template_id is None or template_id == DB.ElementId.InvalidElementId:
+            return 'template:'
+        return 'template:' + self.get_marker(template_id)
+
+    def create_marker(self, elem):
+        type_id = elem.GetTypeId()
+        type_marker = ''
+        if type_id is not None and type_id != DB.ElementId.InvalidElementId:
+            type_marker = self.get_marker(type_id)
+
+        version = getattr(elem, 'VersionGuid', None)
+        if version is not None:
+            return '{}:{}|{}'.format(elem.Id, version, type_marker)
+
+        box = elem.get_BoundingBox(None)
+        box_marker = '{}/{}'.format(box.Min, box.Max) if box else ''
+        return u'{}:{}:{}|{}'.format(elem.Id, box_marker, self.get_parameters_marker(elem), type_marker)
+
+    @staticmethod
+    def get_parameters_marker(elem):
+        values = []
+        for param in elem.Parameters:
+            value = param.AsValueString() or param.AsString() or ''
+            values.append(u'{}={}'.format(param.Definition.Name, value))
+        return u';'.join(sorted(values))
+
+
+def plan_export(views_id, prefix):
+    """
+    Имена файлов для всех видов до начала экспорта
+
+    :param views_id: Id видов
+    :type views_id: List[DB.ElementId]
+    :param prefix: Префикс имени файла
+    :type prefix: str
+    :return: Пары (Id вида, имя файла без расширения)
+    :rtype: list[(DB.ElementId, str)]
+    """
+
+    return [(view_id, prefix + get_name_view_by_id(view_id)) for view_id in views_id]
+
+
+def get_pipeline_options(folder, prefix):
+    """
+    Параметры обработки файлов из секции [Export] config.ini
+
+    :rtype: dict
+    """
 
-def delete_pcp_file(folder, name):
-    path = os.path.join(folder, name + '.pcp')
+    cfg = get_config()
+    zip_name = None
+    if cfg.get('Export', 'zip', False):
+        zip_name = (prefix.strip() or os.path.basename(folder)) + '.zip'
 
-    if os.path.isfile(path):
-        try:
-            os.remove(path)
-            logger.debug('Delete .pcp file by path <{}>'.format(path))
-        except Exception:
-            pass
+    return {'workers': cfg.get('Export', 'workers', 4),
+            'zip_name': zip_name,
+            'checksums': cfg.get('Export', 'checksums', False)}
 
 
 def get_selected_views_id():
@@ -0,0 +1,60 @@
+# coding=utf-8
+""" Запись файлов настроек и состояния без потери старой версии
+
+    Текст пишется во временный файл рядом, старый файл переименовывается
+    в резервный, и только потом временный занимает его место. Если замена
+    не удалась, старый файл возвращается на место.
+
+    Пример:
+        write_text(path, json.dumps(data, ensure_ascii=False))
+"""
+
+import io
+import os
+
+
+TEMP_EXT = '.tmp'
+BACKUP_EXT = '.bak'
+
+
+def write_text(path, text):
+    """
+    Записать текст в файл в кодировке utf-8
+
+    :param path: Путь к файлу
+    :type path: str
+    :param text: Содержимое файла
+    :type text: str
+    """
+
+    temp_path = path + TEMP_EXT
+    with io.open(temp_path, 'w', encoding='utf-8') as temp_file:
+        temp_file.write(u'{}'.format(text))
+
+    replace_file(temp_path, path)
+
+
+def replace_file(source, destination):
+    """
+    Заменить файл destination файлом source. При ошибке destination остается прежним
+
+    :type source: str
+    :type destination: str
+    """
+
+    if not os.path.isfile(destination):
+        os.rename(source, destination)
+        return
+
+    backup_path = destination + BACKUP_EXT
+    if os.path.isfile(backup_path):
+        os.remove(backup_path)
+
+    os.rename(destination, backup_path)
+    try:
+        os.rename(source, destination)
+    except Exception:
+        os.rename(backup_path, destination)
+        raise
+
+    os.remove(backup_path)
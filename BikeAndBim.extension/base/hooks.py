@@ -0,0 +1,471 @@
+# coding=utf-8
+""" Обработчики DocumentChanged с фильтрами, задержкой и бюджетом времени
+
+    Обработчик объявляется декоратором и получает только Id элементов нужных классов.
+    С debounce изменения копятся и передаются одной пачкой в Idling, когда
+    событий не было debounce секунд. Состояние, которое нужно обработчику на момент
+    события (например, активный вид), запоминается функцией capture и делит пачку
+    на части по своему значению. Время каждого вызова пишется в гистограмму,
+    а обработчик, который overruns раз подряд вышел за бюджет, отключается
+    до конца сессии.
+
+    Пример (hooks/doc-changed.py):
+        @hooks.document_changed(classes=[DB.Structure.Rebar], debounce=0.5, budget=2.0)
+        def tag_rebar(document, changes):
+            ...
+
+        @hooks.document_changed(classes=[DB.Structure.Rebar], debounce=0.5, capture=get_view_name)
+        def tag_rebar_by_view(document, batches):
+            for view_name, changes in batches.items():
+                ...
+
+        hooks.dispatch_document_changed(EXEC_PARAMS.event_args, HOST_APP.uiapp)
+
+    Каждый запуск хука - новый движок IronPython, поэтому функции и настройки
+    обработчиков (HookState) создаются заново в каждом движке, а накопленные
+    изменения и статистика хранятся в сессии простыми данными: списками, числами
+    и строками (см. base/settings.py). Документ в них - ключ get_document_key,
+    значение capture тоже должно быть простым: строкой или числом.
+
+    Отложенная пачка записывается в Idling. SetRaiseWithoutDelay не используется -
+    с ним Revit поднимает Idling непрерывно. Поэтому, если пользователь ничего
+    не делает, пачка может ждать следующего Idling до его действия (движения мыши).
+"""
+
+import logging
+import time
+from collections import OrderedDict
+
+import Autodesk.Revit.DB as DB
+
+import session
+
+
+SESSION_KEY = 'HOOKS'
+# Границы корзин гистограммы, мс. Последняя корзина - все, что дольше
+HISTOGRAM_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class Changes(object):
+    """Int Id добавленных, измененных и удаленных элементов"""
+
+    def __init__(self, added=(), modified=(), deleted=()):
+        self.added = set(added)
+        self.modified = set(modified)
+        self.deleted = set(deleted)
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.deleted)
+
+    __nonzero__ = __bool__
+
+    def update(self, other):
+        """
+        Добавить изменения другого события
+
+        :type other: Changes
+        """
+
+        self.added |= other.added
+        self.modified |= other.modified - self.added
+        self.deleted |= other.deleted
+        self.discard(other.deleted)
+
+    def discard(self, ids):
+        """
+        Убрать удаленные элементы из добавленных и измененных
+
+        :param ids: Int Id удаленных элементов
+        :type ids: set[int]
+        """
+
+        self.added -= ids
+        self.modified -= ids
+
+    def to_plain(self):
+        """Списки Id для сессии"""
+
+        return [list(self.added), list(self.modified), list(self.deleted)]
+
+    @classmethod
+    def from_plain(cls, plain):
+        added, modified, deleted = plain
+        return cls(added=added, modified=modified, deleted=deleted)
+
+    @classmethod
+    def from_event(cls, event_args, element_filter=None):
+        """
+        :type event_args: DB.Events.DocumentChangedEventArgs
+        :param element_filter: Фильтр добавленных и измененных элементов. Удаленные не фильтруются:
+                               их класс уже не узнать
+        :type element_filter: DB.ElementFilter
+        :rtype: Changes
+        """
+
+        if element_filter is None:
+            added = event_args.GetAddedElementIds()
+            modified = event_args.GetModifiedElementIds()
+        else:
+            added = event_args.GetAddedElementIds(element_filter)
+            modified = event_args.GetModifiedElementIds(element_filter)
+
+        return cls(added=(i.IntegerValue for i in added),
+                   modified=(i.IntegerValue for i in modified),
+                   deleted=(i.IntegerValue for i in event_args.GetDeletedElementIds()))
+
+
+class HookState(object):
+    """
+    Обработчик в текущем движке: функция и настройки декоратора
+
+    Накопленные изменения и статистика - в data, словаре сессии с простыми данными
+    """
+
+    def __init__(self, name, func, classes=None, capture=None, debounce=None, budget=0.1, overruns=3,
+                 ignore_transactions=()):
+        self.name = name
+        self.func = func
+        self.classes = list(classes) if classes else None
+        self.capture = capture
+        self.debounce = debounce
+        self.budget = budget
+        self.overruns = overruns
+        self.ignore_transactions = frozenset(ignore_transactions)
+
+    @property
+    def data(self):
+        return get_data(self.name)
+
+    @property
+    def disabled(self):
+        return self.data['disabled']
+
+    @property
+    def pending(self):
+        return self.data['pending']
+
+    def get_filter(self):
+        if not self.classes:
+            return None
+        if len(self.classes) == 1:
+            return DB.ElementClassFilter(self.classes[0])
+        return DB.LogicalOrFilter([DB.ElementClassFilter(cls) for cls in self.classes])
+
+    def is_ignored(self, event_args):
+        """Событие только от транзакций из ignore_transactions, например от самого обработчика"""
+
+        if not self.ignore_transactions:
+            return False
+        names = set(event_args.GetTransactionNames())
+        return bool(names) and names <= self.ignore_transactions
+
+    def add(self, document, value, changes):
+        """
+        Отложить изменения до Idling
+
+        :type document: DB.Document
+        :param value: Значение capture на момент события, None - без capture
+        :type changes: Changes
+        """
+
+        data = self.data
+        key = get_document_key(document)
+
+        target = None
+        for item in data['pending']:
+            temp_key, temp_value, temp_plain = item
+            if temp_key != key:
+                continue
+
+            temp_changes = Changes.from_plain(temp_plain)
+            if temp_value == value:
+                temp_changes.update(changes)
+                target = item
+            else:
+                temp_changes.discard(changes.deleted)
+            item[2] = temp_changes.to_plain()
+
+        if target is None:
+            data['pending'].append([key, value, changes.to_plain()])
+
+        data['last_event'] = time.time()
+
+    def pop_pending(self, uiapp):
+        """
+        Накопленные изменения по открытым документам
+
+        :type uiapp: UI.UIApplication
+        :return: Пары (документ, Changes или {значение capture: Changes})
+        :rtype: list[(DB.Document, Changes or OrderedDict)]
+        """
+
+        data = self.data
+        pending, data['pending'] = data['pending'], []
+
+        documents = OrderedDict()
+        for key, value, plain in pending:
+            documents.setdefault(key, OrderedDict())[value] = Changes.from_plain(plain)
+
+        result = []
+        for key, batches in documents.items():
+            document = find_document(uiapp, key)
+            if document is None:
+                logging.warning('Hook "{}": document "{}" is closed'.format(self.name, key))
+                continue
+            result.append((document, self.get_argument(batches)))
+        return result
+
+    def get_argument(self, batches):
+        """Второй аргумент обработчика: Changes без capture, иначе {значение capture: Changes}"""
+
+        if self.capture is None:
+            return batches[None]
+        return batches
+
+    def is_ready(self, now):
+        data = self.data
+        return bool(data['pending']) and now - data['last_event'] >= self.debounce
+
+    def run(self, document, argument):
+        """Вызвать обработчик с замером времени"""
+
+        start = timer()
+        try:
+            self.func(document, argument)
+        except Exception:
+            logging.exception('Hook "{}" failed'.format(self.name))
+        finally:
+            self.record(timer() - start)
+
+    def record(self, duration):
+        """
+        Записать время вызова и отключить обработчик, если он выходит за бюджет
+
+        :param duration: Время вызова, с
+        :type duration: float
+        """
+
+        data = self.data
+        milliseconds = duration * 1000
+        index = 0
+        while index < len(HISTOGRAM_BOUNDS) and milliseconds > HISTOGRAM_BOUNDS[index]:
+            index += 1
+        data['histogram'][index] += 1
+
+        data['calls'] += 1
+        data['total'] += duration
+        data['max'] = max(data['max'], duration)
+
+        if self.budget is None or duration <= self.budget:
+            data['overrun_count'] = 0
+            return
+
+        data['overrun_count'] += 1
+        logging.warning('Hook "{}": {:.0f} ms, budget {:.0f} ms'.format(self.name, milliseconds, self.budget * 1000))
+        if data['overrun_count'] >= self.overruns:
+            data['disabled'] = True
+            data['pending'] = []
+            logging.warning('Hook "{}" disabled after {} calls over budget'.format(self.name, data['overrun_count']))
+            logging.warning(format_data(self.name, data))
+
+
+def new_data():
+    """Состояние обработчика в сессии"""
+
+    return {'pending': [],
+            'last_event': 0.0,
+            'idling': False,
+            'disabled': False,
+            'overrun_count': 0,
+            'histogram': [0] * (len(HISTOGRAM_BOUNDS) + 1),
+            'calls': 0,
+            'total': 0.0,
+            'max': 0.0}
+
+
+def get_states():
+    """
+    Состояния всех обработчиков сессии по имени
+
+    :rtype: dict[str, dict]
+    """
+
+    return session.setdefault(SESSION_KEY, dict)
+
+
+def get_data(name):
+    states = get_states()
+    data = states.get(name)
+    if data is None:
+        data = states[name] = new_data()
+    return data
+
+
+def format_data(name, data):
+    if not data['calls']:
+        return u'{}: no calls'.format(name)
+
+    buckets = [u'{}:{}'.format(get_bucket_label(index), count)
+               for index, count in enumerate(data['histogram']) if count]
+
+    return u'{}{}: {} calls, mean {:.1f} ms, max {:.1f} ms [{}]'.format(
+        name, ' (disabled)' if data['disabled'] else '', data['calls'],
+        data['total'] / data['calls'] * 1000, data['max'] * 1000, ', '.join(buckets))
+
+
+def get_bucket_label(index):
+    if index < len(HISTOGRAM_BOUNDS):
+        return '<={}ms'.format(HISTOGRAM_BOUNDS[index])
+    return '>{}ms'.format(HISTOGRAM_BOUNDS[-1])
+
+
+def get_document_key(document):
+    """Ключ документа в сессии: путь к файлу, у несохраненного - имя"""
+
+    return document.PathName or document.Title
+
+
+def find_document(uiapp, key):
+    """
+    Открытый документ по ключу get_document_key
+
+    :type uiapp: UI.UIApplication
+    :type key: str
+    :rtype: DB.Document or None
+    """
+
+    for document in uiapp.Application.Documents:
+        if document.IsValidObject and get_document_key(document) == key:
+            return document
+    return None
+
+
+# Обработчики этого движка по имени
+_registered = OrderedDict()
+
+
+def document_changed(classes=None, debounce=None, budget=0.1, overruns=3, name=None, capture=None,
+                     ignore_transactions=()):
+    """
+    Декоратор обработчика DocumentChanged
+
+    Обработчик вызывается как func(document, changes), где changes - Changes.
+    С capture - как func(document, batches), где batches - {значение capture: Changes}
+    в порядке событий
+
+    :param classes: Классы элементов. Без классов - все элементы
+    :type classes: list[type]
+    :param debounce: Задержка, с. None - вызывать прямо в событии, где документ менять нельзя.
+                     Число - копить изменения и вызвать в Idling, когда событий не было debounce секунд
+    :type debounce: float
+    :param budget: Бюджет времени на вызов, с. None - без ограничения
+    :type budget: float
+    :param overruns: Сколько раз подряд можно выйти за бюджет до отключения
+    :type overruns: int
+    :param name: Имя обработчика. По умолчанию модуль и имя функции
+    :type name: str
+    :param capture: Функция capture(document), которая вызывается в самом событии. Ее результат
+                    (строка или число) запоминается вместе с изменениями этого события
+    :type capture: function
+    :param ignore_transactions: Имена транзакций, события которых пропускаются. Например, транзакция
+                                самого обработчика, чтобы его изменения не вызывали его снова
+    :type ignore_transactions: list[str]
+    """
+
+    def register(func):
+        hook_name = name or '{}.{}'.format(func.__module__, func.__name__)
+        _registered[hook_name] = HookState(hook_name, func, classes, capture, debounce, budget, overruns,
+                                           ignore_transactions)
+        return func
+
+    return register
+
+
+def dispatch_document_changed(event_args, uiapp):
+    """
+    Передать событие обработчикам, объявленным в этом запуске хука
+
+    :type event_args: DB.Events.DocumentChangedEventArgs
+    :type uiapp: UI.UIApplication
+    """
+
+    document = event_args.GetDocument()
+
+    for state in _registered.values():
+        if state.disabled or state.is_ignored(event_args):
+            continue
+
+        changes = Changes.from_event(event_args, state.get_filter())
+        if not (changes.added or changes.modified or (state.classes is None and changes.deleted)):
+            continue
+
+        try:
+            value = state.capture(document) if state.capture is not None else None
+        except Exception:
+            logging.exception('Hook "{}": capture failed'.format(state.name))
+            continue
+
+        if state.debounce is None:
+            state.run(document, state.get_argument(OrderedDict([(value, changes)])))
+        else:
+            state.add(document, value, changes)
+            subscribe_idling(state, uiapp)
+
+
+def subscribe_idling(state, uiapp):
+    """
+    Подписать on_idling этого движка, если отложенные изменения обработчика еще никто не ждет
+
+    Подписка остается у движка, который подписался первым: его on_idling вызывает свои
+    обработчики с теми же именами и отписывается сам
+    """
+
+    data = state.data
+    if not data['idling']:
+        data['idling'] = True
+        uiapp.Idling += on_idling
+
+
+def on_idling(sender, args):
+    """
+    Вызвать отложенные обработчики, у которых истекла задержка. Отписывается, когда ждать нечего
+
+    Пока задержка не истекла, ждет следующего Idling в обычном ритме Revit
+    """
+
+    now = time.time()
+    waiting = False
+
+    for state in _registered.values():
+        if state.disabled or not state.pending:
+            continue
+
+        if not state.is_ready(now):
+            waiting = True
+            continue
+
+        for document, argument in state.pop_pending(sender):
+            if not state.disabled:
+                state.run(document, argument)
+
+    if waiting:
+        return
+
+    sender.Idling -= on_idling
+    for state in _registered.values():
+        state.data['idling'] = False
+
+    for line in format_stats():
+        logging.debug(line)
+
+
+def format_stats():
+    """
+    Статистика всех обработчиков сессии, по строке на обработчик
+
+    :rtype: list[str]
+    """
+
+    return [format_data(name, data) for name, data in sorted(get_states().items())]
@@ -0,0 +1,77 @@
+# coding=utf-8
+""" Естественная сортировка номеров листов
+
+    Номер разбирается одним проходом скомпилированных выражений: числа
+    сравниваются как числа, а не как строки ("КЖ-2" раньше "КЖ-10").
+    Первым сравнивается набор чисел номера, поэтому листы разных марок
+    с одним номером стоят рядом: АР-3, КЖ-3, АР-4. При одинаковых числах -
+    сам номер: "КЖ-12.3" < "КЖ-12.3а" < "КЖ-12.10".
+
+    Числа в ключе дополняются нулями до NUMBER_WIDTH и склеиваются в одну
+    строку: строки сортируются быстрее, чем кортежи чисел.
+
+    Ключи кешируются по исходной строке на весь запуск скрипта: reload_number
+    сортирует номера для каждого выбранного листа, и номера повторяются.
+
+    Пример:
+        numbers = sort_numbers(['КЖ-10', 'КЖ-2', 'АР-2'])  # ['АР-2', 'КЖ-2', 'КЖ-10']
+"""
+
+import re
+
+
+# Все, кроме букв, цифр, пробелов и ASCII-пунктуации
+_NOT_PRINTABLE = re.compile(r'[^\w\s!-/:-@\[-`{-~]', re.UNICODE)
+_NUMBER = re.compile(r'\d+', re.UNICODE)
+
+# Числа длиннее не сравниваются как числа. В номерах листов таких нет
+NUMBER_WIDTH = 12
+
+_keys = {}
+
+
+def clean_number(value):
+    """
+    Номер без непечатаемых символов
+
+    :type value: str
+    :rtype: str
+    """
+
+    return _NOT_PRINTABLE.sub(u'', value)
+
+
+def get_key(value):
+    """
+    Ключ сортировки номера
+
+    :param value: Номер, как есть в параметре
+    :type value: str
+    :return: (числа номера одной строкой, очищенный номер)
+    :rtype: (str, str)
+    """
+
+    key = _keys.get(value)
+    if key is None:
+        clean_value = clean_number(value)
+        numbers = u''.join([number.zfill(NUMBER_WIDTH) for number in _NUMBER.findall(clean_value)])
+        key = _keys[value] = (numbers, clean_value)
+    return key
+
+
+def sort_numbers(values):
+    """
+    Очищенные номера в естественном порядке
+
+    :param values: Номера
+    :type values: list[str]
+    :rtype: list[str]
+    """
+
+    keys = [get_key(value) for value in values]
+    keys.sort()
+    return [clean_value for _, clean_value in keys]
+
+
+def clear_cache():
+    _keys.clear()
@@ -0,0 +1,260 @@
+# coding=utf-8
+""" Доступ к параметрам по имени без поиска по имени у каждого элемента
+
+    Имя параметра разрешается в Definition один раз на категорию и тип элемента,
+    дальше параметр берется через get_Parameter(definition). Значения читаются
+    и пишутся по StorageType, без обертки rpw.
+
+    Пример:
+        accessor = get_accessor('Марка')
+        values = accessor.get_values(old_sheets)
+        accessor.set_values(new_sheets, values)
+
+        parameter_map = ParameterMap.parse('Марка, Подпись3 -> Подпись4')
+        count, skipped = parameter_map.copy(zip(old_sheets, new_sheets))
+
+    Кеш рассчитан на один документ: скрипт кнопки работает с активным документом.
+"""
+
+import logging
+
+import Autodesk.Revit.DB as DB
+
+
+class ParameterNotFound(KeyError):
+    pass
+
+
+class ParameterAccessor(object):
+    """Параметр с одним именем у разных элементов"""
+
+    def __init__(self, name):
+        """
+        :param name: Имя параметра
+        :type name: str
+        """
+
+        self.name = name
+        self.definitions = {}
+
+    @staticmethod
+    def get_key(elem):
+        category_id = elem.Category.Id.IntegerValue if elem.Category is not None else None
+        return category_id, elem.GetTypeId().IntegerValue
+
+    def get_definition(self, elem):
+        """
+        Definition параметра для категории и типа элемента
+
+        :type elem: DB.Element
+        :return: Definition или None, если у элементов этой категории и типа нет параметра
+        :rtype: DB.Definition
+        """
+
+        key = self.get_key(elem)
+        try:
+            return self.definitions[key]
+        except KeyError:
+            params = elem.GetParameters(self.name)
+            definition = self.definitions[key] = params[0].Definition if params else None
+            return definition
+
+    def get_parameter(self, elem):
+        """
+        :type elem: DB.Element
+        :return: Параметр или None
+        :rtype: DB.Parameter
+        """
+
+        definition = self.get_definition(elem)
+        if definition is None:
+            return None
+        return elem.get_Parameter(definition)
+
+    def get_required(self, elem):
+        """
+        :type elem: DB.Element
+        :rtype: DB.Parameter
+        """
+
+        param = self.get_parameter(elem)
+        if param is None:
+            raise ParameterNotFound('Element #{} do not have parameter "{}"'.format(elem.Id, self.name))
+        return param
+
+    def get_value(self, elem):
+        return get_value(self.get_required(elem))
+
+    def set_value(self, elem, value):
+        return set_value(self.get_required(elem), value)
+
+    def get_values(self, elems):
+        """
+        Значения параметра у группы элементов
+
+        :type elems: list[DB.Element]
+        :return: Значения по StorageType, None - если параметра нет
+        :rtype: list
+        """
+
+        values = []
+        for elem in elems:
+            param = self.get_parameter(elem)
+            values.append(get_value(param) if param is not None else None)
+        return values
+
+    def set_values(self, elems, values):
+        """
+        Записать значения параметра группе элементов. Нужна открытая транзакция
+
+        :type elems: list[DB.Element]
+        :param values: Значение для каждого элемента
+        :type values: list
+        :return: Число измененных параметров
+        :rtype: int
+        """
+
+        count = 0
+        for elem, value in zip(elems, values):
+            if set_value(self.get_required(elem), value):
+                count += 1
+        return count
+
+
+class ParameterMap(object):
+    """Карта копирования параметров: имя в исходном элементе -> имя в новом"""
+
+    ARROW = '->'
+
+    def __init__(self, names):
+        """
+        :param names: Пары (имя в исходном элементе, имя в новом)
+        :type names: list[(str, str)]
+        """
+
+        self.names = list(names)
+        self.accessors = [(get_accessor(source), get_accessor(target)) for source, target in self.names]
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Карта из строки настроек: имена через запятую, "источник -> цель" - если имена разные
+
+        :param text: Например "Наим. объекта, Марка, Подпись2 -> Подпись3"
+        :type text: str
+        :rtype: ParameterMap
+        """
+
+        names = []
+        for item in (text or '').split(','):
+            source, _, target = item.partition(cls.ARROW)
+            source, target = source.strip(), target.strip()
+            if source:
+                names.append((source, target or source))
+
+        return cls(names)
+
+    @classmethod
+    def format_names(cls, source, target):
+        """Имена пары в синтаксисе parse"""
+
+        return source if source == target else u'{} {} {}'.format(source, cls.ARROW, target)
+
+    def copy(self, pairs):
+        """
+        Скопировать параметры для пар элементов по карте. Нужна открытая транзакция
+
+        Параметр пропускается, если его нет у одного из элементов, он только для чтения
+        или StorageType параметров разный. Пропущенные параметры возвращаются, чтобы
+        скрипт сообщил о них пользователю
+
+        :param pairs: Пары (исходный элемент, новый элемент)
+        :type pairs: list[(DB.Element, DB.Element)]
+        :return: Число измененных параметров и имена пропущенных, как в parse
+        :rtype: (int, list[str])
+        """
+
+        pairs = list(pairs)
+
+        count = 0
+        skipped = []
+        for source_accessor, target_accessor in self.accessors:
+            skipped_count = 0
+            for source, target in pairs:
+                source_param = source_accessor.get_parameter(source)
+                target_param = target_accessor.get_parameter(target)
+                if (source_param is None or target_param is None or target_param.IsReadOnly
+                        or source_param.StorageType != target_param.StorageType):
+                    skipped_count += 1
+                    continue
+
+                if set_value(target_param, get_value(source_param)):
+                    count += 1
+
+            if skipped_count:
+                skipped.append(self.format_names(source_accessor.name, target_accessor.name))
+                logging.debug('Parameter "{}" -> "{}" is not copied on {} of {} elements'.format(
+                    source_accessor.name, target_accessor.name, skipped_count, len(pairs)))
+
+        return count, skipped
+
+
+_accessors = {}
+
+
+def get_accessor(name):
+    """
+    Общий на запуск скрипта доступ к параметру по имени
+
+    :param name: Имя параметра
+    :type name: str
+    :rtype: ParameterAccessor
+    """
+
+    accessor = _accessors.get(name)
+    if accessor is None:
+        accessor = _accessors[name] = ParameterAccessor(name)
+    return accessor
+
+
+def get_value(param):
+    """
+    Значение параметра по StorageType
+
+    :type param: DB.Parameter
+    :rtype: str or int or float or DB.ElementId
+    """
+
+    storage_type = param.StorageType
+    if storage_type == DB.StorageType.String:
+        return param.AsString()
+    if storage_type == DB.StorageType.Integer:
+        return param.AsInteger()
+    if storage_type == DB.StorageType.Double:
+        return param.AsDouble()
+    if storage_type == DB.StorageType.ElementId:
+        return param.AsElementId()
+    return None
+
+
+def set_value(param, value):
+    """
+    Записать значение, если оно отличается. Нужна открытая транзакция
+
+    :type param: DB.Parameter
+    :param value: Значение того же типа, что вернул get_value. None у строки - пустая строка,
+                  у остальных типов - не менять
+    :return: Было ли изменение
+    :rtype: bool
+    """
+
+    if get_value(param) == value:
+        return False
+
+    if value is None:
+        if param.StorageType != DB.StorageType.String:
+            return False
+        value = ''
+
+    param.Set(value)
+    return True
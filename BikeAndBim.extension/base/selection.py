@@ -34,21 +34,45 @@ def get_selected_by_cat(cat, as_list=False):
     :rtype: DB.Element
     """
 
+    elems = _get_selected_by_cat(cat)
     if as_list:
-        return list(_get_selected_by_cat(cat))
-    return _get_selected_by_cat(cat)
+        return elems
+    return iter(elems)
 
 
 def _get_selected_by_cat(cat):
     """
-    Генератор. Получить элементы в пользовательском выборе определенной категории
+    Элементы в пользовательском выборе определенной категории
+
+    Выбор фильтруется коллектором по Id выбранных элементов, без GetElement на каждый Id
 
     :param cat: BuiltInCategory
     :type cat: DB.BuiltInCategory
     :return: Элементы опр. категории выбранные пользователем
-    :rtype: DB.Element
+    :rtype: list[DB.Element]
+    """
+
+    selection = uidoc.Selection.GetElementIds()
+    if not selection:
+        return []
+
+    collector = DB.FilteredElementCollector(doc, selection).WhereElementIsNotElementType()
+    return list(collector.WherePasses(DB.ElementCategoryFilter(get_category_id(cat))))
+
+
+_category_ids = {}
+
+
+def get_category_id(cat):
+    """
+    Id категории документа. Вычисляется один раз на категорию
+
+    :param cat: BuiltInCategory
+    :type cat: DB.BuiltInCategory
+    :rtype: DB.ElementId
     """
 
-    for elem in get_selected():
-        if elem.Category.Id == DB.Category.GetCategory(doc, cat).Id:
-            yield elem
\ No newline at end of file
+    category_id = _category_ids.get(cat)
+    if category_id is None:
+        category_id = _category_ids[cat] = DB.Category.GetCategory(doc, cat).Id
+    return category_id
@@ -0,0 +1,64 @@
+# coding=utf-8
+""" Данные, которые живут всю сессию Revit
+
+    pyRevit запускает каждую кнопку в новом движке IronPython, поэтому
+    глобальные переменные модулей между запусками не сохраняются.
+    Значения хранятся в переменных окружения pyRevit (AppDomain), а вне pyRevit -
+    в словаре модуля.
+"""
+
+try:
+    from pyrevit.coreutils import envvars
+except ImportError:
+    envvars = None
+
+
+PREFIX = 'BIKEANDBIM_'
+
+_local = {}
+
+
+def get(name, default=None):
+    """
+    Получить значение сессии
+
+    :param name: Имя значения
+    :type name: str
+    :param default: Значение, если ничего не сохранено
+    """
+
+    key = PREFIX + name
+    value = envvars.get_pyrevit_env_var(key) if envvars is not None else _local.get(key)
+    return default if value is None else value
+
+
+def set(name, value):
+    """
+    Сохранить значение на всю сессию
+
+    :param name: Имя значения
+    :type name: str
+    :param value: Любой объект, в том числе словарь
+    """
+
+    key = PREFIX + name
+    if envvars is not None:
+        envvars.set_pyrevit_env_var(key, value)
+    else:
+        _local[key] = value
+
+
+def setdefault(name, factory):
+    """
+    Получить значение сессии, а если его нет - создать через factory и сохранить
+
+    :param name: Имя значения
+    :type name: str
+    :param factory: Функция без аргументов
+    """
+
+    value = get(name)
+    if value is None:
+        value = factory()
+        set(name, value)
+    return value
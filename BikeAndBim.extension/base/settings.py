@@ -0,0 +1,261 @@
+# coding=utf-8
+""" Настройки кнопок из config.ini
+
+    Файл разбирается один раз за сессию Revit и перечитывается, только если
+    изменилось время его изменения. В сессии хранятся только разобранные строки
+    файла: каждый запуск кнопки - новый движок IronPython. Запись накапливается
+    и выполняется одним save(), а если значения не менялись - файл не трогается.
+
+    Формат совместим с PyRevitConfig: строки можно писать в кавычках, при записи
+    строки пишутся в кавычках с экранированием как в JSON. Значения без кавычек -
+    строки, а числа и логические значения разбираются по типу default в get().
+
+    Пример:
+        config = Settings.for_script(__file__)
+        name = config.get('Sheet', 'title_family_name')
+        workers = config.get('Export', 'workers', 4)
+
+        config.set('Setup_names', file_name, option_name)
+        config.save()
+"""
+
+import io
+import json
+import logging
+import os
+from collections import OrderedDict
+
+try:
+    from ConfigParser import RawConfigParser
+except ImportError:
+    from configparser import RawConfigParser
+
+import session
+from files import write_text
+
+
+CONFIG_NAME = 'config.ini'
+SESSION_KEY = 'SETTINGS'
+
+
+_instances = {}
+
+
+def get_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class Settings(object):
+    """
+    Разобранный ini-файл. Экземпляры берутся через Settings.open
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.sections = OrderedDict()
+        self.changed = False
+
+    @classmethod
+    def open(cls, path):
+        """
+        Настройки файла, общие на запуск скрипта. Файл перечитывается, если он изменился
+
+        :param path: Путь к ini-файлу
+        :type path: str
+        :rtype: Settings
+        """
+
+        key = get_key(path)
+
+        settings = _instances.get(key)
+        if settings is None:
+            settings = _instances[key] = cls(path)
+
+        settings.refresh()
+        return settings
+
+    @classmethod
+    def for_script(cls, script_file, name=CONFIG_NAME):
+        """
+        Настройки из файла рядом со скриптом кнопки
+
+        :param script_file: __file__ скрипта
+        :type script_file: str
+        :param name: Имя ini-файла
+        :type name: str
+        :rtype: Settings
+        """
+
+        return cls.open(os.path.join(os.path.dirname(os.path.abspath(script_file)), name))
+
+    def get_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def refresh(self):
+        """
+        Перечитать файл, если он изменился на диске. Несохраненные значения не теряются
+
+        Если файл не менялся с прошлого разбора в этой сессии, строки берутся из сессии
+        """
+
+        mtime = self.get_mtime()
+        if mtime == self.mtime or self.changed:
+            return
+
+        cache = session.setdefault(SESSION_KEY, dict)
+        key = get_key(self.path)
+        cached = cache.get(key)
+        if mtime is not None and cached is not None and cached[0] == mtime:
+            self.sections = self.from_plain(cached[1])
+        else:
+            self.sections = self.read(self.path)
+            cache[key] = [mtime, self.to_plain(self.sections)]
+            logging.debug('Settings: read <{}>'.format(self.path))
+
+        self.mtime = mtime
+
+    @staticmethod
+    def to_plain(sections):
+        """Секции списками строк: в сессии нельзя хранить объекты классов модулей"""
+
+        return [[section, [[option, value] for option, value in options.items()]]
+                for section, options in sections.items()]
+
+    @staticmethod
+    def from_plain(plain):
+        return OrderedDict((section, OrderedDict((option, value) for option, value in options))
+                           for section, options in plain)
+
+    @staticmethod
+    def read(path):
+        """
+        :param path: Путь к ini-файлу
+        :type path: str
+        :return: Значения по секциям, как строки из файла
+        :rtype: OrderedDict[str, OrderedDict[str, str]]
+        """
+
+        parser = RawConfigParser()
+        if os.path.isfile(path):
+            with io.open(path, encoding='utf-8') as config_file:
+                read_file = getattr(parser, 'read_file', None) or parser.readfp
+                read_file(config_file)
+
+        return OrderedDict((section, OrderedDict(parser.items(section))) for section in parser.sections())
+
+    # Чтение
+    def has_section(self, section):
+        return section in self.sections
+
+    def has_option(self, section, option):
+        return self.optionxform(option) in self.sections.get(section, {})
+
+    def get(self, section, option, default=None):
+        """
+        Значение настройки. Строка в кавычках разбирается как строка JSON. Значение без кавычек -
+        строка, а если default - число или bool, то значение того же типа
+
+        :type section: str
+        :type option: str
+        :param default: Значение, если настройки нет или ее не разобрать по типу default
+        """
+
+        value = self.sections.get(section, {}).get(self.optionxform(option))
+        if value is None:
+            return default
+        return self.parse_value(value, default)
+
+    def items(self, section):
+        return [(option, self.parse_value(value)) for option, value in self.sections.get(section, {}).items()]
+
+    # Запись
+    def set(self, section, option, value):
+        """
+        Изменить значение. На диск попадает только после save()
+
+        :type section: str
+        :type option: str
+        :param value: Строка или число
+        """
+
+        options = self.sections.setdefault(section, OrderedDict())
+        option = self.optionxform(option)
+        value = self.format_value(value)
+
+        if options.get(option) != value:
+            options[option] = value
+            self.changed = True
+
+    def save(self):
+        """
+        Записать файл, если значения менялись
+
+        :return: Был ли записан файл
+        :rtype: bool
+        """
+
+        if not self.changed:
+            logging.debug('Settings: <{}> not changed'.format(self.path))
+            return False
+
+        write_text(self.path, self.dumps())
+
+        self.changed = False
+        self.mtime = self.get_mtime()
+        session.setdefault(SESSION_KEY, dict)[get_key(self.path)] = [self.mtime, self.to_plain(self.sections)]
+        logging.debug('Settings: write <{}>'.format(self.path))
+        return True
+
+    def dumps(self):
+        lines = []
+        for section, options in self.sections.items():
+            lines.append(u'[{}]'.format(section))
+            lines.extend(u'{} = {}'.format(option, value) for option, value in options.items())
+            lines.append(u'')
+        return u'\n'.join(lines) + u'\n'
+
+    # Формат значений
+    @staticmethod
+    def optionxform(option):
+        return option.lower()
+
+    @staticmethod
+    def parse_value(value, default=None):
+        """
+        :param value: Строка из файла
+        :type value: str
+        :param default: Образец типа для значений без кавычек
+        """
+
+        value = value.strip()
+        if len(value) > 1 and value[0] == value[-1] == '"':
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value[1:-1]
+
+        if isinstance(default, bool):
+            if value.lower() in ('true', 'yes', 'on', '1'):
+                return True
+            if value.lower() in ('false', 'no', 'off', '0', ''):
+                return False
+        elif isinstance(default, (int, float)):
+            try:
+                return type(default)(value)
+            except ValueError:
+                pass
+        else:
+            return value
+
+        logging.warning('Settings: value "{}" is not {}, use default {}'.format(value, type(default).__name__, default))
+        return default
+
+    @staticmethod
+    def format_value(value):
+        if isinstance(value, (type(u''), str)):
+            return u'{}'.format(json.dumps(value, ensure_ascii=False))
+        return u'{}'.format(value)
@@ -0,0 +1,169 @@
+# coding=utf-8
+""" Подставная модель Revit для запуска скриптов без Revit (CPython)
+
+    Заменяет подмножество Autodesk.Revit.DB/UI, System, clr, rpw и pyRevit,
+    которое используют скрипты расширения. Нужна для профилирования и бенчмарков
+    на синтетических моделях.
+
+    Пример:
+        import standin
+        from standin import models
+
+        document = models.sheets_model(10000)
+        uidoc = standin.install(document)
+
+        import reload_number  # модули скриптов импортировать после install
+
+    Без install() импорт wrapper.py вне Revit падает с ImportError
+"""
+
+import logging
+import sys
+import types
+
+from . import db
+from . import ui
+from . import rpw_api
+from . import pyrevit_api
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+
+class _GenericList(list):
+    """System.Collections.Generic.List[T]"""
+
+    def Add(self, item):
+        self.append(item)
+
+    def AddRange(self, items):
+        self.extend(items)
+
+    def Contains(self, item):
+        return item in self
+
+    @property
+    def Count(self):
+        return len(self)
+
+
+class _Generic(object):
+    def __getitem__(self, item_type):
+        return _GenericList
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def _public(namespace):
+    return dict((k, v) for k, v in vars(namespace).items() if not k.startswith('__'))
+
+
+def _create_modules(ui_document):
+    selection = _module('Autodesk.Revit.UI.Selection', **_public(ui.Selection))
+    exceptions = _module('Autodesk.Revit.Exceptions',
+                         InvalidOperationException=db.InvalidOperationException,
+                         ArgumentException=db.ArgumentException,
+                         OperationCanceledException=type('OperationCanceledException', (Exception,), {}))
+    revit = _module('Autodesk.Revit', DB=db, UI=ui, Exceptions=exceptions)
+    ui.Selection = selection
+
+    generic = _module('System.Collections.Generic', List=_Generic())
+    collections = _module('System.Collections', Generic=generic)
+    system = _module('System', Collections=collections, Byte=int, Int32=int, String=str, Guid=str,
+                     EventHandler=lambda handler: handler)
+
+    logger = rpw_api.create_logger()
+    rpw_exceptions = _module('rpw.exceptions', RpwException=rpw_api.RpwException,
+                             RpwParameterNotFound=rpw_api.RpwParameterNotFound)
+    rpw_utils_dotnet = _module('rpw.utils.dotnet', List=_Generic())
+    rpw_ui_forms = _module('rpw.ui.forms', **_public(rpw_api._Forms))
+    rpw_ui = _module('rpw.ui', Selection=rpw_api.Selection, forms=rpw_ui_forms)
+    rpw = _module('rpw', revit=rpw_api.revit, db=rpw_api.db, ui=rpw_ui, DB=db, UI=ui,
+                  doc=ui_document.Document, uidoc=ui_document, logger=logger,
+                  exceptions=rpw_exceptions, utils=_module('rpw.utils', dotnet=rpw_utils_dotnet),
+                  ScriptError=rpw_api.RpwException)
+
+    transaction = _module('pyrevit.revit.db.transaction', Transaction=pyrevit_api.Transaction)
+    revit_db = _module('pyrevit.revit.db', transaction=transaction)
+    revit_selection = _module('pyrevit.revit.selection', pick_element_by_category=pyrevit_api.pick_element_by_category)
+    pyrevit_revit = _module('pyrevit.revit', db=revit_db, selection=revit_selection,
+                            Transaction=pyrevit_api.Transaction)
+    forms = _module('pyrevit.forms', **_public(pyrevit_api.forms))
+    script = _module('pyrevit.script', **_public(pyrevit_api.script))
+    envvars = _module('pyrevit.coreutils.envvars', **_public(pyrevit_api.envvars))
+    coreutils = _module('pyrevit.coreutils', envvars=envvars)
+    pyrevit = _module('pyrevit', EXEC_PARAMS=pyrevit_api.EXEC_PARAMS, HOST_APP=pyrevit_api.HOST_APP,
+                      forms=forms, revit=pyrevit_revit, script=script, coreutils=coreutils)
+
+    clr = _module('clr', AddReference=lambda name: None)
+
+    return {
+        'Autodesk': _module('Autodesk', Revit=revit),
+        'Autodesk.Revit': revit,
+        'Autodesk.Revit.DB': db,
+        'Autodesk.Revit.DB.Structure': _module('Autodesk.Revit.DB.Structure', **_public(db.Structure)),
+        'Autodesk.Revit.DB.Events': _module('Autodesk.Revit.DB.Events', **_public(db.Events)),
+        'Autodesk.Revit.UI': ui,
+        'Autodesk.Revit.UI.Selection': selection,
+        'Autodesk.Revit.Exceptions': exceptions,
+        'System': system,
+        'System.Collections': collections,
+        'System.Collections.Generic': generic,
+        'clr': clr,
+        'rpw': rpw,
+        'rpw.exceptions': rpw_exceptions,
+        'rpw.utils': rpw.utils,
+        'rpw.utils.dotnet': rpw_utils_dotnet,
+        'rpw.ui': rpw_ui,
+        'rpw.ui.forms': rpw_ui_forms,
+        'pyrevit': pyrevit,
+        'pyrevit.forms': forms,
+        'pyrevit.script': script,
+        'pyrevit.revit': pyrevit_revit,
+        'pyrevit.revit.db': revit_db,
+        'pyrevit.revit.db.transaction': transaction,
+        'pyrevit.revit.selection': revit_selection,
+        'pyrevit.coreutils': coreutils,
+        'pyrevit.coreutils.envvars': envvars,
+    }
+
+
+def install(document=None, selection=(), active_view=None):
+    """
+    Подставить модель вместо Revit API
+
+    Модули скриптов, которые берут doc при импорте, нужно импортировать после install
+
+    :param document: Документ, по умолчанию пустой
+    :type document: db.Document
+    :param selection: Выбранные пользователем элементы
+    :type selection: list[db.Element]
+    :param active_view: Активный вид
+    :type active_view: db.View
+    :return: Активный документ интерфейса
+    :rtype: ui.UIDocument
+    """
+
+    document = document if document is not None else db.Document()
+    if active_view is not None:
+        document.ActiveView = active_view
+
+    ui_document = ui.UIDocument(document)
+    ui_document.Selection.SetElementIds([e.Id for e in selection])
+    ui_application = ui.UIApplication(ui_document)
+
+    sys.modules.update(_create_modules(ui_document))
+    rpw_api.bind(ui_document)
+    pyrevit_api.bind(ui_application)
+
+    builtins.__revit__ = ui_application
+    builtins.__shiftclick__ = False
+
+    logging.debug('Standin document "{}" with {} elements'.format(document.Title, len(document)))
+    return ui_document
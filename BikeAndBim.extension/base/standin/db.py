@@ -0,0 +1,1273 @@
+# coding=utf-8
+""" Подставной Autodesk.Revit.DB
+
+    Только то подмножество API, которое используют скрипты расширения.
+    Элементы хранятся в памяти документа, геометрия упрощена до плоских граней и отрезков
+"""
+
+import math
+import os
+import re
+
+
+# ################# Перечисления ############################################
+class _Enum(object):
+    """Значение перечисления Revit: сравнивается по имени, печатается как в Revit"""
+
+    __slots__ = ('name', 'value')
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, _Enum) and self.name == other.name
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __int__(self):
+        return self.value
+
+    def __str__(self):
+        return self.name
+
+    __repr__ = __str__
+
+
+def _enum(name, members, start=0, step=1):
+    attrs = dict((member, _Enum(member, start + step * i)) for i, member in enumerate(members))
+    return type(name, (object,), attrs)
+
+
+BuiltInCategory = _enum('BuiltInCategory', [
+    'INVALID', 'OST_Grids', 'OST_GridChains', 'OST_StructuralColumns', 'OST_Rebar', 'OST_Sheets',
+    'OST_TitleBlocks', 'OST_GenericAnnotation', 'OST_Viewports', 'OST_TextNotes', 'OST_Views',
+    'OST_Dimensions', 'OST_Walls',
+], start=-2000000, step=-1)
+
+BuiltInParameter = _enum('BuiltInParameter', [
+    'INVALID', 'SHEET_NUMBER', 'SHEET_NAME', 'COLUMN_LOCATION_MARK', 'TEXT_WIDTH_SCALE', 'DOOR_NUMBER',
+    'ALL_MODEL_INSTANCE_COMMENTS', 'IMPORT_BACKGROUND', 'VIEW_NAME', 'ELEM_FAMILY_PARAM', 'EDITED_BY',
+    'VIEWER_SHEET_NUMBER',
+], start=-1000000, step=-1)
+
+StorageType = _enum('StorageType', ['None', 'Integer', 'Double', 'String', 'ElementId'])
+
+ViewType = _enum('ViewType', [
+    'Undefined', 'FloorPlan', 'EngineeringPlan', 'AreaPlan', 'CeilingPlan', 'Elevation', 'Section',
+    'Detail', 'ThreeD', 'Schedule', 'DraftingView', 'DrawingSheet', 'Legend', 'Report', 'ProjectBrowser',
+])
+
+TransactionStatus = _enum('TransactionStatus', ['Uninitialized', 'Started', 'RolledBack', 'Committed'])
+
+ACADVersion = _enum('ACADVersion', ['Default', 'R2007', 'R2010', 'R2013', 'R2018'])
+
+FailureProcessingResult = _enum('FailureProcessingResult', ['Continue', 'ProceedWithCommit', 'ProceedWithRollBack'])
+
+
+# ################# Геометрия ###############################################
+class XYZ(object):
+    __slots__ = ('X', 'Y', 'Z')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.X = float(x)
+        self.Y = float(y)
+        self.Z = float(z)
+
+    def __add__(self, other):
+        return XYZ(self.X + other.X, self.Y + other.Y, self.Z + other.Z)
+
+    def __sub__(self, other):
+        return XYZ(self.X - other.X, self.Y - other.Y, self.Z - other.Z)
+
+    def __mul__(self, value):
+        return XYZ(self.X * value, self.Y * value, self.Z * value)
+
+    __rmul__ = __mul__
+
+    def __div__(self, value):
+        return XYZ(self.X / value, self.Y / value, self.Z / value)
+
+    __truediv__ = __div__
+
+    def __neg__(self):
+        return XYZ(-self.X, -self.Y, -self.Z)
+
+    def __str__(self):
+        return '({:.9f}, {:.9f}, {:.9f})'.format(self.X, self.Y, self.Z)
+
+    __repr__ = __str__
+
+    def Add(self, other):
+        return self + other
+
+    def Subtract(self, other):
+        return self - other
+
+    def Multiply(self, value):
+        return self * value
+
+    def Negate(self):
+        return -self
+
+    def DotProduct(self, other):
+        return self.X * other.X + self.Y * other.Y + self.Z * other.Z
+
+    def CrossProduct(self, other):
+        return XYZ(self.Y * other.Z - self.Z * other.Y,
+                   self.Z * other.X - self.X * other.Z,
+                   self.X * other.Y - self.Y * other.X)
+
+    def GetLength(self):
+        return math.sqrt(self.DotProduct(self))
+
+    def Normalize(self):
+        length = self.GetLength()
+        return self / length if length else XYZ()
+
+    def DistanceTo(self, other):
+        return (self - other).GetLength()
+
+    def AngleTo(self, other):
+        lengths = self.GetLength() * other.GetLength()
+        if not lengths:
+            return 0.0
+        return math.acos(max(-1.0, min(1.0, self.DotProduct(other) / lengths)))
+
+    def IsAlmostEqualTo(self, other, tolerance=1e-9):
+        return (abs(self.X - other.X) <= tolerance and
+                abs(self.Y - other.Y) <= tolerance and
+                abs(self.Z - other.Z) <= tolerance)
+
+    def IsZeroLength(self):
+        return self.GetLength() == 0
+
+
+XYZ.Zero = XYZ(0, 0, 0)
+XYZ.BasisX = XYZ(1, 0, 0)
+XYZ.BasisY = XYZ(0, 1, 0)
+XYZ.BasisZ = XYZ(0, 0, 1)
+
+
+class Transform(object):
+    def __init__(self, origin=None, basis_x=None, basis_y=None):
+        self.Origin = origin or XYZ.Zero
+        self.BasisX = basis_x or XYZ.BasisX
+        self.BasisY = basis_y or XYZ.BasisY
+
+    @staticmethod
+    def CreateTranslation(vector):
+        return Transform(origin=vector)
+
+    @staticmethod
+    def CreateRotationAtPoint(axis, angle, origin):
+        cos, sin = math.cos(angle), math.sin(angle)
+        basis_x, basis_y = XYZ(cos, sin, 0), XYZ(-sin, cos, 0)
+        shift = origin - (basis_x * origin.X + basis_y * origin.Y)
+        return Transform(XYZ(shift.X, shift.Y, 0), basis_x, basis_y)
+
+    def OfPoint(self, point):
+        return self.Origin + self.BasisX * point.X + self.BasisY * point.Y + XYZ.BasisZ * point.Z
+
+    def OfVector(self, vector):
+        return self.BasisX * vector.X + self.BasisY * vector.Y + XYZ.BasisZ * vector.Z
+
+
+class BoundingBoxXYZ(object):
+    def __init__(self, minimum=None, maximum=None):
+        self.Min = minimum or XYZ()
+        self.Max = maximum or XYZ()
+
+
+class Curve(object):
+    def Tessellate(self):
+        return [self.GetEndPoint(0), self.GetEndPoint(1)]
+
+
+class Line(Curve):
+    def __init__(self, origin, direction, length=None):
+        self.Origin = origin
+        self.Direction = direction.Normalize()
+        self.Length = length
+        self.IsBound = length is not None
+
+    @staticmethod
+    def CreateBound(start, end):
+        return Line(start, end - start, start.DistanceTo(end))
+
+    @staticmethod
+    def CreateUnbound(origin, direction):
+        return Line(origin, direction)
+
+    def GetEndPoint(self, index):
+        return self.Origin if index == 0 else self.Origin + self.Direction * (self.Length or 0.0)
+
+    def Project(self, point):
+        t = (point - self.Origin).DotProduct(self.Direction)
+        if self.IsBound:
+            t = max(0.0, min(self.Length, t))
+        return self.Origin + self.Direction * t
+
+    def Distance(self, point):
+        return self.Project(point).DistanceTo(point)
+
+
+class Arc(Curve):
+    """Дуга в плоскости XY"""
+
+    def __init__(self, center, radius, start_angle, end_angle):
+        self.Center = center
+        self.Radius = radius
+        self.start_angle = start_angle
+        self.end_angle = end_angle
+        self.IsBound = True
+
+    @staticmethod
+    def Create(center, radius, start_angle, end_angle, x_axis=None, y_axis=None):
+        return Arc(center, radius, start_angle, end_angle)
+
+    def _point(self, angle):
+        return self.Center + XYZ(math.cos(angle), math.sin(angle), 0) * self.Radius
+
+    def GetEndPoint(self, index):
+        return self._point(self.start_angle if index == 0 else self.end_angle)
+
+    @property
+    def Direction(self):
+        return (self.GetEndPoint(1) - self.GetEndPoint(0)).Normalize()
+
+    def Tessellate(self):
+        count = max(2, int(abs(self.end_angle - self.start_angle) / (math.pi / 36)) + 1)
+        step = (self.end_angle - self.start_angle) / (count - 1)
+        return [self._point(self.start_angle + step * i) for i in range(count)]
+
+    def Distance(self, point):
+        points = self.Tessellate()
+        return min(Line.CreateBound(a, b).Distance(point) for a, b in zip(points, points[1:]))
+
+
+class Options(object):
+    def __init__(self):
+        self.ComputeReferences = False
+        self.IncludeNonVisibleObjects = False
+        self.View = None
+
+
+class GeometryObject(object):
+    pass
+
+
+class Reference(object):
+    """Ссылка на элемент или его грань. point - положение ссылки для расчета размеров"""
+
+    def __init__(self, element, point=None):
+        self.ElementId = element.Id
+        self.point = point
+        if point is None and getattr(element, 'Curve', None) is not None:
+            self.point = element.Curve.GetEndPoint(0)
+
+
+class ReferenceArray(object):
+    def __init__(self):
+        self._items = []
+
+    def Append(self, reference):
+        self._items.append(reference)
+
+    @property
+    def Size(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PlanarFace(GeometryObject):
+    def __init__(self, element, normal, origin):
+        self.FaceNormal = normal
+        self.Origin = origin
+        self.Reference = Reference(element, origin)
+
+
+class FaceArray(list):
+    @property
+    def Size(self):
+        return len(self)
+
+    def get_Item(self, index):
+        return self[index]
+
+
+class Solid(GeometryObject):
+    def __init__(self, faces, volume=1.0):
+        self.Faces = FaceArray(faces)
+        self.Volume = volume
+
+
+# ################# Идентификаторы и категории ##############################
+class ElementId(object):
+    __slots__ = ('IntegerValue',)
+
+    def __init__(self, value):
+        self.IntegerValue = int(value)
+
+    def __eq__(self, other):
+        return isinstance(other, ElementId) and self.IntegerValue == other.IntegerValue
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.IntegerValue)
+
+    def __str__(self):
+        return str(self.IntegerValue)
+
+    __repr__ = __str__
+
+    def __int__(self):
+        return self.IntegerValue
+
+
+ElementId.InvalidElementId = ElementId(-1)
+
+
+class Category(object):
+    _categories = {}
+
+    def __init__(self, bic):
+        self.Id = ElementId(int(bic))
+        self.Name = bic.name
+        self.BuiltInCategory = bic
+
+    @classmethod
+    def GetCategory(cls, document, bic):
+        if isinstance(bic, ElementId):
+            bic = _category_by_id(bic)
+        if bic not in cls._categories:
+            cls._categories[bic] = Category(bic)
+        return cls._categories[bic]
+
+
+def _category_by_id(category_id):
+    for name in dir(BuiltInCategory):
+        bic = getattr(BuiltInCategory, name)
+        if isinstance(bic, _Enum) and int(bic) == category_id.IntegerValue:
+            return bic
+    raise ArgumentException('Category #{} not found'.format(category_id))
+
+
+# ################# Параметры ###############################################
+class Definition(object):
+    _next_id = 1
+
+    def __init__(self, name, storage_type=StorageType.String):
+        self.Name = name
+        self.storage_type = storage_type
+        self.Id = ElementId(Definition._next_id)
+        Definition._next_id += 1
+
+
+class Parameter(object):
+    __slots__ = ('Definition', 'Element', 'value', 'IsReadOnly', 'Id')
+
+    def __init__(self, element, definition, value=None, read_only=False):
+        self.Definition = definition
+        self.Element = element
+        self.value = value
+        self.IsReadOnly = read_only
+        self.Id = definition.Id
+
+    @property
+    def StorageType(self):
+        return self.Definition.storage_type
+
+    @property
+    def HasValue(self):
+        return self.value is not None
+
+    def AsString(self):
+        if self.StorageType == StorageType.String:
+            return self.value
+
+    def AsValueString(self):
+        return None if self.value is None else str(self.value)
+
+    def AsInteger(self):
+        return int(self.value or 0)
+
+    def AsDouble(self):
+        return float(self.value or 0.0)
+
+    def AsElementId(self):
+        return self.value if isinstance(self.value, ElementId) else ElementId.InvalidElementId
+
+    def Set(self, value):
+        if self.IsReadOnly:
+            raise InvalidOperationException(u'Parameter "{}" is read only'.format(self.Definition.Name))
+        document = self.Element.Document
+        document.check_modifiable()
+        document.record_undo(setattr, self, 'value', self.value)
+        self.value = value
+        return True
+
+
+class InvalidOperationException(Exception):
+    pass
+
+
+class ArgumentException(Exception):
+    pass
+
+
+# ################# Элементы ################################################
+class Element(object):
+    category = None
+    default_name = ''
+
+    def __init__(self, name=None, category=None, owner_view_id=None):
+        self.Id = ElementId.InvalidElementId
+        self.Document = None
+        self.Name = self.default_name if name is None else name
+        bic = category if category is not None else self.category
+        self.Category = Category.GetCategory(None, bic) if bic is not None else None
+        self.OwnerViewId = owner_view_id or ElementId.InvalidElementId
+        self.Location = None
+        self.type_id = ElementId.InvalidElementId
+        self._parameters = {}
+
+    # Параметры
+    def add_parameter(self, name, value=None, storage_type=None, read_only=False):
+        """Добавить параметр. name - имя или BuiltInParameter"""
+
+        if storage_type is None:
+            storage_type = {int: StorageType.Integer, float: StorageType.Double,
+                            ElementId: StorageType.ElementId}.get(type(value), StorageType.String)
+        definition = Definition(str(name) if isinstance(name, _Enum) else name, storage_type)
+        self._parameters[name] = Parameter(self, definition, value, read_only)
+        return self._parameters[name]
+
+    def get_Parameter(self, key):
+        if isinstance(key, Definition):
+            for parameter in self._parameters.values():
+                if parameter.Definition.Name == key.Name:
+                    return parameter
+            return None
+        return self._parameters.get(key)
+
+    def LookupParameter(self, name):
+        return self._parameters.get(name)
+
+    def GetParameters(self, name):
+        parameter = self._parameters.get(name)
+        return [parameter] if parameter is not None else []
+
+    @property
+    def Parameters(self):
+        return list(self._parameters.values())
+
+    def GetTypeId(self):
+        return self.type_id
+
+    def ChangeTypeId(self, type_id):
+        if self.Document is not None:
+            self.Document.record_undo(setattr, self, 'type_id', self.type_id)
+        self.type_id = type_id
+
+    def get_BoundingBox(self, view):
+        point = getattr(self.Location, 'Point', None)
+        if point is None:
+            return None
+        return BoundingBoxXYZ(point, point)
+
+    def visible_in(self, view_id):
+        """Видимость элемента на виде для коллектора по виду"""
+
+        if self.OwnerViewId != ElementId.InvalidElementId:
+            return self.OwnerViewId == view_id
+        view = self.Document.GetElement(view_id)
+        return (view is not None and view.ViewType != ViewType.DrawingSheet
+                and self.Id.IntegerValue not in view.hidden)
+
+
+class ElementType(Element):
+    pass
+
+
+class LocationPoint(object):
+    def __init__(self, point):
+        self.Point = point
+
+
+class LocationCurve(object):
+    def __init__(self, curve):
+        self.Curve = curve
+
+
+class Family(Element):
+    pass
+
+
+class FamilySymbol(ElementType):
+    def __init__(self, family, name=None, category=None):
+        super(FamilySymbol, self).__init__(name=name or family.Name, category=category)
+        self.Family = family
+        self.FamilyName = family.Name
+
+
+class FamilyInstance(Element):
+    def __init__(self, symbol, point=None, owner_view_id=None,
+                 facing=None, hand=None, width=1.0, depth=1.0):
+        super(FamilyInstance, self).__init__(name=symbol.Name, category=symbol.Category.BuiltInCategory
+                                             if symbol.Category else None, owner_view_id=owner_view_id)
+        self.Symbol = symbol
+        self.type_id = symbol.Id
+        self.Location = LocationPoint(point or XYZ())
+        self.FacingOrientation = facing or XYZ.BasisY
+        self.HandOrientation = hand or XYZ.BasisX
+        self.width = width
+        self.depth = depth
+
+    def get_Geometry(self, options):
+        """Прямоугольная призма по размерам экземпляра: 4 боковые грани, верх и низ. У наклонной - от начала оси"""
+
+        location = self.Location
+        point = location.Curve.GetEndPoint(0) if isinstance(location, LocationCurve) else location.Point
+        facing, hand = self.FacingOrientation, self.HandOrientation
+        faces = [
+            PlanarFace(self, facing, point + facing * (self.depth / 2)),
+            PlanarFace(self, -facing, point - facing * (self.depth / 2)),
+            PlanarFace(self, hand, point + hand * (self.width / 2)),
+            PlanarFace(self, -hand, point - hand * (self.width / 2)),
+            PlanarFace(self, XYZ.BasisZ, point + XYZ(0, 0, 10)),
+            PlanarFace(self, -XYZ.BasisZ, point),
+        ]
+        return [Solid(faces, volume=self.width * self.depth * 10)]
+
+
+class AnnotationSymbol(FamilyInstance):
+    pass
+
+
+class TextNote(Element):
+    category = BuiltInCategory.OST_TextNotes
+
+    def __init__(self, text='', owner_view_id=None):
+        super(TextNote, self).__init__(name='Text', owner_view_id=owner_view_id)
+        self.Text = text
+
+
+class Grid(Element):
+    category = BuiltInCategory.OST_Grids
+
+    def __init__(self, name, curve):
+        super(Grid, self).__init__(name=name)
+        self.Curve = curve
+
+
+class MultiSegmentGrid(Element):
+    category = BuiltInCategory.OST_GridChains
+
+    def __init__(self, name, grid_ids=()):
+        super(MultiSegmentGrid, self).__init__(name=name)
+        self._grid_ids = list(grid_ids)
+
+    def GetGridIds(self):
+        return list(self._grid_ids)
+
+
+class View(Element):
+    category = BuiltInCategory.OST_Views
+    view_type = ViewType.FloorPlan
+
+    def __init__(self, name, view_type=None, scale=100):
+        super(View, self).__init__(name=name)
+        self.ViewType = view_type or self.view_type
+        self.Scale = scale
+        self.IsTemplate = False
+        self.ViewTemplateId = ElementId.InvalidElementId
+        self.Origin = XYZ()
+        self.UpDirection = XYZ.BasisY
+        self.ViewDirection = -XYZ.BasisZ
+        self.CropBox = BoundingBoxXYZ()
+        self.overrides = {}
+        # int Id элементов, которые не видны на виде: за подрезкой, скрыты фильтром
+        self.hidden = set()
+
+    @property
+    def Title(self):
+        return u'{}: {}'.format(self.ViewType, self.Name)
+
+    def SetElementOverrides(self, element_id, overrides):
+        self.overrides[element_id] = overrides
+
+
+class View3D(View):
+    view_type = ViewType.ThreeD
+
+
+class ViewSheet(View):
+    category = BuiltInCategory.OST_Sheets
+    view_type = ViewType.DrawingSheet
+
+    def __init__(self, number, name='Unnamed'):
+        super(ViewSheet, self).__init__(name=name)
+        self.add_parameter(BuiltInParameter.SHEET_NUMBER, number)
+        self.add_parameter(BuiltInParameter.SHEET_NAME, name)
+
+    @property
+    def SheetNumber(self):
+        return self.get_Parameter(BuiltInParameter.SHEET_NUMBER).AsString()
+
+    @SheetNumber.setter
+    def SheetNumber(self, value):
+        self.get_Parameter(BuiltInParameter.SHEET_NUMBER).Set(value)
+
+    @property
+    def Title(self):
+        return u'Sheet: {} - {}'.format(self.SheetNumber, self.Name)
+
+    @staticmethod
+    def Create(document, title_block_type_id):
+        document.check_modifiable()
+        sheet = document.add(ViewSheet(number='', name='Unnamed'))
+        symbol = document.GetElement(title_block_type_id)
+        document.add(FamilyInstance(symbol, owner_view_id=sheet.Id))
+        return sheet
+
+    def GetAllPlacedViews(self):
+        return set(viewport.ViewId for viewport in self.Document.owned_by(self.Id) if isinstance(viewport, Viewport))
+
+
+class Viewport(Element):
+    category = BuiltInCategory.OST_Viewports
+
+    def __init__(self, sheet_id, view_id, center):
+        super(Viewport, self).__init__(name='Viewport', owner_view_id=sheet_id)
+        self.SheetId = sheet_id
+        self.ViewId = view_id
+        self.center = center
+
+    def GetBoxCenter(self):
+        return self.center
+
+    @staticmethod
+    def Create(document, sheet_id, view_id, center):
+        document.check_modifiable()
+        return document.add(Viewport(sheet_id, view_id, center))
+
+
+class DimensionType(ElementType):
+    category = BuiltInCategory.OST_Dimensions
+
+    def __init__(self, name='Linear', text_width=0.7):
+        super(DimensionType, self).__init__(name=name)
+        self.add_parameter(BuiltInParameter.TEXT_WIDTH_SCALE, text_width)
+
+
+class DimensionSegment(object):
+    def __init__(self, origin, value):
+        self.Origin = origin
+        self.Value = value
+        self.TextPosition = origin
+
+    @property
+    def ValueString(self):
+        return '{:.0f}'.format(self.Value * 304.8)
+
+
+class DimensionSegmentArray(list):
+    @property
+    def Size(self):
+        return len(self)
+
+
+class Dimension(Element):
+    category = BuiltInCategory.OST_Dimensions
+
+    def __init__(self, view, line, references, dimension_type):
+        super(Dimension, self).__init__(name=dimension_type.Name, owner_view_id=view.Id)
+        self.View = view
+        self.Curve = line
+        self.References = list(references)
+        self.DimensionType = dimension_type
+        self.type_id = dimension_type.Id
+        self.Segments = self._create_segments(line, self.References)
+
+    @staticmethod
+    def _create_segments(line, references):
+        points = [line.Project(ref.point) for ref in references if ref.point is not None]
+        positions = sorted((((point - line.Origin).DotProduct(line.Direction), point) for point in points),
+                           key=lambda position: position[0])
+
+        segments = DimensionSegmentArray()
+        for (t1, p1), (t2, p2) in zip(positions, positions[1:]):
+            segments.append(DimensionSegment((p1 + p2) * 0.5, t2 - t1))
+        return segments
+
+
+class Rebar(Element):
+    category = BuiltInCategory.OST_Rebar
+
+    def __init__(self, name='Rebar'):
+        super(Rebar, self).__init__(name=name)
+        self.unobscured = set()
+        self.solid = set()
+
+    def IsUnobscuredInView(self, view):
+        return view.Id.IntegerValue in self.unobscured
+
+    def SetUnobscuredInView(self, view, value):
+        self.Document.check_modifiable()
+        (self.unobscured.add if value else self.unobscured.discard)(view.Id.IntegerValue)
+
+    def IsSolidInView(self, view):
+        return view.Id.IntegerValue in self.solid
+
+    def SetSolidInView(self, view, value):
+        self.Document.check_modifiable()
+        if view.ViewType != ViewType.ThreeD:
+            raise ArgumentException('View is not 3D')
+        (self.solid.add if value else self.solid.discard)(view.Id.IntegerValue)
+
+
+class Structure(object):
+    Rebar = Rebar
+
+
+class DocumentChangedEventArgs(object):
+    """Аргументы DocumentChanged: Id добавленных, измененных и удаленных элементов"""
+
+    def __init__(self, document, added=(), modified=(), deleted=(), transaction_names=()):
+        self.document = document
+        self.added = list(added)
+        self.modified = list(modified)
+        self.deleted = list(deleted)
+        self.transaction_names = list(transaction_names)
+
+    def GetDocument(self):
+        return self.document
+
+    def _filter(self, ids, element_filter):
+        if element_filter is None:
+            return list(ids)
+        return [i for i in ids if element_filter.passes(self.document.GetElement(i))]
+
+    def GetAddedElementIds(self, element_filter=None):
+        return self._filter(self.added, element_filter)
+
+    def GetModifiedElementIds(self, element_filter=None):
+        return self._filter(self.modified, element_filter)
+
+    def GetDeletedElementIds(self):
+        return list(self.deleted)
+
+    def GetTransactionNames(self):
+        return list(self.transaction_names)
+
+
+class Events(object):
+    DocumentChangedEventArgs = DocumentChangedEventArgs
+
+
+class ImportInstance(Element):
+    pass
+
+
+# ################# Фильтры и коллектор #####################################
+class ElementFilter(object):
+    def passes(self, element):
+        raise NotImplementedError
+
+
+class ElementCategoryFilter(ElementFilter):
+    def __init__(self, category, inverted=False):
+        self.category_id = category if isinstance(category, ElementId) else ElementId(int(category))
+        self.inverted = inverted
+
+    def passes(self, element):
+        result = element.Category is not None and element.Category.Id == self.category_id
+        return result is not self.inverted
+
+
+class ElementMulticategoryFilter(ElementFilter):
+    def __init__(self, categories, inverted=False):
+        self.category_ids = set(c.IntegerValue if isinstance(c, ElementId) else int(c) for c in categories)
+        self.inverted = inverted
+
+    def passes(self, element):
+        result = element.Category is not None and element.Category.Id.IntegerValue in self.category_ids
+        return result is not self.inverted
+
+
+class ElementClassFilter(ElementFilter):
+    def __init__(self, cls, inverted=False):
+        self.cls = cls
+        self.inverted = inverted
+
+    def passes(self, element):
+        return isinstance(element, self.cls) is not self.inverted
+
+
+class ElementIsElementTypeFilter(ElementFilter):
+    def __init__(self, inverted=False):
+        self.inverted = inverted
+
+    def passes(self, element):
+        return isinstance(element, ElementType) is not self.inverted
+
+
+class ElementOwnerViewFilter(ElementFilter):
+    def __init__(self, view_id, inverted=False):
+        self.view_id = view_id
+        self.inverted = inverted
+
+    def passes(self, element):
+        return (element.OwnerViewId == self.view_id) is not self.inverted
+
+
+class LogicalOrFilter(ElementFilter):
+    def __init__(self, first, second=None):
+        self.filters = list(first) if second is None else [first, second]
+
+    def passes(self, element):
+        return any(f.passes(element) for f in self.filters)
+
+
+class LogicalAndFilter(ElementFilter):
+    def __init__(self, first, second=None):
+        self.filters = list(first) if second is None else [first, second]
+
+    def passes(self, element):
+        return all(f.passes(element) for f in self.filters)
+
+
+class FilteredElementCollector(object):
+    def __init__(self, document, scope=None):
+        # Коллектор, как в Revit, можно обходить несколько раз: источник - функция
+        self.document = document
+        if scope is None:
+            self._source = document.elements
+        elif isinstance(scope, ElementId):
+            view_id = scope
+            view = document.GetElement(view_id)
+            if view is not None and view.ViewType == ViewType.DrawingSheet:
+                # На листе видны только его собственные элементы
+                self._source = lambda: iter(document.owned_by(view_id))
+            else:
+                self._source = lambda: (e for e in document.elements() if e.visible_in(view_id))
+        else:
+            ids = list(scope)
+            if not ids:
+                raise ArgumentException('The input element id collection is empty')
+            self._source = lambda: (document.GetElement(i) for i in ids)
+        self._filters = []
+
+    def _where(self, predicate):
+        self._filters.append(predicate)
+        return self
+
+    def OfClass(self, cls):
+        return self._where(lambda e: isinstance(e, cls))
+
+    def OfCategory(self, bic):
+        return self.OfCategoryId(ElementId(int(bic)))
+
+    def OfCategoryId(self, category_id):
+        return self._where(lambda e: e.Category is not None and e.Category.Id == category_id)
+
+    def WherePasses(self, element_filter):
+        return self._where(element_filter.passes)
+
+    def WhereElementIsNotElementType(self):
+        return self._where(lambda e: not isinstance(e, ElementType))
+
+    def WhereElementIsElementType(self):
+        return self._where(lambda e: isinstance(e, ElementType))
+
+    def OwnedByView(self, view_id):
+        return self._where(lambda e: e.OwnerViewId == view_id)
+
+    def _iter(self):
+        filters = self._filters
+        for element in self._source():
+            if element is not None and all(f(element) for f in filters):
+                yield element
+
+    def __iter__(self):
+        return self._iter()
+
+    def ToElements(self):
+        return list(self._iter())
+
+    def ToElementIds(self):
+        return [e.Id for e in self._iter()]
+
+    def GetElementCount(self):
+        return sum(1 for _ in self._iter())
+
+    def FirstElement(self):
+        return next(self._iter(), None)
+
+    def FirstElementId(self):
+        element = self.FirstElement()
+        return element.Id if element is not None else ElementId.InvalidElementId
+
+
+# ################# Транзакции ##############################################
+class _TransactionBase(object):
+    def __init__(self, document, name=''):
+        self.document = document
+        self.name = name
+        self.status = TransactionStatus.Uninitialized
+
+    def GetName(self):
+        return self.name
+
+    def GetStatus(self):
+        return self.status
+
+    def HasStarted(self):
+        return self.status == TransactionStatus.Started
+
+    def __enter__(self):
+        self.Start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.Commit()
+        else:
+            self.RollBack()
+
+
+class Transaction(_TransactionBase):
+    def __init__(self, document, name=''):
+        super(Transaction, self).__init__(document, name)
+        self._failure_options = FailureHandlingOptions()
+
+    def Start(self, name=None):
+        self.document.start_transaction(self)
+        self.status = TransactionStatus.Started
+        return self.status
+
+    def Commit(self):
+        self.document.end_transaction(self)
+        self.status = TransactionStatus.Committed
+        return self.status
+
+    def RollBack(self):
+        self.document.undo(0)
+        self.document.end_transaction(self)
+        self.status = TransactionStatus.RolledBack
+        return self.status
+
+    def GetFailureHandlingOptions(self):
+        return self._failure_options
+
+    def SetFailureHandlingOptions(self, options):
+        self._failure_options = options
+
+
+class SubTransaction(_TransactionBase):
+    """RollBack отменяет изменения, сделанные после Start. Commit оставляет их внешней транзакции"""
+
+    def __init__(self, document):
+        super(SubTransaction, self).__init__(document)
+        self._undo_mark = 0
+
+    def Start(self):
+        self.document.check_modifiable()
+        self._undo_mark = self.document.undo_mark()
+        self.status = TransactionStatus.Started
+        return self.status
+
+    def Commit(self):
+        self.status = TransactionStatus.Committed
+        return self.status
+
+    def RollBack(self):
+        self.document.undo(self._undo_mark)
+        self.status = TransactionStatus.RolledBack
+        return self.status
+
+
+class TransactionGroup(_TransactionBase):
+    def Start(self, name=None):
+        self.status = TransactionStatus.Started
+        return self.status
+
+    def Commit(self):
+        self.status = TransactionStatus.Committed
+        return self.status
+
+    def Assimilate(self):
+        return self.Commit()
+
+    def RollBack(self):
+        self.status = TransactionStatus.RolledBack
+        return self.status
+
+
+class FailureHandlingOptions(object):
+    def __init__(self):
+        self.preprocessor = None
+
+    def SetFailuresPreprocessor(self, preprocessor):
+        self.preprocessor = preprocessor
+        return self
+
+
+class IFailuresPreprocessor(object):
+    pass
+
+
+class BuiltInFailures(object):
+    class GeneralFailures(object):
+        DuplicateValue = 'DuplicateValue'
+
+
+# ################# Экспорт #################################################
+class BaseExportOptions(object):
+    setup_names = ['RC Layers Standard VBP']
+
+    @classmethod
+    def GetPredefinedSetupNames(cls, document):
+        return list(cls.setup_names)
+
+
+class DWGExportOptions(BaseExportOptions):
+    def __init__(self, name=''):
+        self.name = name
+        self.FileVersion = ACADVersion.Default
+        self.MergedViews = False
+
+    @staticmethod
+    def GetPredefinedOptions(document, name):
+        return DWGExportOptions(name)
+
+
+class ElementTransformUtils(object):
+    @staticmethod
+    def CopyElements(source_view, element_ids, destination_view, transform, options):
+        document = source_view.Document
+        document.check_modifiable()
+
+        new_ids = []
+        for element_id in element_ids:
+            element = document.GetElement(element_id)
+            copy = document.add(_copy_element(element, destination_view.Id))
+            new_ids.append(copy.Id)
+        return new_ids
+
+
+def _copy_element(element, owner_view_id):
+    copy = object.__new__(type(element))
+    copy.__dict__.update(element.__dict__)
+    copy.Id = ElementId.InvalidElementId
+    copy.OwnerViewId = owner_view_id
+    copy._parameters = {}
+    for key, parameter in element._parameters.items():
+        copy._parameters[key] = Parameter(copy, parameter.Definition, parameter.value, parameter.IsReadOnly)
+    return copy
+
+
+class BasicFileInfo(object):
+    def __init__(self, path):
+        self.CentralPath = path
+
+    @staticmethod
+    def Extract(path):
+        return BasicFileInfo(path)
+
+
+class ModelPathUtils(object):
+    @staticmethod
+    def ConvertModelPathToUserVisiblePath(path):
+        return str(path)
+
+
+# ################# Документ ################################################
+class Application(object):
+    class _Create(object):
+        @staticmethod
+        def NewGeometryOptions():
+            return Options()
+
+    Create = _Create()
+    VersionNumber = '2020'
+
+
+class _DocumentCreate(object):
+    def __init__(self, document):
+        self.document = document
+
+    def NewDimension(self, view, line, references):
+        self.document.check_modifiable()
+        if references.Size < 2:
+            raise ArgumentException('Not enough references for dimension')
+        return self.document.add(Dimension(view, line, references, self.document.dimension_type))
+
+
+class Document(object):
+    """Документ в памяти. Элементы добавляются через add, id раздаются по порядку"""
+
+    def __init__(self, title='Standin', path_name=''):
+        self.Title = title
+        self.PathName = path_name or os.path.join(os.getcwd(), title + '.rvt')
+        self.IsWorkshared = False
+        self.IsReadOnly = False
+        self.IsModifiable = False
+        self.IsValidObject = True
+        self.Create = _DocumentCreate(self)
+        self.Application = Application()
+        self._elements = {}
+        self._owned = {}
+        self._bindings = {}
+        self._next_id = 1000
+        self._transaction = None
+        self._undo_log = []
+        self.ActiveView = None
+        self.exported = []
+        self.regenerate_count = 0
+
+        self.dimension_type = DimensionType()
+        self._add_without_transaction(self.dimension_type)
+
+    # Наполнение документа
+    def add(self, element):
+        self.check_modifiable()
+        return self._add_without_transaction(element)
+
+    def bind_parameter(self, category, name, storage_type=StorageType.String):
+        """Параметр проекта: появляется у всех новых элементов категории"""
+
+        self._bindings.setdefault(category, []).append((name, storage_type))
+
+    def _add_without_transaction(self, element):
+        if element.Category is not None:
+            for name, storage_type in self._bindings.get(element.Category.BuiltInCategory, ()):
+                if element.LookupParameter(name) is None:
+                    element.add_parameter(name, storage_type=storage_type)
+        element.Id = ElementId(self._next_id)
+        element.Document = self
+        self._next_id += 1
+        self._insert(element)
+        self.record_undo(self._remove, element)
+        return element
+
+    def _insert(self, element):
+        self._elements[element.Id.IntegerValue] = element
+        if element.OwnerViewId != ElementId.InvalidElementId:
+            self._owned.setdefault(element.OwnerViewId.IntegerValue, []).append(element)
+
+    def _remove(self, element):
+        del self._elements[element.Id.IntegerValue]
+        if element.OwnerViewId != ElementId.InvalidElementId:
+            self._owned[element.OwnerViewId.IntegerValue].remove(element)
+
+    def fill(self, elements):
+        """Добавить элементы без транзакции, для построения синтетических моделей"""
+
+        return [self._add_without_transaction(element) for element in elements]
+
+    def elements(self):
+        return iter(list(self._elements.values()))
+
+    def owned_by(self, view_id):
+        return list(self._owned.get(view_id.IntegerValue, ()))
+
+    def __len__(self):
+        return len(self._elements)
+
+    # API
+    def GetElement(self, key):
+        if isinstance(key, ElementId):
+            key = key.IntegerValue
+        elif not isinstance(key, int):
+            return None
+        return self._elements.get(key)
+
+    def Delete(self, element_id):
+        self.check_modifiable()
+        element = self._elements.get(element_id.IntegerValue)
+        if element is None:
+            return []
+
+        self._remove(element)
+        self.record_undo(self._insert, element)
+        return [element_id]
+
+    def Regenerate(self):
+        self.check_modifiable()
+        self.regenerate_count += 1
+
+    def Export(self, folder, name, view_ids, options):
+        """
+        Экспорт пишет пустой файл на каждый вид, как Revit при экспорте в DWG
+
+        Без MergedViews виды, размещенные на листе, пишутся отдельными файлами-ссылками
+        "<имя файла листа>-View-<n>", как это делает Revit
+        """
+
+        view_ids = list(view_ids)
+        if len(view_ids) == 1:
+            names = [name]
+        else:
+            names = [name + '-' + re.sub(r'[\\/:*?"<>|]', '_', self.GetElement(i).Title.replace(': ', ' - '))
+                     for i in view_ids]
+
+        if not getattr(options, 'MergedViews', True):
+            for view_id, file_name in list(zip(view_ids, names)):
+                view = self.GetElement(view_id)
+                if view.ViewType == ViewType.DrawingSheet:
+                    names.extend('{}-View-{}'.format(file_name, index + 1)
+                                 for index in range(len(view.GetAllPlacedViews())))
+
+        for file_name in names:
+            with open(os.path.join(folder, file_name + '.dwg'), 'w') as dwg:
+                dwg.write('standin dwg\n')
+            with open(os.path.join(folder, file_name + '.pcp'), 'w') as pcp:
+                pcp.write('standin pcp\n')
+
+        self.exported.append((folder, name, view_ids, options))
+        return True
+
+    # Транзакции
+    def start_transaction(self, transaction):
+        if self._transaction is not None:
+            raise InvalidOperationException('Transaction "{}" already started'.format(self._transaction.name))
+        self._transaction = transaction
+        self._undo_log = []
+        self.IsModifiable = True
+
+    def end_transaction(self, transaction):
+        self._transaction = None
+        self._undo_log = []
+        self.IsModifiable = False
+
+    # Журнал отмены: добавление и удаление элементов, значения параметров и типы
+    def record_undo(self, func, *args):
+        if self._transaction is not None:
+            self._undo_log.append((func, args))
+
+    def undo_mark(self):
+        return len(self._undo_log)
+
+    def undo(self, mark):
+        """Отменить изменения, записанные после mark, в обратном порядке"""
+
+        while len(self._undo_log) > mark:
+            func, args = self._undo_log.pop()
+            func(*args)
+
+    def check_modifiable(self):
+        if not self.IsModifiable:
+            raise InvalidOperationException('Attempt to modify the model outside of transaction')
@@ -0,0 +1,218 @@
+# coding=utf-8
+""" Синтетические модели для подставного документа
+
+    Имена семейств и параметров совпадают с теми, что ищут скрипты расширения
+"""
+
+import math
+
+from . import db as DB
+
+
+MM = 1 / 304.8
+GRID_LETTERS = u'АБВГДЕЖИКЛМНПРСТУФШЭЮЯ'
+
+TITLE_FAMILY_NAME = u'РЕН КОНС Листы v2'
+STAMP_FAMILY_NAME = u'S_Annotations_AddStamp'
+KEYPLAN_FAMILY_NAME = u'S_Annotations_Generic_Keyplan.Wall.small'
+NOTE_FAMILY_NAME = u'GA_Примечание_КЖ'
+
+SHEET_PARAMETERS = (u'Наим. объекта', u'Марка', u'Доп. шифр', u'Нестандартный номер листа', u'Номер листа')
+SIGN_PARAMETERS = (u'Подпись3', u'Подпись4', u'Подпись5')
+
+
+def create_symbol(document, family_name, category, name=None):
+    family = DB.Family(name=family_name)
+    symbol = DB.FamilySymbol(family, name=name, category=category)
+    document.fill([family, symbol])
+    return symbol
+
+
+def grid_name(index):
+    letter = GRID_LETTERS[index % len(GRID_LETTERS)]
+    return letter if index < len(GRID_LETTERS) else u'{}{}'.format(letter, index // len(GRID_LETTERS))
+
+
+# ################# Листы ###################################################
+def sheets_model(count, marks=(u'КЖ', u'АР'), annotations=True):
+    """
+    Модель с листами. Номера листов <марка>-<номер>, по маркам поровну
+
+    На каждом листе основная надпись, штамп, ключевой план, легенда, два текста
+    и аннотация GA_Примечание_КЖ с параметрами List_ids и "Номер совместн. листов"
+
+    :param count: Число листов
+    :type count: int
+    :param marks: Марки комплектов
+    :type marks: tuple[str]
+    :param annotations: Создавать аннотации на листах
+    :type annotations: bool
+    :rtype: DB.Document
+    """
+
+    document = DB.Document(title='Sheets_{}'.format(count))
+
+    title_symbol = create_symbol(document, TITLE_FAMILY_NAME, DB.BuiltInCategory.OST_TitleBlocks)
+    stamp_symbol = create_symbol(document, STAMP_FAMILY_NAME, DB.BuiltInCategory.OST_TitleBlocks)
+    keyplan_symbol = create_symbol(document, KEYPLAN_FAMILY_NAME, DB.BuiltInCategory.OST_GenericAnnotation)
+    note_symbol = create_symbol(document, NOTE_FAMILY_NAME, DB.BuiltInCategory.OST_GenericAnnotation)
+    legend = document.fill([DB.View(u'Легенда', view_type=DB.ViewType.Legend)])[0]
+    for name in SHEET_PARAMETERS:
+        document.bind_parameter(DB.BuiltInCategory.OST_Sheets, name)
+    for name in SIGN_PARAMETERS:
+        document.bind_parameter(DB.BuiltInCategory.OST_TitleBlocks, name)
+
+    sheets = []
+    for i in range(count):
+        mark = marks[i % len(marks)]
+        number = u'{}-{:03d}'.format(mark, i // len(marks) + 1)
+
+        sheet = document.fill([DB.ViewSheet(number, name=u'Лист {}'.format(number))])[0]
+        for name in SHEET_PARAMETERS:
+            sheet.LookupParameter(name).value = u'{} {}'.format(name, mark)
+        sheet.LookupParameter(u'Номер листа').value = number
+        sheets.append(sheet)
+
+        if not annotations:
+            continue
+
+        title_block = document.fill([DB.FamilyInstance(title_symbol, owner_view_id=sheet.Id)])[0]
+        for name in SIGN_PARAMETERS:
+            title_block.LookupParameter(name).value = u'{} {}'.format(name, i)
+
+        note = DB.AnnotationSymbol(note_symbol, owner_view_id=sheet.Id)
+        note.add_parameter(u'List_ids', u'')
+        note.add_parameter(u'Номер совместн. листов', u'')
+
+        document.fill([
+            DB.FamilyInstance(stamp_symbol, owner_view_id=sheet.Id),
+            DB.AnnotationSymbol(keyplan_symbol, owner_view_id=sheet.Id),
+            DB.Viewport(sheet.Id, legend.Id, DB.XYZ(1, 1, 0)),
+            DB.TextNote(u'Примечание 1', owner_view_id=sheet.Id),
+            DB.TextNote(u'Примечание 2', owner_view_id=sheet.Id),
+            note,
+        ])
+
+    if sheets:
+        document.ActiveView = sheets[0]
+    return document
+
+
+def get_sheets(document):
+    return DB.FilteredElementCollector(document).OfClass(DB.ViewSheet).ToElements()
+
+
+# ################# Арматура ################################################
+def rebars_model(count, views=1):
+    """
+    Модель с арматурой и 3D видами. Активный вид - первый 3D вид
+
+    :param count: Число стержней
+    :type count: int
+    :param views: Число 3D видов
+    :type views: int
+    :rtype: DB.Document
+    """
+
+    document = DB.Document(title='Rebars_{}'.format(count))
+    view_list = document.fill([DB.View3D(u'3D {}'.format(i)) for i in range(views)])
+    rebars = document.fill([DB.Rebar(u'Rebar {}'.format(i)) for i in range(count)])
+
+    # Половина стержней уже показана, чтобы был смысл в сравнении состояния
+    for rebar in rebars[::2]:
+        rebar.unobscured.add(view_list[0].Id.IntegerValue)
+
+    document.ActiveView = view_list[0]
+    return document
+
+
+def get_rebars(document):
+    return DB.FilteredElementCollector(document).OfClass(DB.Rebar).ToElements()
+
+
+# ################# Колонны и оси ###########################################
+def columns_model(count, step=6000 * MM, chains=0, chain_segments=100):
+    """
+    Модель с сеткой осей и колоннами на пересечениях
+
+    Колонны получают отметку "<буква>-<цифра>" как COLUMN_LOCATION_MARK в Revit
+
+    :param count: Число колонн (округляется до квадрата сетки)
+    :type count: int
+    :param step: Шаг осей, футы
+    :type step: float
+    :param chains: Число составных осей с ломаной траекторией
+    :type chains: int
+    :param chain_segments: Число сегментов в составной оси
+    :type chain_segments: int
+    :rtype: DB.Document
+    """
+
+    document = DB.Document(title='Columns_{}'.format(count))
+    size = max(1, int(math.ceil(math.sqrt(count))))
+    length = step * (size + 1)
+
+    rows = [grid_name(i) for i in range(size)]
+    cols = [str(i + 1) for i in range(size)]
+    document.fill([DB.Grid(name, DB.Line.CreateBound(DB.XYZ(-step, i * step, 0), DB.XYZ(length, i * step, 0)))
+                   for i, name in enumerate(rows)])
+    document.fill([DB.Grid(name, DB.Line.CreateBound(DB.XYZ(i * step, -step, 0), DB.XYZ(i * step, length, 0)))
+                   for i, name in enumerate(cols)])
+
+    for chain in range(chains):
+        add_grid_chain(document, u'Ц{}'.format(chain + 1), DB.XYZ(-step, -step * (chain + 2), 0),
+                       length + step, chain_segments)
+
+    symbol = create_symbol(document, u'Колонна', DB.BuiltInCategory.OST_StructuralColumns, name=u'400x400')
+    columns = []
+    for i in range(count):
+        row, col = divmod(i, size)
+        column = DB.FamilyInstance(symbol, point=DB.XYZ(col * step, row * step, 0), width=400 * MM, depth=400 * MM)
+        column.add_parameter(DB.BuiltInParameter.COLUMN_LOCATION_MARK, u'{}-{}'.format(rows[row], cols[col]))
+        columns.append(column)
+    document.fill(columns)
+
+    document.ActiveView = document.fill([DB.View(u'План 1', view_type=DB.ViewType.EngineeringPlan)])[0]
+    return document
+
+
+def add_grid_chain(document, name, start, length, segments):
+    """Составная ось из отрезков ломаной вдоль X"""
+
+    step = length / segments
+    points = [start + DB.XYZ(step * i, step * 0.1 * (i % 2), 0) for i in range(segments + 1)]
+    grids = document.fill([DB.Grid(u'{}.{}'.format(name, i), DB.Line.CreateBound(a, b))
+                           for i, (a, b) in enumerate(zip(points, points[1:]))])
+    return document.fill([DB.MultiSegmentGrid(name, [grid.Id for grid in grids])])[0]
+
+
+def get_columns(document):
+    return DB.FilteredElementCollector(document).OfCategory(DB.BuiltInCategory.OST_StructuralColumns) \
+        .WhereElementIsNotElementType().ToElements()
+
+
+# ################# Виды для экспорта #######################################
+def views_model(count):
+    """
+    Модель с планами и листами для экспорта. Половина видов - планы, половина - листы
+
+    :param count: Число видов
+    :type count: int
+    :rtype: DB.Document
+    """
+
+    document = DB.Document(title='Views_{}'.format(count))
+    views = []
+    for i in range(count):
+        if i % 2:
+            views.append(DB.ViewSheet(u'КЖ-{:03d}'.format(i), name=u'Лист: {}/{}'.format(i, count)))
+        else:
+            views.append(DB.View(u'План {}'.format(i), view_type=DB.ViewType.FloorPlan))
+    document.fill(views)
+
+    document.ActiveView = views[0]
+    return document
+
+
+def get_views(document):
+    return DB.FilteredElementCollector(document).OfClass(DB.View).ToElements()
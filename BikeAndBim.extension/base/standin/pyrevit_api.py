@@ -0,0 +1,155 @@
+# coding=utf-8
+""" Подставной pyRevit
+
+    forms возвращают заранее заданные ответы, script пишет файлы данных во временную папку
+"""
+
+import logging
+import os
+import tempfile
+
+from . import db as DB
+
+
+_state = {'uiapp': None}
+
+
+def bind(ui_application):
+    """Привязать pyRevit к приложению. Вызывается из standin.install"""
+
+    _state['uiapp'] = ui_application
+
+
+def _doc():
+    return _state['uiapp'].ActiveUIDocument.Document
+
+
+# ################# pyrevit #################################################
+class _ExecParams(object):
+    event_args = None
+    event_sender = None
+    command_path = ''
+    command_name = 'standin'
+
+
+class _HostApp(object):
+    @property
+    def uiapp(self):
+        return _state['uiapp']
+
+    @property
+    def app(self):
+        return _state['uiapp'].Application
+
+    @property
+    def doc(self):
+        return _doc()
+
+    @property
+    def uidoc(self):
+        return _state['uiapp'].ActiveUIDocument
+
+
+EXEC_PARAMS = _ExecParams()
+HOST_APP = _HostApp()
+
+
+# ################# pyrevit.forms ###########################################
+class forms(object):
+    """Ответы пользователя задаются через forms.answers"""
+
+    answers = {}
+
+    class SelectFromList(object):
+        @staticmethod
+        def show(context, **kwargs):
+            answer = forms.answers.get('SelectFromList')
+            if answer is not None:
+                return answer
+            context = list(context)
+            return context[0] if context else None
+
+    class CommandSwitchWindow(object):
+        @staticmethod
+        def show(context, **kwargs):
+            return forms.answers.get('CommandSwitchWindow')
+
+    class ProgressBar(object):
+        def __init__(self, title='', cancellable=False, **kwargs):
+            self.title = title
+            self.cancelled = False
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            pass
+
+        def update_progress(self, new_value, max_value=1):
+            pass
+
+    @staticmethod
+    def ask_for_string(default=None, prompt=None, title=None, **kwargs):
+        return forms.answers.get('ask_for_string', default)
+
+    @staticmethod
+    def alert(msg, title=None, **kwargs):
+        logging.getLogger('pyrevit').info(msg)
+        return True
+
+    @staticmethod
+    def select_titleblocks(**kwargs):
+        return None
+
+
+# ################# pyrevit.revit ###########################################
+class Transaction(object):
+    def __init__(self, name=None, doc=None, **kwargs):
+        self.transaction = DB.Transaction(doc or _doc(), name or 'pyRevit Transaction')
+
+    def __enter__(self):
+        self.transaction.Start()
+        return self.transaction
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.transaction.Commit()
+        else:
+            self.transaction.RollBack()
+
+
+def pick_element_by_category(category, message=''):
+    return None
+
+
+# ################# pyrevit.script ##########################################
+class script(object):
+    data_folder = tempfile.gettempdir()
+
+    @staticmethod
+    def get_document_data_file(file_id, file_ext, add_cmd_name=False):
+        name = '{}_{}.{}'.format(_doc().Title, file_id, file_ext)
+        return os.path.join(script.data_folder, name)
+
+    @staticmethod
+    def get_universal_data_file(file_id, file_ext, add_cmd_name=False):
+        return os.path.join(script.data_folder, '{}.{}'.format(file_id, file_ext))
+
+    @staticmethod
+    def get_logger():
+        return logging.getLogger('pyrevit')
+
+
+# ################# pyrevit.coreutils.envvars ###############################
+class envvars(object):
+    """Переменные сессии pyRevit, в Revit хранятся в AppDomain"""
+
+    _data = {}
+
+    @staticmethod
+    def get_pyrevit_env_var(name):
+        return envvars._data.get(name)
+
+    @staticmethod
+    def set_pyrevit_env_var(name, value):
+        envvars._data[name] = value
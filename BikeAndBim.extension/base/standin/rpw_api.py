@@ -0,0 +1,342 @@
+# coding=utf-8
+""" Подставной rpw (revitpythonwrapper)
+
+    Обертки db.Element, db.Collector, db.Transaction и ui.Selection поверх подставного документа
+"""
+
+import functools
+import logging
+
+from . import db as DB
+from . import ui as UI
+
+
+_state = {'uidoc': None}
+
+
+def bind(ui_document):
+    """Привязать rpw к документу. Вызывается из standin.install"""
+
+    _state['uidoc'] = ui_document
+
+
+def _uidoc():
+    return _state['uidoc']
+
+
+def _doc():
+    return _state['uidoc'].Document
+
+
+class RpwException(Exception):
+    pass
+
+
+class RpwParameterNotFound(RpwException, KeyError):
+    pass
+
+
+def unwrap(element):
+    return element.unwrap() if isinstance(element, Element) else element
+
+
+# ################# db ######################################################
+class Parameter(object):
+    def __init__(self, parameter):
+        self._revit_object = parameter
+
+    def unwrap(self):
+        return self._revit_object
+
+    def __getattr__(self, name):
+        return getattr(self._revit_object, name)
+
+    @property
+    def name(self):
+        return self._revit_object.Definition.Name
+
+    @property
+    def type(self):
+        return self._revit_object.StorageType
+
+    @property
+    def value(self):
+        parameter = self._revit_object
+        storage = parameter.StorageType
+        if storage == DB.StorageType.String:
+            return parameter.AsString()
+        if storage == DB.StorageType.Integer:
+            return parameter.AsInteger()
+        if storage == DB.StorageType.Double:
+            return parameter.AsDouble()
+        if storage == DB.StorageType.ElementId:
+            return parameter.AsElementId()
+
+    @value.setter
+    def value(self, value):
+        self._revit_object.Set(unwrap(value))
+
+
+class _ParameterSet(object):
+    def __init__(self, element, builtin=False):
+        self._element = element
+        self._builtin = builtin
+
+    def _key(self, name):
+        if self._builtin and not isinstance(name, DB._Enum):
+            return getattr(DB.BuiltInParameter, name)
+        return name
+
+    def _get(self, name):
+        key = self._key(name)
+        parameter = self._element.get_Parameter(key) if self._builtin else self._element.LookupParameter(key)
+        if parameter is None:
+            raise RpwParameterNotFound('Parameter "{}" not found on #{}'.format(name, self._element.Id))
+        return parameter
+
+    def __getitem__(self, name):
+        return Parameter(self._get(name))
+
+    def __setitem__(self, name, value):
+        self._get(name).Set(unwrap(value))
+
+    def __contains__(self, name):
+        try:
+            self._get(name)
+            return True
+        except RpwParameterNotFound:
+            return False
+
+    @property
+    def builtins(self):
+        return _ParameterSet(self._element, builtin=True)
+
+
+class Element(object):
+    def __init__(self, element):
+        self._revit_object = unwrap(element)
+
+    def unwrap(self):
+        return self._revit_object
+
+    def __getattr__(self, name):
+        return getattr(self._revit_object, name)
+
+    def __eq__(self, other):
+        return unwrap(other) is self._revit_object
+
+    def __hash__(self):
+        return hash(self._revit_object.Id)
+
+    @property
+    def parameters(self):
+        return _ParameterSet(self._revit_object)
+
+    def get_category(self, wrapped=True):
+        return self._revit_object.Category
+
+
+class Collector(object):
+    def __init__(self, **filters):
+        view = filters.get('view')
+        elements = filters.get('elements')
+        if elements is not None:
+            ids = [unwrap(e).Id for e in elements]
+            collector = DB.FilteredElementCollector(_doc(), ids) if ids else None
+        elif view is not None:
+            collector = DB.FilteredElementCollector(_doc(), getattr(unwrap(view), 'Id', view))
+        else:
+            collector = DB.FilteredElementCollector(_doc())
+
+        if collector is not None:
+            of_class = filters.get('of_class')
+            if of_class is not None:
+                collector = collector.OfClass(of_class)
+            of_category = filters.get('of_category')
+            if of_category is not None:
+                if not isinstance(of_category, DB._Enum):
+                    name = of_category if of_category.startswith('OST_') else 'OST_' + of_category
+                    of_category = getattr(DB.BuiltInCategory, name)
+                collector = collector.OfCategory(of_category)
+
+        self._elements = list(collector) if collector is not None else []
+        where = filters.get('where')
+        if where is not None:
+            self._elements = [e for e in self._elements if where(Element(e))]
+
+    def get_elements(self, wrapped=True):
+        return [Element(e) for e in self._elements] if wrapped else list(self._elements)
+
+    def get_first(self, wrapped=True):
+        if not self._elements:
+            return None
+        return Element(self._elements[0]) if wrapped else self._elements[0]
+
+    def get_element_ids(self):
+        return [e.Id for e in self._elements]
+
+    @property
+    def elements(self):
+        return self.get_elements()
+
+    def __iter__(self):
+        return iter(self.get_elements())
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __bool__(self):
+        return bool(self._elements)
+
+    __nonzero__ = __bool__
+
+
+class Transaction(object):
+    def __init__(self, name=None, doc=None):
+        self.transaction = DB.Transaction(doc or _doc(), name or 'rpw:Transaction')
+
+    def __getattr__(self, name):
+        return getattr(self.transaction, name)
+
+    def __enter__(self):
+        self.transaction.Start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.transaction.Commit()
+        else:
+            self.transaction.RollBack()
+
+    @classmethod
+    def ensure(cls, name):
+        """Декоратор: открыть транзакцию, если документ сейчас не изменяется"""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapped(*args, **kwargs):
+                if _doc().IsModifiable:
+                    return func(*args, **kwargs)
+                with cls(name):
+                    return func(*args, **kwargs)
+            return wrapped
+        return decorator
+
+
+class TransactionGroup(object):
+    def __init__(self, name=None, assimilate=True, doc=None):
+        self.group = DB.TransactionGroup(doc or _doc(), name or 'rpw:TransactionGroup')
+        self.assimilate = assimilate
+
+    def __enter__(self):
+        self.group.Start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.group.RollBack()
+        elif self.assimilate:
+            self.group.Assimilate()
+        else:
+            self.group.Commit()
+
+
+class _DbNamespace(object):
+    Element = Element
+    Collector = Collector
+    Transaction = Transaction
+    TransactionGroup = TransactionGroup
+    Parameter = Parameter
+
+
+# ################# ui ######################################################
+class Selection(object):
+    def __init__(self, elements=None, uidoc=None):
+        self._uidoc = uidoc or _uidoc()
+        ids = self._uidoc.Selection.GetElementIds() if elements is None else [unwrap(e).Id for e in elements]
+        self._elements = [self._uidoc.Document.GetElement(i) for i in ids]
+
+    def __iter__(self):
+        return iter([Element(e) for e in self._elements])
+
+    def __getitem__(self, index):
+        return Element(self._elements[index])
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __bool__(self):
+        return bool(self._elements)
+
+    __nonzero__ = __bool__
+
+    def get_elements(self, wrapped=True):
+        return [Element(e) for e in self._elements] if wrapped else list(self._elements)
+
+    def get_element_ids(self):
+        return [e.Id for e in self._elements]
+
+
+class _Forms(object):
+    """rpw.ui.forms: формы только хранят значения по умолчанию"""
+
+    class _Component(object):
+        def __init__(self, *args, **kwargs):
+            self.args = args
+            self.kwargs = kwargs
+
+    Label = TextBox = Separator = Button = CheckBox = ComboBox = _Component
+
+    class FlexForm(object):
+        def __init__(self, title, components):
+            self.title = title
+            self.values = {}
+            for component in components:
+                if component.args and 'Text' in component.kwargs:
+                    self.values[component.args[0]] = component.kwargs['Text']
+
+        def show(self):
+            return True
+
+
+class _UiNamespace(object):
+    Selection = Selection
+    forms = _Forms
+
+
+# ################# revit ###################################################
+class _Revit(object):
+    @property
+    def uidoc(self):
+        return _uidoc()
+
+    @property
+    def doc(self):
+        return _doc()
+
+    @property
+    def app(self):
+        return _doc().Application
+
+    @property
+    def active_view(self):
+        return Element(_doc().ActiveView)
+
+
+class _Logger(logging.Logger):
+    def disable(self):
+        self.setLevel(logging.CRITICAL + 10)
+
+    def title(self, msg):
+        self.info(msg)
+
+
+def create_logger():
+    logger = _Logger('rpw')
+    logger.addHandler(logging.NullHandler())
+    return logger
+
+
+revit = _Revit()
+db = _DbNamespace()
+ui = _UiNamespace()
@@ -0,0 +1,155 @@
+# coding=utf-8
+""" Подставной Autodesk.Revit.UI
+
+    Диалоги ничего не показывают, а запоминают последнее содержимое в TaskDialog.shown
+"""
+
+from .db import Application, ElementId, _enum
+
+
+TaskDialogIcon = _enum('TaskDialogIcon', [
+    'TaskDialogIconNone', 'TaskDialogIconInformation', 'TaskDialogIconWarning', 'TaskDialogIconError',
+])
+
+TaskDialogCommonButtons = _enum('TaskDialogCommonButtons', ['None', 'Ok', 'Yes', 'No', 'Cancel', 'Close'])
+
+TaskDialogResult = _enum('TaskDialogResult', ['None', 'Ok', 'Cancel', 'Yes', 'No', 'Close'])
+
+
+class TaskDialog(object):
+    shown = []
+
+    def __init__(self, title):
+        self.Title = title
+        self.TitleAutoPrefix = True
+        self.MainIcon = None
+        self.MainInstruction = ''
+        self.MainContent = ''
+        self.ExpandedContent = ''
+        self.FooterText = ''
+        self.CommonButtons = None
+
+    def Show(self):
+        TaskDialog.shown.append(self)
+        return TaskDialogResult.Ok
+
+
+class DockablePanes(object):
+    class BuiltInDockablePanes(object):
+        ProjectBrowser = 'ProjectBrowser'
+
+
+class DockablePane(object):
+    def __init__(self, pane_id):
+        self.pane_id = pane_id
+
+    def Show(self):
+        pass
+
+    def Hide(self):
+        pass
+
+
+class FileSaveDialog(object):
+    """Диалог сохранения. Путь задается заранее через FileSaveDialog.path"""
+
+    path = None
+
+    def __init__(self, file_filter):
+        self.Filter = file_filter
+        self.InitialFileName = ''
+        self.Title = ''
+
+    def Show(self):
+        return TaskDialogResult.Ok if self.path else TaskDialogResult.Cancel
+
+    def GetSelectedModelPath(self):
+        return self.path
+
+
+class Selection(object):
+    """Пространство имен Autodesk.Revit.UI.Selection"""
+
+    class ISelectionFilter(object):
+        def AllowElement(self, element):
+            return True
+
+        def AllowReference(self, reference, position):
+            return True
+
+    ObjectType = _enum('ObjectType', ['Nothing', 'Element', 'PointOnElement', 'Edge', 'Face'])
+    PickBoxStyle = _enum('PickBoxStyle', ['Crossing', 'Enclosing', 'Directional'])
+
+
+class UISelection(object):
+    """UIDocument.Selection"""
+
+    def __init__(self, ui_document):
+        self.ui_document = ui_document
+        self._ids = []
+
+    def GetElementIds(self):
+        return list(self._ids)
+
+    def SetElementIds(self, element_ids):
+        self._ids = [i if isinstance(i, ElementId) else ElementId(i) for i in element_ids]
+
+    def PickElementsByRectangle(self, selection_filter=None, message=''):
+        document = self.ui_document.Document
+        elements = [document.GetElement(i) for i in self._ids]
+        if selection_filter is not None:
+            elements = [e for e in elements if selection_filter.AllowElement(e)]
+        return elements
+
+    def PickObject(self, object_type, message=''):
+        return None
+
+
+class UIDocument(object):
+    def __init__(self, document):
+        self.Document = document
+        self.Selection = UISelection(self)
+
+    @property
+    def ActiveView(self):
+        return self.Document.ActiveView
+
+    @ActiveView.setter
+    def ActiveView(self, view):
+        self.Document.ActiveView = view
+
+
+class UIApplication(object):
+    def __init__(self, ui_document):
+        self.ActiveUIDocument = ui_document
+        self.Application = Application()
+        self.Application.Documents = [ui_document.Document]
+        self.idling_handlers = []
+
+    @property
+    def Idling(self):
+        return _Event(self.idling_handlers)
+
+    @Idling.setter
+    def Idling(self, event):
+        pass
+
+    def raise_idling(self, args=None):
+        for handler in list(self.idling_handlers):
+            handler(self, args)
+
+
+class _Event(object):
+    """Событие .NET: подписка через += и -="""
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+
+    def __iadd__(self, handler):
+        self.handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+        return self
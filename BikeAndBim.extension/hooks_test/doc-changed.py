@@ -1,28 +1,15 @@
-from pyrevit import EXEC_PARAMS
+# coding=utf-8
+import os.path
+import sys
 
-import clr
+hooks_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(hooks_path)
+sys.path.append(os.path.join(os.path.dirname(hooks_path), 'base'))
 
-clr.AddReference('RevitAPI')
-clr.AddReference('RevitAPIUI')
-clr.AddReference("RevitServices")
+from pyrevit import EXEC_PARAMS, HOST_APP
 
-import Autodesk.Revit.DB as DB
+import hooks
+import rebar_tagging
 
 
-doc = EXEC_PARAMS.event_args.GetDocument()  # type: DB.Document
-
-rebar_filer = DB.ElementClassFilter(DB.Structure.Rebar)
-added_rebar_id = EXEC_PARAMS.event_args.GetAddedElementIds(rebar_filer)
-
-if added_rebar_id:
-    print 777, doc.IsReadOnly
-
-    active_view = doc.ActiveView
-    value = active_view.LookupParameter('Sheet Number').AsString()
-
-    for el_id in added_rebar_id:
-        rebar = doc.GetElement(el_id)
-        param = rebar.LookupParameter('Comments')
-        param.Set(value)
-
-        print '#{} rebar. Comments == [{}]'.format(el_id, value)
+hooks.dispatch_document_changed(EXEC_PARAMS.event_args, HOST_APP.uiapp)
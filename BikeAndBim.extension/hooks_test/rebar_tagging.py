@@ -0,0 +1,93 @@
+# coding=utf-8
+""" Номер листа активного вида в комментарий новой арматуры
+
+    Во время DocumentChanged документ менять нельзя, поэтому обработчик
+    отложенный: Id добавленной арматуры копятся и записываются одним проходом
+    в Idling - одна транзакция и одна строка в выводе на пачку. Номер листа
+    берется в момент события, поэтому смена вида до записи его не меняет.
+    События от транзакции самого обработчика пропускаются: запись комментариев
+    меняет арматуру и иначе снова вызывала бы обработчик.
+"""
+
+import Autodesk.Revit.DB as DB
+
+import hooks
+
+
+COMMENTS = DB.BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS
+TRANSACTION_NAME = 'Rebar comments'
+
+
+def get_active_sheet_number(document):
+    return get_sheet_number(document.ActiveView)
+
+
+@hooks.document_changed(classes=[DB.Structure.Rebar], debounce=0.3, budget=5.0, name='rebar_tagging',
+                        capture=get_active_sheet_number, ignore_transactions=[TRANSACTION_NAME])
+def tag_new_rebar(document, batches):
+    """
+    :type document: DB.Document
+    :param batches: Изменения по номеру листа активного вида на момент события
+    :type batches: dict[str, hooks.Changes]
+    """
+
+    values = dict((value, changes.added) for value, changes in batches.items() if value and changes.added)
+    if not values:
+        return
+
+    changed, count = write_comments(document, values)
+    print('Rebar comments: {} of {} new rebars changed in "{}"'.format(changed, count, document.Title))
+
+
+def write_comments(document, values):
+    """
+    Записать комментарии арматуры одной транзакцией
+
+    :type document: DB.Document
+    :param values: Int Id арматуры по значению комментария
+    :type values: dict[str, set[int]]
+    :return: Число измененной арматуры и всей арматуры пачки
+    :rtype: (int, int)
+    """
+
+    changed = count = 0
+    transaction = DB.Transaction(document, TRANSACTION_NAME)
+    transaction.Start()
+    try:
+        for value, ids in values.items():
+            for int_id in sorted(ids):
+                rebar = document.GetElement(DB.ElementId(int_id))
+                if rebar is None:
+                    continue
+
+                count += 1
+                param = rebar.get_Parameter(COMMENTS)
+                if param is not None and not param.IsReadOnly and param.AsString() != value:
+                    param.Set(value)
+                    changed += 1
+
+        transaction.Commit()
+    except Exception:
+        transaction.RollBack()
+        raise
+
+    return changed, count
+
+
+def get_sheet_number(view):
+    """
+    Номер листа вида: у листа - свой номер, у вида - номер листа, на котором он размещен
+
+    :type view: DB.View
+    :rtype: str
+    """
+
+    if view is None:
+        return None
+
+    if isinstance(view, DB.ViewSheet):
+        param = view.get_Parameter(DB.BuiltInParameter.SHEET_NUMBER)
+    else:
+        param = view.get_Parameter(DB.BuiltInParameter.VIEWER_SHEET_NUMBER)
+
+    return param.AsString() if param is not None else None
@@ -0,0 +1,108 @@
+# coding=utf-8
+""" Бенчмарк разбора отметки колонны (COLUMN_LOCATION_MARK)
+
+    Сначала проверяет корпус location_marks.tsv, затем сравнивает старый разбор
+    (re.findall без компиляции на каждую колонну) с LocationMarkParser.
+
+    Запуск без Revit:
+        python benchmarks/bench_location_mark.py [--count 100000]
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DIM_COLUMN_PATH = os.path.join(os.path.dirname(HERE), 'BikeAndBim.extension', 'BikeAnd.tab',
+                               'Dimension.panel', 'dim_column.pushbutton')
+sys.path.append(DIM_COLUMN_PATH)
+
+from location_mark import LocationMarkParser
+
+CORPUS_PATH = os.path.join(HERE, 'location_marks.tsv')
+LEGACY_REGEX = r"(.+?)(?:\([\d-]+?\))??-([\w/]+)(?:\([\d-]+?\))?"
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def read_corpus(path=CORPUS_PATH):
+    """
+    Прочитать корпус отметок
+
+    :return: Известные имена осей и список (отметка, ось 1, ось 2)
+    :rtype: (set[str], list[(str, str, str)])
+    """
+
+    names = set()
+    cases = []
+    with io.open(path, encoding='utf-8') as corpus:
+        for line in corpus:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+
+            fields = line.split('\t')
+            if fields[0] == 'grids':
+                names.update(fields[1:])
+            else:
+                mark, first, second = fields
+                cases.append((mark, first, second))
+
+    return names, cases
+
+
+def check_corpus(parser, cases):
+    errors = []
+    for mark, first, second in cases:
+        try:
+            result = tuple(parser.parse(mark))
+        except ValueError as err:
+            result = err
+        if result != (first, second):
+            errors.append(u'{!r}: expected {!r}, got {!r}'.format(mark, (first, second), result))
+    return errors
+
+
+def legacy_parse(value):
+    return re.findall(LEGACY_REGEX, value)[0]
+
+
+def measure(func, marks):
+    start = timer()
+    for mark in marks:
+        func(mark)
+    return timer() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=100000, help='Number of columns to parse')
+    args = arg_parser.parse_args()
+
+    names, cases = read_corpus()
+    errors = check_corpus(LocationMarkParser(names), cases)
+    for error in errors:
+        print(error)
+    print('Corpus: {} marks, {} errors'.format(len(cases), len(errors)))
+    if errors:
+        return 1
+
+    corpus_marks = [mark for mark, _, _ in cases]
+    marks = (corpus_marks * (args.count // len(corpus_marks) + 1))[:args.count]
+
+    legacy = measure(legacy_parse, marks)
+    cold = measure(LocationMarkParser(names)._parse, marks)
+    memoized = measure(LocationMarkParser(names).parse, marks)
+
+    print('{} marks'.format(len(marks)))
+    print('legacy findall:   {:.4f} s'.format(legacy))
+    print('parser, no cache: {:.4f} s'.format(cold))
+    print('parser, memoized: {:.4f} s'.format(memoized))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
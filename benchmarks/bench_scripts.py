@@ -0,0 +1,430 @@
+# coding=utf-8
+""" Бенчмарк основных функций кнопок на синтетических моделях
+
+    Скрипты запускаются без Revit на подставной модели base/standin.
+    Каждая функция замеряется на моделях из 1k, 10k и 100k элементов,
+    результаты пишутся в JSON для сравнения между запусками.
+    Перед замерами запускаются проверки поведения (CHECKS).
+
+    Нужен Python 3: в IronPython str - это unicode, как в Python 3, а в CPython 2 нет
+
+    Запуск:
+        python benchmarks/bench_scripts.py
+        python benchmarks/bench_scripts.py --sizes 1000 10000 --cases get_next_number
+        python benchmarks/bench_scripts.py --compare benchmarks/results/bench_20201020_120000.json
+"""
+
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from collections import OrderedDict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXTENSION_PATH = os.path.join(os.path.dirname(HERE), 'BikeAndBim.extension')
+TAB_PATH = os.path.join(EXTENSION_PATH, 'BikeAnd.tab')
+BASE_PATH = os.path.join(EXTENSION_PATH, 'base')
+RESULTS_PATH = os.path.join(HERE, 'results')
+sys.path.append(BASE_PATH)
+
+import standin
+from standin import models
+from standin import db as DB
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Модули, которые берут doc при импорте. Перед каждой моделью их нужно импортировать заново
+DOC_BOUND_MODULES = ('wrapper', 'selection', 'location_mark', 'segment_index')
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+# ################# Загрузка скриптов #######################################
+def load_source(name, path):
+    try:
+        import importlib.util
+    except ImportError:
+        import imp
+        return imp.load_source(name, path)
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_script(relative_path, document, selection=()):
+    """
+    Подставить модель и заново импортировать скрипт кнопки
+
+    Папка скрипта и папка stack добавляются в sys.path, папка скрипта - первой, как это делает pyRevit
+
+    :param relative_path: Путь к файлу скрипта от BikeAnd.tab
+    :type relative_path: str
+    :param document: Синтетическая модель
+    :type document: DB.Document
+    :param selection: Выбранные элементы
+    :type selection: list[DB.Element]
+    :return: Модуль скрипта
+    """
+
+    standin.install(document, selection=selection)
+
+    path = os.path.join(TAB_PATH, relative_path)
+    folder = os.path.dirname(path)
+    for import_path in (os.path.dirname(folder), folder):
+        if import_path in sys.path:
+            sys.path.remove(import_path)
+        sys.path.insert(0, import_path)
+
+    for name in DOC_BOUND_MODULES:
+        sys.modules.pop(name, None)
+
+    name = 'bench_' + os.path.splitext(os.path.basename(relative_path))[0]
+    if name == 'bench_script':
+        name = 'bench_' + os.path.basename(folder).split('.')[0].lower()
+    return load_source(name, path)
+
+
+# ################# Сценарии ################################################
+# Сценарий получает размер модели и возвращает функцию без аргументов для замера.
+# Если сценарий меняет модель так, что повтор замерял бы уже другую модель,
+# он возвращает fresh(prepare): prepare строит модель заново перед каждым замером
+# (вне таймера) и возвращает функцию для замера
+
+CASES = OrderedDict()
+
+
+def case(func):
+    CASES[func.__name__] = func
+    return func
+
+
+def fresh(prepare):
+    prepare.fresh = True
+    return prepare
+
+
+@case
+def get_next_number(size):
+    document = models.sheets_model(size, annotations=False)
+    sheets = models.get_sheets(document)
+    script = load_script('Sheet.panel/Copy_sheet.pushbutton/script.py', document)
+
+    return lambda: script.get_next_number(sheets[0])
+
+
+@case
+def copy_sheets(size):
+    """Копирование 200 листов (или всех, если модель меньше). Каждый замер - на новой модели"""
+
+    def prepare():
+        document = models.sheets_model(size)
+        sheets = models.get_sheets(document)[:200]
+        script = load_script('Sheet.panel/Copy_sheet.pushbutton/script.py', document, selection=sheets)
+        return script.main
+
+    return fresh(prepare)
+
+
+@case
+def get_sheet_numbers_by_sheets(size):
+    document = models.sheets_model(size, annotations=False)
+    sheets = models.get_sheets(document)
+    reload_number = load_script('Sheet number.panel/Sheet_numbers_by_ids.stack/reload_number.py', document)
+
+    return lambda: reload_number.get_sheet_numbers_by_sheets(sheets)
+
+
+SORT_NUMBERS_COUNT = 50000
+
+
+def get_synthetic_sheet_numbers(count):
+    """Номера вида 'КЖ-12', 'АР-3.2', 'КЖ-12.3а' и без цифр, вперемешку"""
+
+    marks = (u'КЖ', u'АР', u'КМ', u'ОВ')
+    suffixes = (u'', u'а', u'б')
+
+    numbers = []
+    for i in range(count):
+        mark = marks[i % len(marks)]
+        number = (i * 7919) % count + 1
+        if i % 5 == 0:
+            numbers.append(u'{}-{}.{}{}'.format(mark, number // 10, number % 10, suffixes[i % 3]))
+        elif i % 97 == 0:
+            numbers.append(u'{}-Общие данные'.format(mark))
+        else:
+            numbers.append(u'{}-{:03}'.format(mark, number))
+    return numbers
+
+
+@case
+def sort_sheet_numbers(size):
+    """Сортировка 50k номеров листов без кеша ключей. Размер модели не важен"""
+
+    import natural_sort
+    numbers = get_synthetic_sheet_numbers(SORT_NUMBERS_COUNT)
+
+    def run():
+        natural_sort.clear_cache()
+        return natural_sort.sort_numbers(numbers)
+
+    return run
+
+
+@case
+def sort_sheet_numbers_cached(size):
+    """Повторная сортировка 50k номеров листов с ключами из кеша, как в reload_number"""
+
+    import natural_sort
+    natural_sort.clear_cache()
+    numbers = get_synthetic_sheet_numbers(SORT_NUMBERS_COUNT)
+    natural_sort.sort_numbers(numbers)
+
+    return lambda: natural_sort.sort_numbers(numbers)
+
+
+@case
+def unobscured_all_rebars_on_view(size):
+    document = models.rebars_model(size)
+    visible_rebar = load_script('Rebar visible.panel/Visible_rebar.stack/visible_rebar.py', document)
+    view = document.ActiveView
+    state = {'visible': False}
+
+    def run():
+        # Видимость переключается, чтобы каждый замер менял состояние всей арматуры
+        state['visible'] = not state['visible']
+        with DB.Transaction(document, 'Bench'):
+            visible_rebar.unobscured_all_rebars_on_view(view, state['visible'], solid=state['visible'])
+
+    return run
+
+
+@case
+def unobscured_all_rebars_on_views(size):
+    """Вся арматура на 10 3D видах за одну транзакцию"""
+
+    document = models.rebars_model(size, views=10)
+    views = [view for view in document.elements() if isinstance(view, DB.View3D)]
+    visible_rebar = load_script('Rebar visible.panel/Visible_rebar.stack/visible_rebar.py', document)
+    state = {'visible': False}
+
+    def run():
+        state['visible'] = not state['visible']
+        with DB.Transaction(document, 'Bench'):
+            visible_rebar.unobscured_all_rebars_on_views(views, state['visible'], solid=state['visible'])
+
+    return run
+
+
+@case
+def change_sheets_name(size):
+    document = models.sheets_model(size, annotations=False)
+    sheet_ids = [sheet.Id for sheet in models.get_sheets(document)]
+    script = load_script('Sheet number.panel/Sheet_numbers_by_ids.stack/Renumber_sheet.pushbutton/script.py',
+                         document)
+    state = {'template': u'КЖ-', 'new': u'КР-'}
+
+    def run():
+        with DB.Transaction(document, 'Bench'):
+            script.change_sheets_name(sheet_ids, state['template'], state['new'])
+        state['template'], state['new'] = state['new'], state['template']
+
+    return run
+
+
+@case
+def export_dwg_plan(size):
+    """Выбор видов и имена файлов, без записи на диск"""
+
+    document = models.views_model(size)
+    views = models.get_views(document)
+    script = load_script('View.panel/Export_cad.pushbutton/script.py', document, selection=views)
+
+    return lambda: script.plan_export(script.get_selected_views_id(), '')
+
+
+@case
+def create_dim_for_column(size):
+    document = models.columns_model(size)
+    columns = models.get_columns(document)
+    dim_column = load_script('Dimension.panel/dim_column.pushbutton/dim_column.py', document)
+    grid_index = dim_column.GridIndex(document)
+
+    def run():
+        with DB.Transaction(document, 'Bench'):
+            for column in columns:
+                dim_column.create_dim_for_column(column, grid_index=grid_index)
+
+    return run
+
+
+# ################# Проверки ################################################
+# Проверка строит свою модель и бросает AssertionError, если скрипт работает неверно
+
+CHECKS = OrderedDict()
+
+
+def check(func):
+    CHECKS[func.__name__] = func
+    return func
+
+
+@check
+def copy_sheets_rollback():
+    """Ошибка на одном листе не оставляет в модели его элементов и номера"""
+
+    document = models.sheets_model(20)
+    sheets = models.get_sheets(document)[:5]
+    failing_id = sheets[2].Id.IntegerValue
+    script = load_script('Sheet.panel/Copy_sheet.pushbutton/script.py', document, selection=sheets)
+
+    copy_parameters = script.copy_parameters
+
+    def copy_parameters_failing(copies):
+        # Ошибка после того, как элементы листа созданы и параметры записаны
+        skipped = copy_parameters(copies)
+        if any(source.Id.IntegerValue == failing_id for source, _ in copies[script.SHEET_PARAMETERS]):
+            raise DB.InvalidOperationException('Bench failure')
+        return skipped
+
+    script.copy_parameters = copy_parameters_failing
+    old_ids = set(element.Id.IntegerValue for element in document.elements())
+    new_sheets = [sheet.unwrap() for sheet in script.main()]
+
+    assert len(new_sheets) == len(sheets) - 1, 'Copy {} of {} sheets'.format(len(new_sheets), len(sheets))
+
+    new_sheet_ids = set(sheet.Id.IntegerValue for sheet in new_sheets)
+    for element in document.elements():
+        element_id = element.Id.IntegerValue
+        if element_id in old_ids or element_id in new_sheet_ids:
+            continue
+        assert element.OwnerViewId.IntegerValue in new_sheet_ids, \
+            'Element #{} is left by a failed sheet'.format(element_id)
+
+    numbers = [sheet.SheetNumber for sheet in models.get_sheets(document)]
+    assert len(numbers) == len(set(numbers)), 'Sheet numbers are not unique'
+
+
+@check
+def copy_sheets_bad_number():
+    """Номер листа без числа после марки пропускает только этот лист"""
+
+    document = models.sheets_model(20)
+    sheets = models.get_sheets(document)[:5]
+    with DB.Transaction(document, 'Bench'):
+        sheets[1].SheetNumber = u'КЖ-ОД'
+    script = load_script('Sheet.panel/Copy_sheet.pushbutton/script.py', document, selection=sheets)
+
+    new_sheets = script.main()
+    assert len(new_sheets) == len(sheets) - 1, 'Copy {} of {} sheets'.format(len(new_sheets), len(sheets))
+
+
+def run_checks(names):
+    for name in names:
+        CHECKS[name]()
+        print('{:<32} ok'.format(name))
+
+
+# ################# Замер ###################################################
+def measure(name, size, repeat):
+    start = timer()
+    func = CASES[name](size)
+    setup = timer() - start
+
+    runs = []
+    for index in range(repeat):
+        run = func
+        if getattr(func, 'fresh', False):
+            start = timer()
+            run = func()
+            if index == 0:
+                setup += timer() - start
+
+        start = timer()
+        run()
+        runs.append(timer() - start)
+
+    return OrderedDict([
+        ('case', name),
+        ('size', size),
+        ('setup', setup),
+        ('best', min(runs)),
+        ('mean', sum(runs) / len(runs)),
+        ('runs', runs),
+    ])
+
+
+def get_meta(args):
+    return OrderedDict([
+        ('date', datetime.datetime.now().isoformat()),
+        ('python', platform.python_version()),
+        ('implementation', platform.python_implementation()),
+        ('platform', platform.platform()),
+        ('repeat', args.repeat),
+    ])
+
+
+def save_results(path, data):
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    with io.open(path, 'w', encoding='utf-8') as results:
+        results.write(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def load_results(path):
+    with io.open(path, encoding='utf-8') as results:
+        data = json.load(results)
+    return dict(((r['case'], r['size']), r) for r in data['results'])
+
+
+def format_result(result, previous=None):
+    line = '{:<32} {:>7} {:>10.4f} s  (setup {:.2f} s)'.format(
+        result['case'], result['size'], result['best'], result['setup'])
+
+    old = previous.get((result['case'], result['size'])) if previous else None
+    if old and result['best']:
+        line += '  x{:.2f} vs {:.4f} s'.format(old['best'] / result['best'], old['best'])
+    return line
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Model sizes')
+    arg_parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES), help='Cases to run')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Runs per case, best run is reported')
+    arg_parser.add_argument('--output', help='JSON file for results, by default benchmarks/results/bench_<date>.json')
+    arg_parser.add_argument('--compare', help='JSON file of a previous run to compare with')
+    arg_parser.add_argument('--checks', nargs='*', choices=list(CHECKS), default=list(CHECKS),
+                            help='Checks to run before measuring, none if empty')
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    run_checks(args.checks)
+    previous = load_results(args.compare) if args.compare else None
+
+    results = []
+    for name in args.cases:
+        for size in args.sizes:
+            result = measure(name, size, args.repeat)
+            results.append(result)
+            print(format_result(result, previous))
+            sys.stdout.flush()
+
+    output = args.output or os.path.join(
+        RESULTS_PATH, 'bench_{}.json'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S')))
+    save_results(output, OrderedDict([('meta', get_meta(args)), ('results', results)]))
+    print('Results: {}'.format(output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())